@@ -5,6 +5,7 @@ from datetime import timedelta
 from django import forms
 from django.contrib import admin
 from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
 from django.http.request import HttpRequest
 from django.utils import timezone
 from django.utils.translation import gettext as _
@@ -71,9 +72,11 @@ class UserAdmin(ModelAdmin[User]):
             },
         )
 
-        # remove existing password
+        # remove existing password and revoke issued tokens
         obj.password = ""
+        obj.tokens_revoked = timezone.now()
         obj.save()
+        cache.set(*BlacklistedToken.watermark(user_id=obj.pk, revoked=obj.tokens_revoked))
 
         self.message_user(
             request,
@@ -1,7 +1,6 @@
 from time import time
 
 from django.conf import settings
-from django.utils import timezone
 from django.utils.decorators import async_only_middleware
 from jwt.exceptions import InvalidTokenError
 
@@ -24,15 +23,18 @@ def cookie_auth_middleware(get_response):
                 request.auth = decode_token(access_token).get("sub")
                 return await get_response(request)
 
-            if await BlacklistedToken.objects.filter(token=refresh_token, expires__gt=timezone.now()).aexists():
+            payload = decode_token(refresh_token)
+
+            # cache only, no database round trip
+            if await BlacklistedToken.is_revoked(token=refresh_token, payload=payload):
                 return await get_response(request)
 
-            user_id = decode_token(refresh_token).get("sub")
+            user_id = payload.get("sub")
             request.auth = user_id
 
             max_age = settings.ACCESS_TOKEN_EXPIRE_SECONDS * 60
-            expires = int(time()) + max_age
-            access_token = encode_token({"sub": user_id, "exp": expires, "type": "access"})
+            issued = time()
+            access_token = encode_token({"sub": user_id, "exp": int(issued) + max_age, "iat": issued, "type": "access"})
             options = auth_cookie_options()
 
             response = await get_response(request)
@@ -0,0 +1,20 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext as _
+
+from apps.account.models import BlacklistedToken
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = _("Rebuild token revocation cache from blacklisted tokens and user watermarks")
+
+    def handle(self, *args: object, **options: dict[str, object]):
+        result = BlacklistedToken.rebuild_cache()
+        self.stdout.write(
+            self.style.SUCCESS(
+                _("Cached %(token_count)s blacklisted tokens and %(watermark_count)s user watermarks") % result
+            )
+        )
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-16 20:42
+
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0001_initial'),
+    ]
+
+    operations = [
+        pgtrigger.migrations.RemoveTrigger(
+            model_name='user',
+            name='insert_insert',
+        ),
+        pgtrigger.migrations.RemoveTrigger(
+            model_name='user',
+            name='update_update',
+        ),
+        pgtrigger.migrations.RemoveTrigger(
+            model_name='user',
+            name='delete_delete',
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='tokens_revoked',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Tokens Revoked'),
+        ),
+        migrations.AddField(
+            model_name='userevent',
+            name='tokens_revoked',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Tokens Revoked'),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name='user',
+            trigger=pgtrigger.compiler.Trigger(name='insert_insert', sql=pgtrigger.compiler.UpsertTriggerSql(func='INSERT INTO "account_userevent" ("avatar", "birth_date", "created", "email", "id", "is_active", "is_staff", "is_superuser", "language", "modified", "name", "nickname", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id", "phone", "preferences", "tokens_revoked") VALUES (NEW."avatar", NEW."birth_date", NEW."created", NEW."email", NEW."id", NEW."is_active", NEW."is_staff", NEW."is_superuser", NEW."language", NEW."modified", NEW."name", NEW."nickname", _pgh_attach_context(), NOW(), \'insert\', NEW."id", NEW."phone", NEW."preferences", NEW."tokens_revoked"); RETURN NULL;', hash='df5531c166c9f3b679101e914a6a645ef974ece9', operation='INSERT', pgid='pgtrigger_insert_insert_ae8bc', table='account_user', when='AFTER')),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name='user',
+            trigger=pgtrigger.compiler.Trigger(name='update_update', sql=pgtrigger.compiler.UpsertTriggerSql(condition='WHEN (OLD."avatar" IS DISTINCT FROM (NEW."avatar") OR OLD."birth_date" IS DISTINCT FROM (NEW."birth_date") OR OLD."email" IS DISTINCT FROM (NEW."email") OR OLD."id" IS DISTINCT FROM (NEW."id") OR OLD."is_active" IS DISTINCT FROM (NEW."is_active") OR OLD."is_staff" IS DISTINCT FROM (NEW."is_staff") OR OLD."is_superuser" IS DISTINCT FROM (NEW."is_superuser") OR OLD."language" IS DISTINCT FROM (NEW."language") OR OLD."name" IS DISTINCT FROM (NEW."name") OR OLD."nickname" IS DISTINCT FROM (NEW."nickname") OR OLD."phone" IS DISTINCT FROM (NEW."phone") OR OLD."preferences" IS DISTINCT FROM (NEW."preferences") OR OLD."tokens_revoked" IS DISTINCT FROM (NEW."tokens_revoked"))', func='INSERT INTO "account_userevent" ("avatar", "birth_date", "created", "email", "id", "is_active", "is_staff", "is_superuser", "language", "modified", "name", "nickname", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id", "phone", "preferences", "tokens_revoked") VALUES (NEW."avatar", NEW."birth_date", NEW."created", NEW."email", NEW."id", NEW."is_active", NEW."is_staff", NEW."is_superuser", NEW."language", NEW."modified", NEW."name", NEW."nickname", _pgh_attach_context(), NOW(), \'update\', NEW."id", NEW."phone", NEW."preferences", NEW."tokens_revoked"); RETURN NULL;', hash='3b313ce0f7a0b978426306495387c2699af79fb7', operation='UPDATE', pgid='pgtrigger_update_update_66d56', table='account_user', when='AFTER')),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name='user',
+            trigger=pgtrigger.compiler.Trigger(name='delete_delete', sql=pgtrigger.compiler.UpsertTriggerSql(func='INSERT INTO "account_userevent" ("avatar", "birth_date", "created", "email", "id", "is_active", "is_staff", "is_superuser", "language", "modified", "name", "nickname", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id", "phone", "preferences", "tokens_revoked") VALUES (OLD."avatar", OLD."birth_date", OLD."created", OLD."email", OLD."id", OLD."is_active", OLD."is_staff", OLD."is_superuser", OLD."language", OLD."modified", OLD."name", OLD."nickname", _pgh_attach_context(), NOW(), \'delete\', OLD."id", OLD."phone", OLD."preferences", OLD."tokens_revoked"); RETURN NULL;', hash='cceaf3b6d1cb8a3624b6e6fe936b092fd39cfc07', operation='DELETE', pgid='pgtrigger_delete_delete_378ac', table='account_user', when='AFTER')),
+        ),
+    ]
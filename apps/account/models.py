@@ -3,11 +3,11 @@ import io
 import logging
 from datetime import datetime, timedelta
 from datetime import timezone as dt_timezone
+from hashlib import sha256
 from time import time
 from typing import TYPE_CHECKING, ClassVar, Literal, TypedDict
 
 import pghistory
-import qrcode
 from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.base_user import BaseUserManager
@@ -15,6 +15,7 @@ from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.storage import storages
 from django.core.mail import send_mail
@@ -113,6 +114,7 @@ class User(TuidMixin, TimeStampedMixin, AbstractBaseUser, PermissionsMixin):
     is_active = BooleanField(_("Active"), default=False)
     is_staff = BooleanField(_("Staff"), default=False)
     is_superuser = BooleanField(_("Superuser"), default=False)
+    tokens_revoked = DateTimeField(_("Tokens Revoked"), null=True, blank=True, editable=False)
 
     # Do not remove this. It will disable login state signal.
     last_login = None
@@ -176,14 +178,15 @@ class User(TuidMixin, TimeStampedMixin, AbstractBaseUser, PermissionsMixin):
 
         # access token
         options = auth_cookie_options()
+        issued = time()
         max_age = settings.ACCESS_TOKEN_EXPIRE_SECONDS
-        access_payload: TokenDict = {"sub": self.pk, "exp": int(time()) + max_age, "type": "access"}
+        access_payload: TokenDict = {"sub": self.pk, "exp": int(issued) + max_age, "iat": issued, "type": "access"}
         access_token = encode_token(access_payload)
         response.set_cookie(key="access_token", value=access_token, max_age=max_age, **options)
 
         # refresh token
         max_age = settings.REFRESH_TOKEN_EXPIRE_SECONDS
-        refresh_payload: TokenDict = {"sub": self.pk, "exp": int(time()) + max_age, "type": "refresh"}
+        refresh_payload: TokenDict = {"sub": self.pk, "exp": int(issued) + max_age, "iat": issued, "type": "refresh"}
         refresh_token = encode_token(refresh_payload)
         response.set_cookie(key="refresh_token", value=refresh_token, max_age=max_age, **options)
 
@@ -207,24 +210,20 @@ class User(TuidMixin, TimeStampedMixin, AbstractBaseUser, PermissionsMixin):
         access_token = request.COOKIES.get(settings.ACCESS_TOKEN_NAME)
         refresh_token = request.COOKIES.get(settings.REFRESH_TOKEN_NAME)
 
-        blacklisted_tokens: list[BlacklistedToken] = []
-        for token in [access_token, refresh_token]:
-            if not token:
-                continue
-            try:
-                payload = decode_token(token)
-                expires = datetime.fromtimestamp(payload["exp"], tz=dt_timezone.utc)
-                blacklisted_tokens.append(BlacklistedToken(token=token, expires=expires))
-            except InvalidTokenError:
-                continue
-
-        await BlacklistedToken.objects.abulk_create(
-            blacklisted_tokens, update_conflicts=True, unique_fields=["token"], update_fields=["expires"]
-        )
+        user_ids = await BlacklistedToken.revoke([token for token in [access_token, refresh_token] if token])
+        for user_id in user_ids:
+            await cls.revoke_tokens(user_id)
 
         response.delete_cookie(settings.ACCESS_TOKEN_NAME)
         response.delete_cookie(settings.REFRESH_TOKEN_NAME)
 
+    @classmethod
+    async def revoke_tokens(cls, user_id: str):
+        # a single watermark revokes every token issued before now, cf. BlacklistedToken.is_revoked
+        revoked = timezone.now()
+        await cls.objects.filter(pk=user_id).aupdate(tokens_revoked=revoked)
+        await cache.aset(*BlacklistedToken.watermark(user_id=user_id, revoked=revoked))
+
     @classmethod
     async def get_user(cls, *, is_active: bool | None = None, annotate: bool = False, **kwargs):
         manager = (
@@ -258,7 +257,9 @@ class User(TuidMixin, TimeStampedMixin, AbstractBaseUser, PermissionsMixin):
 
     async def change_password(self, *, password: str):
         self.set_password(password)
+        self.tokens_revoked = timezone.now()
         await self.asave()
+        await cache.aset(*BlacklistedToken.watermark(user_id=self.pk, revoked=self.tokens_revoked))
 
     async def request_activation(self, *, callback_url: str):
         if self.is_active:
@@ -373,6 +374,8 @@ class User(TuidMixin, TimeStampedMixin, AbstractBaseUser, PermissionsMixin):
         )
 
     async def setup_otp(self):
+        import qrcode
+
         if await TOTPDevice.objects.filter(user=self, confirmed=True).aexists():
             raise ValueError(ErrorCode.OTP_ALREADY_ENABLED)
         await TOTPDevice.objects.filter(user=self, confirmed=False).adelete()
@@ -576,6 +579,9 @@ class Token(TimeStampedMixin):
 
 @pghistory.track()
 class BlacklistedToken(Model):
+    # Durable source of token revocation. Requests are checked against the cache only,
+    # which can be rebuilt from this table and User.tokens_revoked (rebuild_token_revocation).
+
     token = CharField(_("Token"), max_length=500, unique=True)
     expires = DateTimeField(_("Expires"))
 
@@ -583,6 +589,80 @@ class BlacklistedToken(Model):
         verbose_name = _("Blacklisted Token")
         verbose_name_plural = _("Blacklisted Tokens")
 
+    @staticmethod
+    def token_key(token: str):
+        return f"account:blacklistedtoken:{sha256(token.encode()).hexdigest()}"
+
+    @staticmethod
+    def watermark_key(user_id: str):
+        return f"account:blacklistedtoken:before:{user_id}"
+
+    @classmethod
+    def watermark(cls, *, user_id: str, revoked: datetime):
+        # tokens issued before the watermark are expired after one refresh token lifetime
+        # sub-second, a token issued earlier in the same second as the revocation is revoked too
+        revoked_before = revoked.timestamp()
+        timeout = int(revoked_before - time()) + settings.REFRESH_TOKEN_EXPIRE_SECONDS
+        return cls.watermark_key(user_id), revoked_before, max(timeout, 1)
+
+    @classmethod
+    async def is_revoked(cls, *, token: str, payload: TokenDict):
+        user_id = payload.get("sub")
+        if not user_id:
+            return True
+
+        token_key = cls.token_key(token)
+        watermark_key = cls.watermark_key(user_id)
+        cached = await cache.aget_many([token_key, watermark_key])
+
+        if cached.get(token_key):
+            return True
+
+        # tokens without iat were issued before the watermark was introduced
+        revoked_before = cached.get(watermark_key)
+        return revoked_before is not None and payload.get("iat", 0) < revoked_before
+
+    @classmethod
+    async def revoke(cls, tokens: list[str]):
+        blacklisted_tokens: list[BlacklistedToken] = []
+        user_ids: set[str] = set()
+        now = int(time())
+
+        for token in tokens:
+            try:
+                payload = decode_token(token)
+            except InvalidTokenError:
+                continue
+
+            expires = datetime.fromtimestamp(payload["exp"], tz=dt_timezone.utc)
+            blacklisted_tokens.append(cls(token=token, expires=expires))
+            user_ids.add(payload["sub"])
+            await cache.aset(cls.token_key(token), True, max(payload["exp"] - now, 1))
+
+        await cls.objects.abulk_create(
+            blacklisted_tokens, update_conflicts=True, unique_fields=["token"], update_fields=["expires"]
+        )
+        return user_ids
+
+    @classmethod
+    def rebuild_cache(cls):
+        now = timezone.now()
+        token_count = 0
+        watermark_count = 0
+
+        for token, expires in cls.objects.filter(expires__gt=now).values_list("token", "expires").iterator():
+            cache.set(cls.token_key(token), True, max(int((expires - now).total_seconds()), 1))
+            token_count += 1
+
+        revoked_since = now - timedelta(seconds=settings.REFRESH_TOKEN_EXPIRE_SECONDS)
+        for user_id, revoked in (
+            User.objects.filter(tokens_revoked__gt=revoked_since).values_list("pk", "tokens_revoked").iterator()
+        ):
+            cache.set(*cls.watermark(user_id=user_id, revoked=revoked))
+            watermark_count += 1
+
+        return {"token_count": token_count, "watermark_count": watermark_count}
+
 
 @pghistory.track()
 class OtpLog(TimeStampedMixin):
@@ -1,9 +1,14 @@
+from time import time
+
 import pytest
+from asgiref.sync import async_to_sync
 from django.conf import settings
 from mimesis.plugins.factory import FactoryField
 from pytest_django import DjangoDbBlocker
 
+from apps.account.models import BlacklistedToken, User
 from apps.account.tests.factories import UserFactory
+from apps.common.util import TokenDict, encode_token
 
 
 @pytest.mark.django_db
@@ -11,6 +16,31 @@ def test_user():
     UserFactory.create()
 
 
+@pytest.mark.django_db
+def test_token_revocation():
+    user = UserFactory.create()
+    # issued within the same second as the revocation
+    issued = time()
+    payload: TokenDict = {"sub": user.pk, "exp": int(issued) + 60, "iat": issued, "type": "refresh"}
+    token = encode_token(payload)
+    assert not async_to_sync(BlacklistedToken.is_revoked)(token=token, payload=payload), "not revoked"
+
+    async_to_sync(User.revoke_tokens)(user.pk)
+    assert async_to_sync(BlacklistedToken.is_revoked)(token=token, payload=payload), "revoked by watermark"
+
+    reissued = time()
+    new_payload: TokenDict = {"sub": user.pk, "exp": int(reissued) + 60, "iat": reissued, "type": "refresh"}
+    new_token = encode_token(new_payload)
+    assert not async_to_sync(BlacklistedToken.is_revoked)(token=new_token, payload=new_payload), "issued later"
+
+    async_to_sync(BlacklistedToken.revoke)([new_token])
+    assert async_to_sync(BlacklistedToken.is_revoked)(token=new_token, payload=new_payload), "revoked by token"
+    assert BlacklistedToken.rebuild_cache()["token_count"] >= 1, "rebuild from durable rows"
+
+    no_sub = {"exp": int(reissued) + 60, "iat": reissued, "type": "refresh"}
+    assert async_to_sync(BlacklistedToken.is_revoked)(token=encode_token(no_sub), payload=no_sub), "no subject"
+
+
 @pytest.mark.load_data
 def test_load_user_data(db_no_rollback: DjangoDbBlocker):
     with FactoryField.override_locale(settings.DEFAULT_LANGUAGE):
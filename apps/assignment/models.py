@@ -3,7 +3,6 @@ from typing import TYPE_CHECKING, NotRequired, Sequence, TypedDict
 
 import pghistory
 from asgiref.sync import sync_to_async
-from bs4 import BeautifulSoup
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.postgres.fields import ArrayField
@@ -32,7 +31,6 @@ from django.db.utils import IntegrityError
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from pghistory.models import PghEventModel
-from tika import parser
 
 from apps.account.models import OtpLog
 from apps.common.error import ErrorCode
@@ -337,6 +335,9 @@ class Attempt(Model):
                 files, max_count=attempt.question.attachment_file_count, max_size=ATTACHMENT_MAX_SIZE_MB * 1024 * 1024
             )
 
+        from bs4 import BeautifulSoup
+        from tika import parser
+
         content = BeautifulSoup(answer, "html.parser").get_text(separator=" ", strip=True)
         for f in files or []:
             tika_response = parser.from_buffer(f, settings.TIKA_HOST)
@@ -1,7 +1,6 @@
 from django.conf import settings
 
 from apps.assistant.agent.base import BaseAgent
-from apps.assistant.agent.gemini import GeminiAgent
 
 
 def create_agent() -> BaseAgent:
@@ -9,6 +8,8 @@ def create_agent() -> BaseAgent:
     api_key = settings.ASSISTANT_AGENT_API_KEY
 
     if agent_type == "gemini":
+        from apps.assistant.agent.gemini import GeminiAgent
+
         return GeminiAgent(api_key)
     elif agent_type == "openai":
         raise NotImplementedError("OpenAI agent is not implemented yet")
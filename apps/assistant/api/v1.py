@@ -20,7 +20,7 @@ from apps.assistant.api.schema import (
     ChatSchema,
 )
 from apps.assistant.models import AssistantNote, Chat, ChatMessage
-from apps.common.util import HttpRequest, Pagination
+from apps.common.util import CursorPagination, HttpRequest, struct_response
 
 router = Router(by_alias=True)
 
@@ -118,7 +118,8 @@ async def delete_chat(request: HttpRequest, id: int):
 
 
 @router.get("/chat/{id}/message", response=list[ChatMessageSchema])
-@paginate(Pagination)
+@struct_response
+@paginate(CursorPagination)
 async def get_chat_messages(request: HttpRequest, id: int):
     return (
         ChatMessage.objects
@@ -1,6 +1,5 @@
 from typing import TYPE_CHECKING, Sequence
 
-from bs4 import BeautifulSoup
 from django.contrib.auth import get_user_model
 from django.core.files import File
 from django.core.files.storage import storages
@@ -131,6 +130,7 @@ class ChatMessage(SoftDeleteMixin, TimeStampedMixin, AttachmentMixin):
         chat_id: int | None = None,
         bot_id: int | None = None,
     ):
+        from bs4 import BeautifulSoup
 
         if chat_id:
             chat = await Chat.objects.select_related("bot").filter(user_id=user_id).aget(id=chat_id)
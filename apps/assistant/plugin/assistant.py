@@ -3,8 +3,6 @@
 import io
 from typing import Any, AsyncIterator
 
-from bs4 import BeautifulSoup
-
 from apps.assistant.models import AssistantNote, ChatMessage
 from apps.assistant.plugin.base import BasePlugin
 from apps.assistant.plugin.registry import PluginRegistry
@@ -59,6 +57,8 @@ class AssistantPlugin(BasePlugin):
         return parts
 
     def _strip_html(self, html: str) -> str:
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(html, "html.parser")
 
         for img in soup.find_all("img"):
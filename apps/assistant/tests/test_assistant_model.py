@@ -1,9 +1,13 @@
 import pytest
+from asgiref.sync import async_to_sync
 from django.conf import settings
 from mimesis.plugins.factory import FactoryField
 from pytest_django import DjangoDbBlocker
 
+from apps.assistant.api.v1 import get_chat_messages, router
+from apps.assistant.models import ChatMessage
 from apps.assistant.tests.factories import AssistantBotFactory, AssistantNoteFactory, ChatFactory
+from apps.common.util import hybrid_paginate
 
 
 @pytest.mark.order(-3)
@@ -14,6 +18,17 @@ def test_assistant():
     AssistantNoteFactory.create()
 
 
+@pytest.mark.django_db
+def test_chat_message_struct_parity(struct_parity):
+    chat = ChatFactory.create(bot=AssistantBotFactory.create())
+    qs = ChatMessage.objects.prefetch_related("attachments").filter(chat_id=chat.pk).order_by("-id")
+
+    paginated = async_to_sync(hybrid_paginate)(qs, page=1, size=2, cursor=None)
+    struct_parity(router, get_chat_messages, paginated)
+    paginated = async_to_sync(hybrid_paginate)(qs, page=1, size=2, cursor=paginated["next_cursor"])
+    struct_parity(router, get_chat_messages, paginated)
+
+
 @pytest.mark.order(-3)
 @pytest.mark.load_data
 def test_load_assistant_data(db_no_rollback: DjangoDbBlocker):
@@ -22,6 +22,7 @@ class ErrorCode:
     EMPTY_ANSWER = "EMPTY_ANSWER"
     EMPTY_REQUEST = "EMPTY_REQUEST"
     FILE_TOO_LARGE = "FILE_TOO_LARGE"
+    INVALID_CURSOR = "INVALID_CURSOR"
     INVALID_FILE_TYPE = "INVALID_FILE_TYPE"
     INVALID_OTP_CODE = "INVALID_OTP_CODE"
     INVALID_OTP_CONSUMER = "INVALID_OTP_CONSUMER"
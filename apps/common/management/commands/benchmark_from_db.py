@@ -0,0 +1,50 @@
+import gc
+import time
+from typing import Sequence
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.models import Model
+from django.utils.translation import gettext as _
+
+from apps.assistant.models import ChatMessage
+from apps.course.models import Gradebook
+from apps.exam.models import Grade
+
+
+def legacy_from_db(model_cls: type[Model], db: str | None, field_names: Sequence[str], values: Sequence[object]):
+    # previous BooleanNowField patch, kept an original for every column
+    instance = Model.from_db.__func__(model_cls, db, field_names, values)
+    for fname, value in zip(field_names, values):
+        setattr(instance, f"_original_{fname}", value)
+    return instance
+
+
+class Command(BaseCommand):
+    help = _("Benchmark model instantiation from database rows with BooleanNowField original tracking")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--rows", type=int, default=100_000)
+
+    def handle(self, *args: object, **options: dict[str, object]):
+        rows = int(options["rows"])  # type: ignore[arg-type]
+
+        for model in (Grade, Gradebook, ChatMessage):
+            field_names = tuple(f.attname for f in model._meta.concrete_fields)
+            values = tuple(i if f.primary_key else None for i, f in enumerate(model._meta.concrete_fields, start=1))
+
+            results = []
+            for label, from_db in (
+                ("django", lambda *a: Model.from_db.__func__(model, *a)),
+                ("before", lambda *a: legacy_from_db(model, *a)),
+                ("after", model.from_db),
+            ):
+                gc.collect()
+                gc.disable()
+                start = time.perf_counter()
+                instances = [from_db("default", field_names, values) for _ in range(rows)]
+                elapsed = time.perf_counter() - start
+                gc.enable()
+                results.append(f"{label} {elapsed:.3f}s ({len(instances[0].__dict__)} attrs)")
+                del instances
+
+            self.stdout.write(self.style.SUCCESS(f"{model._meta.label} x {rows}: " + ", ".join(results)))
@@ -0,0 +1,81 @@
+import re
+import subprocess
+import sys
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils.translation import gettext as _
+
+IMPORT_TIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+class ImportNode(NamedTuple):
+    name: str
+    self_us: int
+    cumulative_us: int
+    children: list[ImportNode]
+
+
+def parse_importtime(output: str):
+    # -X importtime prints a module after its children, indented two spaces per nesting level
+    pending: dict[int, list[ImportNode]] = {}
+    for line in output.splitlines():
+        if not (match := IMPORT_TIME_RE.match(line)):
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        level = len(indent) // 2
+        node = ImportNode(name, int(self_us), int(cumulative_us), pending.pop(level + 1, []))
+        pending.setdefault(level, []).append(node)
+    return pending.get(0, [])
+
+
+class Command(BaseCommand):
+    help = _("Report per-module import time of the ASGI application and check it against a budget")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--module", default="minima.asgi")
+        parser.add_argument("--depth", type=int, default=3)
+        parser.add_argument("--min-ms", type=float, default=20.0, help=_("Hide modules importing faster than this"))
+        parser.add_argument(
+            "--budget-ms",
+            type=float,
+            default=settings.IMPORT_TIME_BUDGET_MS,
+            help=_("Fail when the total import time exceeds this, 0 to disable"),
+        )
+
+    def handle(self, *args: object, **options: dict[str, object]):
+        module = str(options["module"])
+        depth = int(options["depth"])  # type: ignore[arg-type]
+        min_us = float(options["min_ms"]) * 1000  # type: ignore[arg-type]
+        budget_ms = float(options["budget_ms"])  # type: ignore[arg-type]
+
+        # the asgi handler resolves urls on first request, import them as a booting worker would
+        code = f"import {module}, {settings.ROOT_URLCONF}"
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code], cwd=settings.BASE_DIR, capture_output=True, text=True
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+
+        roots = parse_importtime(result.stderr)
+        total_ms = sum(node.cumulative_us for node in roots) / 1000
+
+        def write(nodes: list[ImportNode], level: int):
+            for node in sorted(nodes, key=lambda n: n.cumulative_us, reverse=True):
+                if node.cumulative_us < min_us:
+                    break
+                self.stdout.write(
+                    f"{node.cumulative_us / 1000:>10.1f} {node.self_us / 1000:>8.1f}  {'  ' * level}{node.name}"
+                )
+                if level + 1 < depth:
+                    write(node.children, level + 1)
+
+        self.stdout.write(f"{'cumul(ms)':>10} {'self(ms)':>8}  module")
+        write(roots, 0)
+
+        if budget_ms and total_ms > budget_ms:
+            raise CommandError(
+                _("Import time %(total).0fms exceeds budget %(budget).0fms") % {"total": total_ms, "budget": budget_ms}
+            )
+        self.stdout.write(self.style.SUCCESS(_("Import time %(total).0fms") % {"total": total_ms}))
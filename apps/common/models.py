@@ -1,22 +1,28 @@
 import logging
 from datetime import timedelta
-from typing import TYPE_CHECKING, Collection
+from typing import TYPE_CHECKING, Mapping, Sequence
 
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import (
     BooleanField,
+    Case,
     CharField,
     DateTimeField,
     DurationField,
+    F,
     FloatField,
     ImageField,
     JSONField,
     Manager,
+    Max,
     Model,
     PositiveSmallIntegerField,
     QuerySet,
     TextField,
+    Value,
+    When,
 )
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -62,39 +68,59 @@ class OrderableMixin(Model):
     def _get_filters(self):
         if not self.ordering_group:
             raise ValueError(_("ordering_group must be defined in subclass"))
-        return {field: getattr(self, field) for field in self.ordering_group}
+        return {field: getattr(self, self._meta.get_field(field).attname) for field in self.ordering_group}
 
-    def reorder(self, new_position: int):
-        filters = self._get_filters()
-        qs = self.__class__.objects.filter(**filters).exclude(pk=self.pk).order_by("ordering", "pk")
-        items = list(qs)
-
-        if new_position < 0:
-            new_position = 0
-        elif new_position > len(items):
-            new_position = len(items)
+    def _get_siblings(self):
+        return self.__class__.objects.filter(**self._get_filters()).exclude(pk=self.pk)
 
-        items.insert(new_position, self)
+    def _shift(self, old_position: int | None, new_position: int):
+        # Keys may be sparse, only the rows between the old and new position move
+        siblings = self._get_siblings()
+        if old_position is None:
+            siblings.filter(ordering__gte=new_position).update(ordering=F("ordering") + 1)
+        elif new_position < old_position:
+            siblings.filter(ordering__gte=new_position, ordering__lt=old_position).update(ordering=F("ordering") + 1)
+        elif new_position > old_position:
+            siblings.filter(ordering__gt=old_position, ordering__lte=new_position).update(ordering=F("ordering") - 1)
 
-        for index, item in enumerate(items):
-            item.ordering = index
+    def _get_saved_ordering(self) -> int | None:
+        # orderings of loaded rows go stale once a sibling has shifted them
+        return self.__class__.objects.filter(pk=self.pk).values_list("ordering", flat=True).first()
 
-        other_items = [item for item in items if item.pk and item != self]
-        if other_items:
-            self.__class__.objects.bulk_update(other_items, ["ordering"])
+    def reorder(self, new_position: int):
+        new_position = max(new_position, 0)
+        with transaction.atomic():
+            self._shift(self._get_saved_ordering(), new_position)
+            self.__class__.objects.filter(pk=self.pk).update(ordering=new_position)
+        self.ordering = self._original_ordering = new_position
+
+    @classmethod
+    def reorder_many(cls, orderings: Mapping[int | str, int]):
+        # Bulk imports set every position in a single UPDATE without shifting siblings
+        if not orderings:
+            return 0
+        return cls.objects.filter(pk__in=orderings.keys()).update(
+            ordering=Case(*[When(pk=pk, then=Value(position)) for pk, position in orderings.items()])
+        )
 
     def save(self, *args, **kwargs):
-        if not self.pk:
-            filters = self._get_filters()
-            count = self.__class__.objects.filter(**filters).count()
-            if getattr(self, "ordering", None) is None:
-                self.ordering = count
-            super().save(*args, **kwargs)
-            self.reorder(new_position=self.ordering)
-        else:
-            super().save(*args, **kwargs)
-            if self.ordering != self._original_ordering:
-                self.reorder(new_position=self.ordering)
+        update_fields = kwargs.get("update_fields")
+        with transaction.atomic():
+            if self._state.adding:
+                # ordering=None appends, any other position (the default 0 included) shifts the siblings down
+                if getattr(self, "ordering", None) is None:
+                    last = self._get_siblings().aggregate(last=Max("ordering"))["last"]
+                    self.ordering = 0 if last is None else last + 1
+                else:
+                    self._shift(None, self.ordering)
+                super().save(*args, **kwargs)
+            elif self.ordering != self._original_ordering and (update_fields is None or "ordering" in update_fields):
+                old_position = self._get_saved_ordering()
+                super().save(*args, **kwargs)
+                self._shift(old_position, self.ordering)
+            else:
+                super().save(*args, **kwargs)
+        self._original_ordering = self.ordering
 
 
 class BooleanNowField(DateTimeField):
@@ -108,15 +134,28 @@ class BooleanNowField(DateTimeField):
         original_from_db = cls.from_db.__func__
 
         def new_from_db(
-            model_cls: type[Model], db: str | None, field_names: Collection[str], values: Collection[object]
+            model_cls: type[Model], db: str | None, field_names: Sequence[str], values: Sequence[object]
         ) -> Model:
             instance = original_from_db(model_cls, db, field_names, values)
-            for fname, value in zip(field_names, values):
-                setattr(instance, f"_original_{fname}", value)
+            # keep originals of BooleanNowField columns only, in a single attribute
+            originals = {}
+            for attname in BooleanNowField.get_attnames(model_cls):
+                if attname in field_names:
+                    originals[attname] = values[field_names.index(attname)]
+            setattr(instance, "_boolean_now_originals", originals)
             return instance
 
         setattr(cls, "from_db", classmethod(new_from_db))
 
+    @staticmethod
+    def get_attnames(cls: type[Model]) -> tuple[str, ...]:
+        # cached per concrete model, abstract parents are patched with the same from_db
+        attnames = cls.__dict__.get("_boolean_now_attnames")
+        if attnames is None:
+            attnames = tuple(f.attname for f in cls._meta.concrete_fields if isinstance(f, BooleanNowField))
+            setattr(cls, "_boolean_now_attnames", attnames)
+        return attnames
+
     class BooleanNowFormField(forms.Field):
         def to_python(self, value):
             if value in (True, "True", "true", "1", 1, "on"):
@@ -141,7 +180,7 @@ class BooleanNowField(DateTimeField):
         if add:
             return timezone.now()
 
-        original_value = getattr(model_instance, f"_original_{self.attname}", None)
+        original_value = getattr(model_instance, "_boolean_now_originals", {}).get(self.attname)
         return original_value if original_value else timezone.now()
 
 
@@ -1,22 +1,52 @@
+import base64
+import json
 import math
 import random
 import time
 from datetime import datetime
 from enum import IntEnum
-from typing import TYPE_CHECKING, Annotated, Any, NotRequired, TypedDict, cast
+from functools import partial, wraps
+from hashlib import sha256
+from types import NoneType, UnionType
+from typing import (
+    TYPE_CHECKING,
+    Annotated,
+    Any,
+    Awaitable,
+    Callable,
+    Literal,
+    NotRequired,
+    TypedDict,
+    Union,
+    cast,
+    get_args,
+    get_origin,
+)
 from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
 
 import jwt
+import msgspec
 from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.postgres.forms import SimpleArrayField
-from django.db import connection
-from django.db.models import Avg, Count, FloatField, Max, Min, Model, Value
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, connections
+from django.db.models import Avg, Count, FloatField, Manager, Max, Min, Model, Q, Value
+from django.db.models.fields.files import FieldFile
 from django.db.models.functions import Coalesce
 from django.db.models.query import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.http.request import HttpRequest as DjangoHttpRequest
+from django.http.response import HttpResponseBase, HttpResponseNotModified
+from django.utils.http import parse_etags
+from ninja.errors import ConfigError
+from ninja.operation import Operation
 from ninja.pagination import AsyncPaginationBase
 from ninja.params import functions
+from ninja.utils import contribute_operation_callback
+from pydantic import BaseModel, RootModel
+from pydantic.fields import FieldInfo
 
 from apps.common.error import ErrorCode
 from apps.common.schema import Schema
@@ -58,6 +88,7 @@ class TokenDict(TypedDict):
     sub: str
     exp: int
     type: str
+    iat: NotRequired[float]  # with the fraction of a second, cf. BlacklistedToken.is_revoked
     to: NotRequired[str]
 
 
@@ -101,6 +132,8 @@ class HttpRequest(DjangoHttpRequest):
     auth: str  # from auth middleware
     access_date: "AccessDate"  # set by access_date decorator
     active_context: str  # set by active_context decorator
+    etag: str  # set by etag decorator
+    etag_version: object  # set by etag decorator
 
 
 class AuthenticatedRequest(HttpRequest):
@@ -120,14 +153,156 @@ class PaginatedResponse[T](Schema):
     size: int
     page: int
     pages: int
+    exact: bool = True  # whether count and pages are exact
 
 
-async def offset_paginate(queryset, *, page: int, size: int):
+class CursorPaginatedResponse[T](Schema):
+    items: list[T]
+    count: int | None  # None when paginated by cursor
+    size: int
+    page: int | None
+    pages: int | None
+    exact: bool = True
+    next_cursor: str | None
+
+
+type CountStrategy = Literal["exact", "cached", "estimate"]
+
+
+def count_cache_key(queryset: QuerySet):
+    sql, params = queryset.order_by().query.sql_with_params()
+    return f"count:{sha256(f'{sql}{params!r}'.encode()).hexdigest()}"
+
+
+def estimate_count(queryset: QuerySet) -> int:
+    query = queryset.order_by().query
+    with connections[queryset.db].cursor() as cursor:
+        if not query.where and not query.distinct and not query.combinator and not query.is_sliced:
+            # unfiltered scan, planner statistics of the table are enough
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [query.model._meta.db_table]
+            )
+            return cursor.fetchone()[0]
+
+        sql, params = query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_queryset(queryset: QuerySet, strategy: CountStrategy = "exact") -> tuple[int, bool]:
+    if strategy == "estimate":
+        # reltuples is -1 for tables never analyzed and small estimates are cheap to count exactly
+        estimated = await sync_to_async(estimate_count)(queryset)
+        if estimated >= settings.PAGINATION_ESTIMATE_THRESHOLD:
+            return estimated, False
+
+    elif strategy == "cached":
+        key = count_cache_key(queryset)
+        if (count := await cache.aget(key)) is not None:
+            return count, False
+        count = await queryset.acount()
+        await cache.aset(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count, True
+
+    return await queryset.acount(), True
+
+
+async def offset_paginate(queryset, *, page: int, size: int, count_strategy: CountStrategy = "exact"):
     offset = (page - 1) * size
-    count = await queryset.acount()
+    count, exact = await count_queryset(queryset, count_strategy)
     pages = math.ceil(count / size) if count > 0 else 1
     items = [item async for item in queryset[offset : offset + size]]
-    return {"items": items, "count": count, "size": size, "page": page, "pages": pages}
+    return {"items": items, "count": count, "size": size, "page": page, "pages": pages, "exact": exact}
+
+
+def cursor_ordering(queryset: QuerySet):
+    # Keyset pagination needs a total order, so the primary key is appended as a tiebreaker.
+    # Ordering columns are assumed to be non-null.
+    ordering = list(queryset.query.order_by or queryset.query.get_meta().ordering)
+    for field in ordering:
+        if not isinstance(field, str) or field == "?":
+            raise ImproperlyConfigured(f"Cursor pagination requires field name ordering, got {field!r}")
+
+    pk_names = {"pk", queryset.model._meta.pk.name}
+    if not any(field.lstrip("-") in pk_names for field in ordering):
+        ordering.append("-pk" if not ordering or ordering[-1].startswith("-") else "pk")
+    return ordering
+
+
+def encode_cursor(ordering: list[str], item: Any):
+    values = []
+    for field in ordering:
+        name = field.lstrip("-")
+        if isinstance(item, dict):
+            value = item[name]
+        else:
+            value = item
+            for attr in name.split("__"):
+                value = getattr(value, attr)
+        values.append(value)
+    return base64.urlsafe_b64encode(msgspec.json.encode([ordering, values])).rstrip(b"=").decode()
+
+
+def decode_cursor(ordering: list[str], cursor: str) -> list[Any]:
+    try:
+        cursor_ordering_, values = msgspec.json.decode(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)), type=tuple[list[str], list[Any]]
+        )
+    except msgspec.DecodeError, ValueError, TypeError:
+        raise ValueError(ErrorCode.INVALID_CURSOR)
+    if cursor_ordering_ != ordering or len(values) != len(ordering):
+        raise ValueError(ErrorCode.INVALID_CURSOR)
+    return values
+
+
+def keyset_filter(ordering: list[str], values: list[Any]):
+    # (a, b) after (x, y) == a > x OR (a = x AND b > y), with the direction of each column
+    condition = Q()
+    equal: dict[str, Any] = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= Q(**equal, **{f"{name}__{lookup}": value})
+        equal[name] = value
+    return condition
+
+
+async def cursor_paginate(queryset, *, cursor: str, size: int):
+    ordering = cursor_ordering(queryset)
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(ordering, cursor)))
+
+    # one extra row tells whether a next page exists, without counting
+    items = [item async for item in queryset[: size + 1]]
+    next_cursor = encode_cursor(ordering, items[size - 1]) if len(items) > size else None
+    return {
+        "items": items[:size],
+        "count": None,
+        "size": size,
+        "page": None,
+        "pages": None,
+        "exact": False,
+        "next_cursor": next_cursor,
+    }
+
+
+async def hybrid_paginate(
+    queryset, *, page: int, size: int, cursor: str | None, count_strategy: CountStrategy = "exact"
+):
+    # Offset clients keep working and receive a cursor to continue with; cursor clients skip the count.
+    if cursor is not None:
+        return await cursor_paginate(queryset, cursor=cursor, size=size)
+
+    ordering = cursor_ordering(queryset)
+    paginated = await offset_paginate(queryset.order_by(*ordering), page=page, size=size, count_strategy=count_strategy)
+    items = paginated["items"]
+    next_cursor = encode_cursor(ordering, items[-1]) if items and page < paginated["pages"] else None
+    return {**paginated, "next_cursor": next_cursor}
 
 
 class Pagination(AsyncPaginationBase):
@@ -141,12 +316,260 @@ class Pagination(AsyncPaginationBase):
         size: int
         page: int
         pages: int
+        exact: bool
+
+    def __init__(self, *, count_strategy: CountStrategy = "exact", **kwargs: Any):
+        super().__init__(**kwargs)
+        self.count_strategy = count_strategy
 
     def paginate_queryset(self, *args, **kwargs):
         pass
 
     async def apaginate_queryset(self, queryset: QuerySet, pagination: Any, request: DjangoHttpRequest, **params: Any):
-        return await offset_paginate(queryset, page=pagination.page, size=pagination.size)
+        return await offset_paginate(
+            queryset, page=pagination.page, size=pagination.size, count_strategy=self.count_strategy
+        )
+
+
+class CursorPagination(Pagination):
+    # Without cursor it paginates by offset, so existing clients keep working.
+    # An empty cursor starts keyset pagination from the first row.
+
+    class Input(Pagination.Input):
+        cursor: Annotated[str | None, functions.Query(None)]
+
+    class Output(AsyncPaginationBase.Output):
+        model_config = Schema.model_config
+
+        items: list[Any]
+        count: int | None
+        size: int
+        page: int | None
+        pages: int | None
+        exact: bool
+        next_cursor: str | None
+
+    async def apaginate_queryset(self, queryset: QuerySet, pagination: Any, request: DjangoHttpRequest, **params: Any):
+        return await hybrid_paginate(
+            queryset,
+            page=pagination.page,
+            size=pagination.size,
+            cursor=pagination.cursor,
+            count_strategy=self.count_strategy,
+        )
+
+
+def _convert_value(value: Any):
+    # same conversion as ninja DjangoGetter
+    if isinstance(value, Manager):
+        return list(value.all())
+    if isinstance(value, QuerySet):
+        return list(value)
+    if callable(value):
+        return value()
+    if isinstance(value, FieldFile):
+        return value.url if value else None
+    return value
+
+
+def _has_float(annotation: Any) -> bool:
+    return annotation is float or any(_has_float(arg) for arg in get_args(annotation))
+
+
+def compile_struct(annotation: Any, *, by_alias: bool = True) -> tuple[Any, Callable[[Any], Any] | None]:
+    # Returns the msgspec type and a builder turning ORM rows or dicts into it, None when values pass through as is
+    origin = get_origin(annotation)
+
+    if origin is Annotated:
+        return compile_struct(get_args(annotation)[0], by_alias=by_alias)
+
+    if origin in (Union, UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not NoneType]
+        if len(args) == 1:
+            struct_type, build = compile_struct(args[0], by_alias=by_alias)
+            nullable = struct_type | None if NoneType in get_args(annotation) else struct_type
+            return nullable, build and (lambda value: None if value is None else build(value))
+
+    if origin is list:
+        struct_type, build = compile_struct(get_args(annotation)[0], by_alias=by_alias)
+        return list[struct_type], build and (lambda value: [build(item) for item in value])
+
+    if isinstance(annotation, type) and issubclass(annotation, RootModel):
+        return compile_struct(annotation.model_fields["root"].annotation, by_alias=by_alias)
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _compile_model_struct(annotation, by_alias=by_alias)
+
+    if origin is not None and any(isinstance(arg, type) and issubclass(arg, BaseModel) for arg in get_args(annotation)):
+        raise TypeError(f"Unsupported struct response type {annotation!r}")
+
+    # pydantic turns ints into floats
+    if _has_float(annotation):
+        return annotation, lambda value: msgspec.convert(value, annotation)
+    return annotation, None
+
+
+def _compile_model_struct(model: type[BaseModel], *, by_alias: bool):
+    resolvers = getattr(model, "_ninja_resolvers", {})
+    fields: list[tuple[str, Any]] = []
+    rename: dict[str, str] = {}
+    plan: list[tuple[str, Callable | None, Callable | None, FieldInfo]] = []
+
+    for name, field in model.model_fields.items():
+        struct_type, build = compile_struct(field.annotation, by_alias=by_alias)
+        fields.append((name, struct_type))
+        rename[name] = (field.serialization_alias or field.alias or name) if by_alias else name
+
+        resolver = resolvers.get(name)
+        if resolver and (not resolver._static or resolver._takes_context):
+            raise TypeError(f"Unsupported resolver {model.__name__}.resolve_{name}")
+        plan.append((name, resolver and resolver._func, build, field))
+
+    struct = msgspec.defstruct(model.__name__, fields, rename=rename, module=model.__module__)
+
+    def build(obj: Any):
+        values = []
+        for name, resolver, build_value, field in plan:
+            try:
+                if resolver:
+                    value = resolver(obj)
+                else:
+                    value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            except AttributeError, KeyError:
+                if field.is_required():
+                    raise
+                value = field.get_default(call_default_factory=True)
+            value = _convert_value(value)
+            if build_value and value is not None:
+                value = build_value(value)
+            values.append(value)
+        return struct(*values)
+
+    return struct, build
+
+
+def struct_response(func: Callable):
+    # Encodes the declared response through msgspec structs compiled from its schemas, without pydantic validation
+    compiled: dict[str, Any] = {}
+
+    def compile_operation(op: Operation):
+        if op.exclude_unset or op.exclude_defaults or op.exclude_none or len(op.response_models) != 1:
+            raise ConfigError(f"{func.__name__} can not use struct response")
+        [(status, response_model)] = op.response_models.items()
+        _, build = compile_struct(response_model.model_fields["response"].annotation, by_alias=op.by_alias)
+        compiled.update(op=op, status=status, build=build or (lambda value: value))
+
+    @wraps(func)
+    async def view(request: DjangoHttpRequest, **kwargs: Any):
+        result = await func(request, **kwargs)
+        if isinstance(result, HttpResponseBase):
+            return result
+        return compiled["op"].api.create_response(request, compiled["build"](result), status=compiled["status"])
+
+    contribute_operation_callback(view, compile_operation)
+    return view
+
+
+def raw_response(func: Callable):
+    # The view returns the response body already encoded as JSON, the renderer writes it through msgspec.Raw as is
+    compiled: dict[str, Any] = {}
+
+    def compile_operation(op: Operation):
+        if len(op.response_models) != 1:
+            raise ConfigError(f"{func.__name__} can not use raw response")
+        [status] = op.response_models
+        compiled.update(op=op, status=status)
+
+    @wraps(func)
+    async def view(request: DjangoHttpRequest, **kwargs: Any):
+        result = await func(request, **kwargs)
+        if isinstance(result, HttpResponseBase):
+            return result
+        return compiled["op"].api.create_response(request, msgspec.Raw(result), status=compiled["status"])
+
+    contribute_operation_callback(view, compile_operation)
+    return view
+
+
+async def modified_version(*querysets: QuerySet):
+    # row count catches deletions, which leave the latest modified timestamp unchanged
+    return [await qs.order_by().aaggregate(modified=Max("modified"), count=Count("pk")) for qs in querysets]
+
+
+def model_version_key(model: type[Model], scope: object = None):
+    key = f"version:{model._meta.label_lower}"
+    return key if scope is None else f"{key}:{scope}"
+
+
+async def cache_version(*keys: str):
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            # a reset counter must not repeat a version served before
+            await cache.aadd(key, time.time_ns(), None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+async def model_version(*models: type[Model]):
+    return await cache_version(*[model_version_key(model) for model in models])
+
+
+def bump_cache_version(*keys: str):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def bump_model_version(*models: type[Model]):
+    bump_cache_version(*[model_version_key(model) for model in models])
+
+
+def _bump_sender_version(model: type[Model], scope: str | None, /, *, instance: Model, **kwargs: object):
+    # positional only, m2m_changed sends a model argument of its own
+    bump_cache_version(model_version_key(model, getattr(instance, scope) if scope else None))
+
+
+def track_model_version(*models: type[Model], scope: str | None = None):
+    # queryset update() and bulk operations send no signals, call bump_model_version after them
+    # scope names an attribute that splits the version per value, e.g. "user_id"
+    for model in models:
+        uid = model_version_key(model)
+        receiver = partial(_bump_sender_version, model, scope)
+        post_save.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+        if scope:
+            continue
+        for field in model._meta.local_many_to_many:
+            through = field.remote_field.through
+            m2m_changed.connect(receiver, sender=through, weak=False, dispatch_uid=f"{uid}:{field.name}")
+
+
+def etag(version: Callable[..., Awaitable[object]]):
+    # Answers If-None-Match with 304 from a cheap version lookup, before the view queries or serializes anything.
+    # The version callable receives the request and the view kwargs, the view reads it back from the request.
+    # Payloads with signed urls need a time bucket shorter than the url expiry in the version, a 304 would otherwise
+    # keep confirming expired urls, cf. Course.get_detail_version.
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(request: HttpRequest, *args, **kwargs):
+            request.etag_version = await version(request, **kwargs)
+            digest = sha256(msgspec.json.encode([request.get_full_path(), request.etag_version]))
+            request.etag = f'"{digest.hexdigest()[:32]}"'
+
+            if_none_match = request.headers.get("If-None-Match")
+            if if_none_match:
+                etags = [tag.removeprefix("W/") for tag in parse_etags(if_none_match)]
+                if "*" in etags or request.etag in etags:
+                    return HttpResponseNotModified(headers={"ETag": request.etag})
+
+            return await func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
 
 
 def no_auth_required(request: HttpRequest):
@@ -3,7 +3,7 @@ from django.db.models import Prefetch, Q
 from ninja import Query, Router
 
 from apps.common.error import ErrorCode
-from apps.common.util import HttpRequest
+from apps.common.util import HttpRequest, etag, model_version
 from apps.competency.api.schema import (
     CertificateFilterSchema,
     CertificateSchema,
@@ -58,6 +58,7 @@ async def delete_competency_goal(request: HttpRequest, id: int):
 
 
 @router.get("/classification/tree", response=list[ClassificationTreeNodeSchema])
+@etag(lambda request: model_version(Classification))
 async def get_classification_tree(request: HttpRequest):
     return await Classification.get_tree_data()
 
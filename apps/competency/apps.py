@@ -6,3 +6,10 @@ class CompetencyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.competency"
     verbose_name = _("Competency")
+
+    def ready(self):
+        from apps.common.util import track_model_version
+        from apps.competency.models import Classification
+
+        # classification tree etag
+        track_model_version(Classification)
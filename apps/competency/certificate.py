@@ -2,14 +2,11 @@ import logging
 from io import BytesIO
 from typing import Literal, TypedDict
 
-import pypdfium2 as pdfium
-import qrcode
 from asgiref.sync import sync_to_async
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import UploadedFile
 from django.utils.translation import gettext as _
-from fpdf import FPDF
 
 log = logging.getLogger(__name__)
 
@@ -68,6 +65,8 @@ def hex_to_rgb(hex_color: str):
 
 
 async def generate_thumbnail_from_pdf(pdf_bytes: bytes | bytearray) -> BytesIO:
+    import pypdfium2 as pdfium
+
     pdf = await sync_to_async(pdfium.PdfDocument)(pdf_bytes)
     page = pdf[0]
 
@@ -90,6 +89,9 @@ async def generate_certificate(
     data: CertificateAwardFullDataDict,
     verification_url: str,
 ) -> tuple[ContentFile, ContentFile]:
+    import qrcode
+    from fpdf import FPDF
+
     page_width, page_height = template["page_size"]
 
     pdf = FPDF(orientation="P", unit="mm", format=(page_width, page_height))
@@ -8,6 +8,7 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils.translation import gettext as _
 
+from apps.common.util import bump_model_version
 from apps.competency.models import Classification, Factor, Skill
 
 
@@ -110,6 +111,7 @@ class Command(BaseCommand):
                 existing_classifications[code] = new_node
 
         Classification.fix_tree()
+        bump_model_version(Classification)
 
     def _import_competency_skills_and_factors(self, workbook: openpyxl.Workbook, version: str):
         competency_sheet = workbook.worksheets[0]
@@ -2,7 +2,7 @@ import base64
 import gzip
 from typing import Annotated
 
-from pydantic import EncodedStr, EncoderProtocol
+from pydantic import EncodedBytes, EncodedStr, EncoderProtocol, PlainSerializer
 
 
 def gzip_compress(data: bytes, level: int = 9):
@@ -49,3 +49,27 @@ class GzipOutEncoder(EncoderProtocol):
 
 
 GzipOutEncodedType = Annotated[str, EncodedStr(encoder=GzipOutEncoder)]
+
+
+# bit strings packed eight bits to a byte, most significant first, cf. apps.content.models.pack_watch_bits
+class PackedBitsInEncoder(EncoderProtocol):
+    @classmethod
+    def decode(cls, data: bytes):
+        return base64.b64decode(data)
+
+    @classmethod
+    def encode(cls, value: bytes):
+        return value
+
+    @classmethod
+    def get_json_format(cls):
+        return ""
+
+
+PackedBitsInEncodedType = Annotated[bytes, EncodedBytes(encoder=PackedBitsInEncoder)]
+
+
+# msgspec would encode bytes to base64 as well, serialized here so every renderer agrees
+PackedBitsOutEncodedType = Annotated[
+    bytes, PlainSerializer(lambda value: base64.b64encode(value).decode(), return_type=str)
+]
@@ -4,7 +4,12 @@ from pydantic.fields import Field
 
 from apps.account.api.schema import OwnerSchema
 from apps.common.schema import LearningObjectMixinSchema, Schema, TimeStampedMixinSchema
-from apps.content.api.encoder import GzipInEncodedType, GzipOutEncodedType
+from apps.content.api.encoder import (
+    GzipInEncodedType,
+    GzipOutEncodedType,
+    PackedBitsInEncodedType,
+    PackedBitsOutEncodedType,
+)
 from apps.content.models import Note
 
 
@@ -28,11 +33,15 @@ class SubtitleSchema(Schema):
 class WatchOutSchema(Schema):
     last_position: float
     watch_bits: Annotated[GzipOutEncodedType | None, Field(None, description="Gzip compressed Bit String")]
+    packed_bits: Annotated[PackedBitsOutEncodedType | None, Field(None, description="Packed Bit String")]
+    bit_length: int | None = None
 
 
 class WatchInSchema(Schema):
     last_position: float
     watch_bits: Annotated[GzipInEncodedType, Field(None, description="Gzip compressed Bit String")]
+    packed_bits: Annotated[PackedBitsInEncodedType, Field(None, description="Packed Bit String, with bitLength")]
+    bit_length: int | None = None
 
 
 class NoteSchema(TimeStampedMixinSchema):
@@ -7,7 +7,7 @@ from ninja.files import UploadedFile
 from ninja.params import Form, functions
 from ninja.router import Router
 
-from apps.common.util import HttpRequest, PaginatedResponse
+from apps.common.util import HttpRequest, PaginatedResponse, etag, model_version
 from apps.content.api.schema import (
     MediaSchema,
     NoteSaveSchema,
@@ -18,7 +18,7 @@ from apps.content.api.schema import (
     WatchOutSchema,
 )
 from apps.content.documents import get_search_suggestion
-from apps.content.models import Media, Note, Subtitle, Watch
+from apps.content.models import Media, Note, Subtitle, Watch, pack_watch_bits
 from apps.learning.api.access_control import access_date, active_context
 
 router = Router(by_alias=True)
@@ -34,6 +34,7 @@ async def get_media(request: HttpRequest, id: str):
 
 @router.get("/media/{id}/subtitle", response=list[SubtitleSchema])
 @access_date("content", "media")
+@etag(lambda request, id: model_version(Subtitle))
 async def get_subtitles(request: HttpRequest, id: str):
     return [s async for s in Subtitle.objects.filter(media_id=id)]
 
@@ -41,14 +42,23 @@ async def get_subtitles(request: HttpRequest, id: str):
 @router.get("/media/{id}/watch", response=WatchOutSchema)
 @active_context()
 @access_date("content", "media")
-async def get_media_watch(request: HttpRequest, id: str):
-    return await aget_object_or_404(Watch, user_id=request.auth, media_id=id, context=request.active_context)
+async def get_media_watch(request: HttpRequest, id: str, packed: bool = False):
+    await Watch.aflush_buffered_watch(media_id=id, user_id=request.auth, context=request.active_context)
+    watch = await aget_object_or_404(Watch, user_id=request.auth, media_id=id, context=request.active_context)
+    if packed and watch.watch_bits:
+        return {
+            "last_position": watch.last_position,
+            "packed_bits": pack_watch_bits(watch.watch_bits),
+            "bit_length": len(watch.watch_bits),
+        }
+    return watch
 
 
 @router.delete("/media/{id}/watch")
 @active_context()
 @access_date("content", "media")
 async def delete_media_watch(request: HttpRequest, id: str):
+    await Watch.adiscard_buffered_watch(media_id=id, user_id=request.auth, context=request.active_context)
     await Watch.objects.filter(media_id=id, user_id=request.auth, context=request.active_context).adelete()
 
 
@@ -56,12 +66,14 @@ async def delete_media_watch(request: HttpRequest, id: str):
 @active_context()
 @access_date("content", "media")
 async def update_media_watch(request: HttpRequest, id: str, data: WatchInSchema):
-    await Watch.update_media_watch(
+    await Watch.buffer_media_watch(
         media_id=id,
         user_id=request.auth,
         context=request.active_context,
         last_position=data.last_position,
         watch_bits=data.watch_bits,
+        packed_bits=data.packed_bits,
+        bit_length=data.bit_length,
     )
 
 
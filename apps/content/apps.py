@@ -6,3 +6,10 @@ class ContentConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.content"
     verbose_name = _("Content")
+
+    def ready(self):
+        from apps.common.util import track_model_version
+        from apps.content.models import Subtitle
+
+        # subtitle etag
+        track_model_version(Subtitle)
@@ -1,11 +1,15 @@
 import logging
+from functools import cache
 from typing import TYPE_CHECKING, Sequence, TypedDict
 
+import msgspec
 import pghistory
+import redis
 from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files import File
-from django.db import connection
+from django.db import DatabaseError, connection
 from django.db.backends.base.base import BaseDatabaseWrapper
 from django.db.models import (
     CASCADE,
@@ -15,6 +19,7 @@ from django.db.models import (
     Count,
     DateTimeField,
     DurationField,
+    Exists,
     Field,
     FloatField,
     ForeignKey,
@@ -22,6 +27,8 @@ from django.db.models import (
     Index,
     Model,
     OneToOneField,
+    OuterRef,
+    Subquery,
     TextChoices,
     TextField,
     UniqueConstraint,
@@ -40,7 +47,9 @@ User = get_user_model()
 log = logging.getLogger(__name__)
 
 
+UNWATCH = "0"
 WATCH = "1"
+WATCH_BUFFER_DIRTY_KEY = "watch:dirty"
 
 
 class VarBitField(Field):
@@ -48,6 +57,39 @@ class VarBitField(Field):
         return "varbit"
 
 
+def pack_watch_bits(watch_bits: str):
+    # most significant bit first, the order of redis bitmaps and postgres bit strings
+    size = (len(watch_bits) + 7) // 8
+    return int(watch_bits.ljust(size * 8, UNWATCH), 2).to_bytes(size, "big")
+
+
+def _watch_bits_input(watch_bits: str | None, packed_bits: bytes | None, bit_length: int | None):
+    # heartbeat bits from the text or the packed wire format, packed with their length
+    if packed_bits is None:
+        if watch_bits is None:
+            return None
+        if not watch_bits or set(watch_bits) - {UNWATCH, WATCH}:
+            raise ValueError("watch_bits must be a non-empty bit string")
+        return pack_watch_bits(watch_bits), len(watch_bits)
+
+    if bit_length is None or bit_length <= 0 or len(packed_bits) != (bit_length + 7) // 8:
+        raise ValueError("packed_bits must hold bit_length bits")
+    # padding past the length is cleared, it would count as watched
+    padding = len(packed_bits) * 8 - bit_length
+    return packed_bits[:-1] + bytes([packed_bits[-1] >> padding << padding]), bit_length
+
+
+def _packed_bits_sql(packed_bits: str, bit_length: str):
+    # bytea to varbit through the hex input form of bit strings, cut to the length
+    return f"SUBSTRING(('x' || ENCODE({packed_bits}, 'hex'))::varbit, 1, {bit_length})"
+
+
+@cache
+def _watch_buffer_client():
+    # a dedicated client, buffer keys are plain keys rather than versioned cache entries
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
 class MatchedLineDict(TypedDict):
     start: int
     line: str
@@ -101,7 +143,7 @@ class Media(LearningObjectMixin):
 
         if not q:
             searched = None
-            paginated = await offset_paginate(qs, page=page, size=size)
+            paginated = await offset_paginate(qs, page=page, size=size, count_strategy="estimate")
         else:
             # document search
             searched = await sync_to_async(document_search)(q=q, page=page, size=size)
@@ -170,20 +212,27 @@ class Watch(TimeStampedMixin):
 
     @classmethod
     async def update_media_watch(
-        cls, *, media_id: str, user_id: str, context: str, last_position: float, watch_bits: str | None
+        cls,
+        *,
+        media_id: str,
+        user_id: str,
+        context: str,
+        last_position: float,
+        watch_bits: str | None = None,
+        packed_bits: bytes | None = None,
+        bit_length: int | None = None,
     ):
+        bits = _watch_bits_input(watch_bits, packed_bits, bit_length)
+
         def _execute_update():
-            if watch_bits is None:
+            if bits is None:
                 cls.objects.update_or_create(
                     media_id=media_id, user_id=user_id, context=context, defaults={"last_position": last_position}
                 )
                 return
 
-            if not watch_bits or set(watch_bits) - {"0", "1"}:
-                raise ValueError("watch_bits must be a non-empty bit string")
-
-            bit_length = len(watch_bits)
-            bit_count = watch_bits.count(WATCH)
+            packed, bit_length = bits
+            bit_count = int.from_bytes(packed, "big").bit_count()
 
             table = cls._meta.db_table
             media_table = Media._meta.db_table
@@ -191,7 +240,7 @@ class Watch(TimeStampedMixin):
             sql = f"""
                 WITH
                 input_bits AS (
-                    SELECT '{watch_bits}'::varbit AS bits
+                    SELECT {_packed_bits_sql("%(packed_bits)s", "%(bit_length)s")} AS bits
                 ),
                 media_info AS (
                     SELECT passing_point
@@ -249,7 +298,7 @@ class Watch(TimeStampedMixin):
                 "user_id": user_id,
                 "context": context,
                 "last_position": last_position,
-                # "watch_bits": watch_bits, # large data, to avoid repeating leteral data, use f-string
+                "packed_bits": packed,
                 "rate": bit_count * 100.0 / bit_length,
                 "bit_length": bit_length,
             }
@@ -259,6 +308,212 @@ class Watch(TimeStampedMixin):
 
         await sync_to_async(_execute_update, thread_sensitive=True)()
 
+    @staticmethod
+    def _buffer_keys(member: str):
+        # buffered bits and state until the flush, goal and seen bits (stored OR buffered) kept across flushes
+        return f"watch:bits:{member}", f"watch:state:{member}", f"watch:goal:{member}", f"watch:seen:{member}"
+
+    @staticmethod
+    def _buffer_member(*, user_id: str, media_id: str, context: str):
+        return msgspec.json.encode([user_id, media_id, context]).decode()
+
+    @classmethod
+    async def buffer_media_watch(
+        cls,
+        *,
+        media_id: str,
+        user_id: str,
+        context: str,
+        last_position: float,
+        watch_bits: str | None = None,
+        packed_bits: bytes | None = None,
+        bit_length: int | None = None,
+    ):
+        # Heartbeats are merged in redis per (user, media, context), bits OR-ed and the latest position kept, and
+        # written by flush_watch_buffer. The heartbeat that brings the stored and buffered bits to the passing point
+        # is written at once, counted on seen bits seeded from the stored row together with the goal.
+        bits = _watch_bits_input(watch_bits, packed_bits, bit_length)
+
+        client = _watch_buffer_client()
+        member = cls._buffer_member(user_id=user_id, media_id=media_id, context=context)
+        bits_key, state_key, goal_key, seen_key = cls._buffer_keys(member)
+
+        def _execute_buffer():
+            with client.pipeline() as pipe:
+                if bits is None:
+                    pipe.hset(state_key, "position", last_position)
+                else:
+                    pipe.exists(seen_key)
+                    pipe.set(f"{bits_key}:in", bits[0])
+                    pipe.bitop("OR", bits_key, bits_key, f"{bits_key}:in")
+                    pipe.bitop("OR", seen_key, seen_key, f"{bits_key}:in")
+                    pipe.delete(f"{bits_key}:in")
+                    pipe.hset(state_key, mapping={"position": last_position, "length": bits[1]})
+                    pipe.bitcount(seen_key, 0, bits[1] - 1, "BIT")
+                pipe.sadd(WATCH_BUFFER_DIRTY_KEY, member)
+                pipe.hgetall(goal_key)
+                return pipe.execute()
+
+        # redis only, heartbeats are not serialized on the thread sensitive executor the database runs on
+        *replies, goal = await sync_to_async(_execute_buffer, thread_sensitive=False)()
+        if bits is None:
+            return
+
+        seen, bit_count = replies[0], replies[6]
+        if goal and seen:
+            passing_point, passed = int(goal[b"passing_point"]), goal[b"passed"] == b"1"
+        else:
+            watch_qs = cls.objects.filter(user_id=user_id, media_id=OuterRef("id"), context=context)
+            passing_point, passed, stored_bits = await (
+                Media.objects
+                .filter(id=media_id)
+                .annotate(
+                    passed=Exists(watch_qs.filter(passed=True)), stored_bits=Subquery(watch_qs.values("watch_bits")[:1])
+                )
+                .values_list("passing_point", "passed", "stored_bits")
+                .aget()
+            )
+
+            def _execute_seed():
+                with client.pipeline() as pipe:
+                    pipe.hset(goal_key, mapping={"passing_point": passing_point, "passed": int(passed)})
+                    if stored_bits:
+                        pipe.set(f"{bits_key}:in", pack_watch_bits(stored_bits))
+                        pipe.bitop("OR", seen_key, seen_key, f"{bits_key}:in")
+                        pipe.delete(f"{bits_key}:in")
+                    pipe.expire(goal_key, settings.WATCH_GOAL_CACHE_TIMEOUT)
+                    pipe.expire(seen_key, settings.WATCH_GOAL_CACHE_TIMEOUT)
+                    pipe.bitcount(seen_key, 0, bits[1] - 1, "BIT")
+                    return pipe.execute()[-1]
+
+            bit_count = await sync_to_async(_execute_seed, thread_sensitive=False)()
+
+        if not passed and bit_count * 100.0 / bits[1] >= passing_point:
+
+            def _execute_flush():
+                client.srem(WATCH_BUFFER_DIRTY_KEY, member)
+                cls.flush_watch_buffer([member])
+                client.hset(goal_key, "passed", 1)
+
+            await sync_to_async(_execute_flush, thread_sensitive=True)()
+
+    @classmethod
+    def flush_watch_buffer(cls, members: list[str] | None = None):
+        # One multi-row upsert for a batch of buffered heartbeats, merged into the stored bits like update_media_watch
+        client = _watch_buffer_client()
+        if members is None:
+            members = [m.decode() for m in client.spop(WATCH_BUFFER_DIRTY_KEY, settings.WATCH_FLUSH_BATCH_SIZE)]
+
+        with client.pipeline() as pipe:
+            for member in members:
+                bits_key, state_key, _goal_key, _seen_key = cls._buffer_keys(member)
+                pipe.getdel(bits_key)
+                pipe.hgetall(state_key)
+                pipe.delete(state_key)
+            replies = pipe.execute()
+
+        # a member is empty when another flush took it first
+        taken = [(member, bits, state) for member, bits, state in zip(members, replies[::3], replies[1::3]) if state]
+        rows = []
+        for member, bits, state in taken:
+            user_id, media_id, context = msgspec.json.decode(member)
+            bit_length = int(state[b"length"]) if bits else None
+            rows.append((user_id, media_id, context, bits, bit_length, float(state[b"position"])))
+
+        if rows:
+            table = cls._meta.db_table
+            media_table = Media._meta.db_table
+            user_table = User._meta.db_table
+            # rows of a media or user deleted while buffered are dropped by the joins
+            # bits are merged into the locked row in the conflict update, a row read before the lock may be stale
+            sql = f"""
+                WITH
+                input AS (
+                    SELECT user_id, media_id, context, {_packed_bits_sql("bits", "bit_length")} AS bits, last_position
+                    FROM unnest(%s::text[], %s::text[], %s::text[], %s::bytea[], %s::int[], %s::float8[])
+                        AS i(user_id, media_id, context, bits, bit_length, last_position)
+                ),
+                final AS (
+                    SELECT i.*, m.passing_point, COALESCE(BIT_COUNT(i.bits) * 100.0 / NULLIF(LENGTH(i.bits), 0), 0) AS rate
+                    FROM input i
+                    JOIN {media_table} m ON m.id = i.media_id
+                    JOIN {user_table} u ON u.id = i.user_id
+                )
+                INSERT INTO {table} (
+                    user_id, media_id, context, watch_bits, rate, passed, last_position, created, modified
+                )
+                SELECT user_id, media_id, context, bits, rate, rate >= passing_point, last_position, NOW(), NOW()
+                FROM final
+                ON CONFLICT (user_id, media_id, context)
+                DO UPDATE SET
+                    (watch_bits, rate, passed) = (
+                        SELECT merged.bits, r.rate, r.rate >= m.passing_point
+                        FROM {media_table} m
+                        CROSS JOIN LATERAL (
+                            SELECT
+                                CASE
+                                    WHEN EXCLUDED.watch_bits IS NULL THEN
+                                        {table}.watch_bits
+                                    WHEN {table}.watch_bits IS NULL THEN
+                                        EXCLUDED.watch_bits
+                                    WHEN LENGTH({table}.watch_bits) < LENGTH(EXCLUDED.watch_bits) THEN
+                                        RPAD({table}.watch_bits::text, LENGTH(EXCLUDED.watch_bits), '0')::varbit
+                                        | EXCLUDED.watch_bits
+                                    WHEN LENGTH({table}.watch_bits) > LENGTH(EXCLUDED.watch_bits) THEN
+                                        SUBSTRING({table}.watch_bits, 1, LENGTH(EXCLUDED.watch_bits)) | EXCLUDED.watch_bits
+                                    ELSE
+                                        {table}.watch_bits | EXCLUDED.watch_bits
+                                END AS bits
+                        ) merged
+                        CROSS JOIN LATERAL (
+                            SELECT COALESCE(BIT_COUNT(merged.bits) * 100.0 / NULLIF(LENGTH(merged.bits), 0), 0) AS rate
+                        ) r
+                        WHERE m.id = {table}.media_id
+                    ),
+                    last_position = EXCLUDED.last_position,
+                    modified = NOW();
+            """
+
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, [list(column) for column in zip(*rows)])
+            except DatabaseError:
+                # back into the buffer for the next flush, positions buffered meanwhile are newer and kept
+                with client.pipeline() as pipe:
+                    for member, bits, state in taken:
+                        bits_key, state_key, _goal_key, _seen_key = cls._buffer_keys(member)
+                        if bits:
+                            pipe.set(f"{bits_key}:in", bits)
+                            pipe.bitop("OR", bits_key, bits_key, f"{bits_key}:in")
+                            pipe.delete(f"{bits_key}:in")
+                        for field, value in state.items():
+                            pipe.hsetnx(state_key, field, value)
+                        pipe.sadd(WATCH_BUFFER_DIRTY_KEY, member)
+                    pipe.execute()
+                raise
+
+        return {"flushed_count": len(rows), "depth": client.scard(WATCH_BUFFER_DIRTY_KEY)}
+
+    @classmethod
+    async def aflush_buffered_watch(cls, *, media_id: str, user_id: str, context: str):
+        # read your own heartbeats, a pending entry is written before the row is read
+        member = cls._buffer_member(user_id=user_id, media_id=media_id, context=context)
+
+        if await sync_to_async(_watch_buffer_client().srem, thread_sensitive=False)(WATCH_BUFFER_DIRTY_KEY, member):
+            await sync_to_async(cls.flush_watch_buffer, thread_sensitive=True)([member])
+
+    @classmethod
+    async def adiscard_buffered_watch(cls, *, media_id: str, user_id: str, context: str):
+        member = cls._buffer_member(user_id=user_id, media_id=media_id, context=context)
+
+        def _execute_discard():
+            with _watch_buffer_client().pipeline() as pipe:
+                pipe.srem(WATCH_BUFFER_DIRTY_KEY, member)
+                pipe.delete(*cls._buffer_keys(member))
+                pipe.execute()
+
+        await sync_to_async(_execute_discard, thread_sensitive=False)()
+
 
 @pghistory.track()
 class Note(TimeStampedMixin, AttachmentMixin):
@@ -0,0 +1,16 @@
+import logging
+
+import pghistory
+from celery import shared_task
+
+from apps.content.models import Watch
+
+log = logging.getLogger(__name__)
+
+
+@shared_task(name="content.tasks.flush_watch_buffer")
+def flush_watch_buffer():
+    with pghistory.context(task="flush_watch_buffer"):
+        result = Watch.flush_watch_buffer()
+    log.info("watch buffer flushed %(flushed_count)s, depth %(depth)s", result)
+    return result
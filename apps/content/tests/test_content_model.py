@@ -1,8 +1,15 @@
+from uuid import uuid4
+
 import pytest
+from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.core.cache import cache
 from mimesis.plugins.factory import FactoryField
 from pytest_django import DjangoDbBlocker
 
+from apps.account.tests.factories import UserFactory
+from apps.common.util import count_cache_key, count_queryset
+from apps.content.models import Media, Watch, pack_watch_bits
 from apps.content.tests.factories import MediaFactory
 from conftest import AdminUser
 
@@ -12,6 +19,75 @@ def test_media():
     MediaFactory.create()
 
 
+@pytest.mark.django_db
+def test_media_count_strategy():
+    media = MediaFactory.create()
+    qs = Media.objects.filter(owner_id=media.owner_id)
+    exact_count = qs.count()
+
+    assert async_to_sync(count_queryset)(qs, "exact") == (exact_count, True)
+
+    # small estimates fall back to exact count
+    assert async_to_sync(count_queryset)(qs, "estimate") == (exact_count, True)
+
+    cache.delete(count_cache_key(qs))
+    assert async_to_sync(count_queryset)(qs, "cached") == (exact_count, True)
+    assert async_to_sync(count_queryset)(qs.order_by("-id"), "cached") == (exact_count, False)
+
+
+@pytest.mark.django_db
+def test_watch_buffer():
+    media = MediaFactory.create(url=f"https://example.com/{uuid4().hex}.mp4")
+    user = UserFactory.create()
+    buffer_media_watch = async_to_sync(Watch.buffer_media_watch)
+    key = {"media_id": media.pk, "user_id": user.pk, "context": ""}
+
+    assert pack_watch_bits("1000000011") == b"\x80\xc0"
+
+    buffer_media_watch(**key, last_position=1, watch_bits="1100000000")
+    buffer_media_watch(**key, last_position=3, watch_bits="0011000000")
+    buffer_media_watch(**key, last_position=4, watch_bits=None)
+    assert not Watch.objects.filter(user=user, media=media).exists()
+
+    Watch.flush_watch_buffer()
+    watch = Watch.objects.get(user=user, media=media)
+    assert (watch.watch_bits, watch.last_position, watch.rate, watch.passed) == ("1111000000", 4, 40, False)
+
+    # reaching the passing point is written without waiting for the flush, 40 flushed and 60 buffered
+    buffer_media_watch(**key, last_position=9, watch_bits="0000111111")
+    watch.refresh_from_db()
+    assert (watch.watch_bits, watch.last_position, watch.passed) == ("1111111111", 9, True)
+
+    # stored bits count towards the passing point of 80, neither 50 stored nor 30 buffered reach it alone
+    other = MediaFactory.create(url=f"https://example.com/{uuid4().hex}.mp4")
+    key = {"media_id": other.pk, "user_id": user.pk, "context": ""}
+    async_to_sync(Watch.update_media_watch)(**key, last_position=5, watch_bits="1111100000")
+    buffer_media_watch(**key, last_position=8, watch_bits="0000011100")
+    watch = Watch.objects.get(user=user, media=other)
+    assert (watch.watch_bits, watch.last_position, watch.rate, watch.passed) == ("1111111100", 8, 80, True)
+
+
+@pytest.mark.django_db
+def test_watch_packed_bits():
+    media = MediaFactory.create(url=f"https://example.com/{uuid4().hex}.mp4")
+    user = UserFactory.create()
+    update_media_watch = async_to_sync(Watch.update_media_watch)
+    key = {"media_id": media.pk, "user_id": user.pk, "context": ""}
+
+    # padding past the length does not count
+    update_media_watch(**key, last_position=2, packed_bits=b"\xc0\xff", bit_length=10)
+    watch = Watch.objects.get(user=user, media=media)
+    assert (watch.watch_bits, watch.rate) == ("1100000011", 40)
+
+    # text and packed heartbeats merge into the same bits
+    update_media_watch(**key, last_position=3, watch_bits="0010000000")
+    watch.refresh_from_db()
+    assert watch.watch_bits == "1110000011"
+
+    with pytest.raises(ValueError):
+        update_media_watch(**key, last_position=3, packed_bits=b"\xff", bit_length=10)
+
+
 @pytest.mark.load_data
 def test_load_media_data(db_no_rollback: DjangoDbBlocker, admin_user: AdminUser):
     with FactoryField.override_locale(settings.DEFAULT_LANGUAGE):
@@ -1,24 +1,35 @@
 from asgiref.sync import async_to_sync
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import IntegrityError
+from django.db.models import Model, QuerySet
+from django.shortcuts import redirect
 from django.utils.translation import gettext as _
 from django_jsonform.forms.fields import JSONFormField
 from unfold.decorators import action
 
-from apps.common.admin import HiddenModelAdmin, ModelAdmin, TabularInline
+from apps.common.admin import HiddenModelAdmin, ModelAdmin, ReadOnlyModelAdmin, TabularInline
 from apps.common.util import AuthenticatedRequest
 from apps.competency.models import Certificate
+from apps.course import tasks
 from apps.course.models import (
     TEMPLATE_SCHEDULES,
     Assessment,
+    AssessmentPassRate,
+    Completion,
+    CompletionDistribution,
+    CompletionQueue,
     Course,
     CourseInstructor,
     CourseSurvey,
     Engagement,
     Gradebook,
+    GradeQueue,
     GradingPolicy,
     Lesson,
+    LessonDropOff,
     LessonMedia,
     MessagePreset,
+    ScoreDistribution,
 )
 from apps.operation.models import Category
 
@@ -73,6 +84,8 @@ class CourseAdmin(ModelAdmin[Course]):
         RelatedCourseInline,
     )
 
+    actions = ["grade_course", "clone_course"]
+
     def get_fields(self, request, obj=None):
         return [
             f
@@ -80,6 +93,32 @@ class CourseAdmin(ModelAdmin[Course]):
             if f not in ("categories", "certificates", "related_courses")
         ]
 
+    @action(description=_("Grade all engagements"), permissions=["grade"])
+    def grade_course(self, request: AuthenticatedRequest, queryset: QuerySet[Course]):
+        for course in queryset:
+            result = tasks.grade_course.delay(course.pk, request.user.pk)
+            self.message_user(
+                request,
+                _("Grading %(course)s in the background (task %(task_id)s)") % {"course": course, "task_id": result.id},
+                messages.INFO,
+            )
+
+    def has_grade_permission(self, request: AuthenticatedRequest):
+        return request.user.is_superuser
+
+    @action(description=_("Clone courses"), permissions=["add"])
+    def clone_course(self, request: AuthenticatedRequest, queryset: QuerySet[Course]):
+        for course in queryset:
+            try:
+                clone_id = Course.clone(course_id=course.pk, owner_id=request.user.pk)
+            except IntegrityError:
+                # owner and title are unique, the copy title is taken
+                self.message_user(request, _("%(course)s is already cloned") % {"course": course}, messages.ERROR)
+                continue
+            self.message_user(
+                request, _("Cloned %(course)s to %(clone_id)s") % {"course": course, "clone_id": clone_id}
+            )
+
 
 @admin.register(Lesson)
 class LessonAdmin(HiddenModelAdmin[Lesson]):
@@ -139,6 +178,58 @@ class GradebookAdmin(ModelAdmin[Gradebook]):
     pass
 
 
+@admin.register(GradeQueue)
+class GradeQueueAdmin(ReadOnlyModelAdmin[GradeQueue]):
+    pass
+
+
+@admin.register(Completion)
+class CompletionAdmin(ReadOnlyModelAdmin[Completion]):
+    pass
+
+
+@admin.register(CompletionQueue)
+class CompletionQueueAdmin(ReadOnlyModelAdmin[CompletionQueue]):
+    pass
+
+
+class AnalyticsModelAdmin[T: Model](ReadOnlyModelAdmin[T]):
+    actions_list = ["refresh_analytics"]
+
+    @action(description=_("Refresh analytics"), url_path="refresh-analytics", permissions=["refresh_analytics"])
+    def refresh_analytics(self, request: AuthenticatedRequest):
+        result = tasks.refresh_analytics.delay()
+        self.message_user(
+            request, _("Refreshing analytics in the background (task %(task_id)s)") % {"task_id": result.id}
+        )
+        return redirect(f"admin:{self.model._meta.app_label}_{self.model._meta.model_name}_changelist")
+
+    def has_refresh_analytics_permission(self, request: AuthenticatedRequest):
+        return request.user.is_staff
+
+
+@admin.register(CompletionDistribution)
+class CompletionDistributionAdmin(AnalyticsModelAdmin[CompletionDistribution]):
+    ordering = ("course", "bucket")
+
+
+@admin.register(ScoreDistribution)
+class ScoreDistributionAdmin(AnalyticsModelAdmin[ScoreDistribution]):
+    ordering = ("course", "bucket")
+
+
+@admin.register(AssessmentPassRate)
+class AssessmentPassRateAdmin(AnalyticsModelAdmin[AssessmentPassRate]):
+    list_display = ("assessment",)
+    ordering = ("course", "assessment")
+
+
+@admin.register(LessonDropOff)
+class LessonDropOffAdmin(AnalyticsModelAdmin[LessonDropOff]):
+    list_display = ("lesson",)
+    ordering = ("course", "position")
+
+
 @admin.register(MessagePreset)
 class MessagePresetAdmin(HiddenModelAdmin[MessagePreset]):
     def formfield_for_dbfield(self, db_field, request, **kwargs):
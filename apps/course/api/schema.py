@@ -5,7 +5,7 @@ from pydantic.fields import Field
 
 from apps.account.api.schema import OwnerSchema
 from apps.common.schema import AccessDateSchema, LearningObjectMixinSchema, Schema, TimeStampedMixinSchema
-from apps.course.models import Course
+from apps.course.models import Course, Engagement
 from apps.operation.api.schema import FAQItemSchema, HonorCodeSchema
 from apps.partner.api.schema import PartnerSchema
 
@@ -71,8 +71,15 @@ class CourseEngagementSchema(TimeStampedMixinSchema):
 
     id: int
     gradebook: Annotated[CourseGradebookSchema, Field(None)]
+    media_bits: str
     active: bool
 
+    @staticmethod
+    def resolve_media_bits(obj: Engagement):
+        # passed lesson medias in the order of the course lessons, cf. Completion
+        completion = getattr(obj, "completion", None)
+        return completion.media_bits if completion else ""
+
 
 class CourseSchema(LearningObjectMixinSchema):
     class LessonSchema(Schema):
@@ -125,3 +132,28 @@ class CourseSessionSchema(Schema):
 
 class CourseCertificateRequestSchema(Schema):
     certificate_id: int
+
+
+class CourseAnalyticsSchema(Schema):
+    class AssessmentPassRateSchema(Schema):
+        assessment_id: int
+        title: str
+        learner_count: int
+        passed_count: int
+        avg_score: float
+
+    class LessonDropOffSchema(Schema):
+        lesson_id: int
+        title: str
+        position: int
+        media_count: int
+        learner_count: int
+        started_count: int
+        completed_count: int
+
+    completion: list[tuple[int, int]]
+    score: list[tuple[int, int]]
+    passed_count: int
+    assessments: list[AssessmentPassRateSchema]
+    lessons: list[LessonDropOffSchema]
+    refreshed: datetime | None
@@ -1,8 +1,9 @@
 from django.urls import reverse
 from ninja.router import Router
 
-from apps.common.util import HttpRequest
+from apps.common.util import HttpRequest, etag, raw_response
 from apps.course.api.schema import (
+    CourseAnalyticsSchema,
     CourseCertificateRequestSchema,
     CourseDetailSchema,
     CourseEngagementSchema,
@@ -27,8 +28,10 @@ async def start_engagement(request: HttpRequest, id: str):
 
 
 @router.get("/{id}/detail", response=CourseDetailSchema)
+@etag(lambda request, id: Course.get_detail_version(id))
+@raw_response
 async def get_detail(request: HttpRequest, id: str):
-    return await Course.get_detail(id)
+    return await Course.get_detail_document(id, version=request.etag_version)
 
 
 @router.post("/{id}/certificate/request")
@@ -38,3 +41,8 @@ async def request_certificate(request: HttpRequest, id: str, data: CourseCertifi
     return await Engagement.request_certificate(
         course_id=id, user_id=request.auth, certificate_id=data.certificate_id, verification_url=verification_url
     )
+
+
+@router.get("/{id}/analytics", response=CourseAnalyticsSchema)
+async def get_analytics(request: HttpRequest, id: str):
+    return await Course.get_analytics(course_id=id, user_id=request.auth)
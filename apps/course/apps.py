@@ -6,3 +6,19 @@ class CourseConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.course"
     verbose_name = _("Course")
+
+    def ready(self):
+        from apps.common.util import track_model_version
+        from apps.competency.models import Certificate
+        from apps.course.models import COURSE_STRUCTURE_MODELS, Course, CourseInstructor, Engagement
+        from apps.operation.models import Category, FAQItem, Instructor
+        from apps.partner.models import Partner
+
+        # course detail etag
+        track_model_version(Course, CourseInstructor, FAQItem, Category, Certificate, Partner, Instructor)
+
+        # course structure snapshot
+        track_model_version(*COURSE_STRUCTURE_MODELS)
+
+        # active engagement contexts
+        track_model_version(Engagement, scope="learner_id")
@@ -0,0 +1,65 @@
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext as _
+
+from apps.course.models import Course
+
+
+class Command(BaseCommand):
+    help = _("Benchmark the course detail response, prefetch and pydantic against the aggregated JSON document")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--courses", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args: object, **options: dict[str, object]):
+        import minima.api  # noqa: F401, attaches the routers to the api
+        from apps.course.api.v1 import get_detail, router
+
+        courses = int(options["courses"])  # type: ignore[arg-type]
+        repeat = int(options["repeat"])  # type: ignore[arg-type]
+        course_ids = list(Course.objects.order_by("-modified").values_list("id", flat=True)[:courses])
+        if not course_ids:
+            self.stdout.write(self.style.WARNING(_("No courses to benchmark")))
+            return
+
+        [op] = [
+            op
+            for path_view in router.path_operations.values()
+            for op in path_view.operations
+            if op.view_func is get_detail
+        ]
+        request = RequestFactory().get("/")
+
+        def prefetch(course_id: str):
+            course = async_to_sync(Course.get_detail)(course_id)
+            return op._result_to_response(request, course, HttpResponse()).content
+
+        def document(course_id: str):
+            cache.delete(f"course:detail:{course_id}")
+            return async_to_sync(Course.get_detail_document)(course_id)
+
+        def cached(course_id: str):
+            return async_to_sync(Course.get_detail_document)(course_id)
+
+        for label, build in (("prefetch", prefetch), ("document", document), ("cached", cached)):
+            build(course_ids[0])  # warm up connections and compiled schemas
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                size = sum(len(build(course_id)) for _round in range(repeat) for course_id in course_ids)
+                elapsed = time.perf_counter() - start
+
+            count = len(course_ids) * repeat
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{label}: {elapsed * 1000 / count:.2f}ms/request, "
+                    f"{len(queries) / count:.1f} queries/request, {size // count} bytes"
+                )
+            )
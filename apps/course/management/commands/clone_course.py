@@ -0,0 +1,31 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils.translation import gettext as _
+
+from apps.course.models import Course
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = _("Clone courses with their lessons, lesson medias, instructors, surveys and assessments")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("course_ids", nargs="+", help=_("Courses to clone"))
+        parser.add_argument("--owner", dest="owner_id", default=None, help=_("Owner of the clones"))
+        parser.add_argument("--title", dest="title", default=None, help=_("Title of the clone of a single course"))
+
+    def handle(self, *args: object, **options: dict[str, object]):
+        course_ids: list[str] = options["course_ids"]  # type: ignore[assignment]
+        if options["title"] and len(course_ids) > 1:
+            raise CommandError(_("--title is for a single course"))
+
+        for course_id in course_ids:
+            try:
+                clone_id = Course.clone(course_id=course_id, owner_id=options["owner_id"], title=options["title"])  # type: ignore[arg-type]
+            except Course.DoesNotExist:
+                raise CommandError(_("Course %(course_id)s does not exist") % {"course_id": course_id})
+            self.stdout.write(
+                self.style.SUCCESS(_("Cloned %(source)s to %(clone)s") % {"source": course_id, "clone": clone_id})
+            )
@@ -0,0 +1,21 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils.translation import gettext as _
+
+from apps.course.models import Completion
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = _("Rebuild lesson completion bitmaps of active engagements from watches")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--course", dest="course_id", default=None, help=_("Rebuild only this course's bitmaps"))
+
+    def handle(self, *args: object, **options: dict[str, object]):
+        result = Completion.rebuild(options["course_id"])  # type: ignore[arg-type]
+        self.stdout.write(
+            self.style.SUCCESS(_("Rebuilt %(completion_count)s completions of %(course_count)s courses") % result)
+        )
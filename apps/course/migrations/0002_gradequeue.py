@@ -0,0 +1,119 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+QUEUE_TABLE = "course_gradequeue"
+
+ENQUEUE_FUNCTION = f"""
+    CREATE OR REPLACE FUNCTION course_grade_queue_enqueue(p_context text)
+    RETURNS void LANGUAGE sql AS $$
+        -- cf. apps.course.models.Engagement.issue_context, course::<course_id>::<engagement_id>
+        INSERT INTO {QUEUE_TABLE} (engagement_id, queued, events)
+        SELECT e.id, now(), 1
+        FROM course_engagement e
+        WHERE e.id = (CASE WHEN p_context ~ '^course::[^:]+::[0-9]+$' THEN split_part(p_context, '::', 3)::bigint END)
+            AND e.course_id = split_part(p_context, '::', 2)
+            AND e.active
+        ON CONFLICT (engagement_id) DO UPDATE SET events = {QUEUE_TABLE}.events + 1;
+    $$;
+"""
+
+WATCH_TRIGGER = """
+    CREATE OR REPLACE FUNCTION course_grade_queue_watch()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            IF NEW.passed THEN
+                PERFORM course_grade_queue_enqueue(NEW.context);
+            END IF;
+        ELSIF NEW.passed IS DISTINCT FROM OLD.passed THEN
+            PERFORM course_grade_queue_enqueue(NEW.context);
+        END IF;
+
+        RETURN NULL;
+    END;
+    $$;
+
+    CREATE TRIGGER course_grade_queue_watch
+    AFTER INSERT OR UPDATE OF passed ON content_watch
+    FOR EACH ROW EXECUTE FUNCTION course_grade_queue_watch();
+"""
+
+# cf. apps.course.models.ASSESSIBLE_GRADE_MODELS
+GRADE_APPS = ["exam", "assignment", "discussion"]
+
+
+def grade_trigger(app: str):
+    # confirmed grades count, so does a confirmation being revoked
+    return f"""
+        CREATE OR REPLACE FUNCTION course_grade_queue_{app}()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            v_enqueue boolean;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                v_enqueue := NEW.confirmed IS NOT NULL;
+            ELSE
+                v_enqueue := (NEW.confirmed IS NOT NULL OR OLD.confirmed IS NOT NULL)
+                    AND (NEW.attempt_id, NEW.score, NEW.passed, NEW.completed, NEW.confirmed)
+                        IS DISTINCT FROM (OLD.attempt_id, OLD.score, OLD.passed, OLD.completed, OLD.confirmed);
+            END IF;
+
+            IF v_enqueue THEN
+                PERFORM course_grade_queue_enqueue(a.context) FROM {app}_attempt a WHERE a.id = NEW.attempt_id;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$;
+
+        CREATE TRIGGER course_grade_queue_{app}
+        AFTER INSERT OR UPDATE ON {app}_grade
+        FOR EACH ROW EXECUTE FUNCTION course_grade_queue_{app}();
+    """
+
+
+def drop_grade_trigger(app: str):
+    return f"""
+        DROP TRIGGER IF EXISTS course_grade_queue_{app} ON {app}_grade;
+        DROP FUNCTION IF EXISTS course_grade_queue_{app}();
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0001_initial'),
+        ('content', '0001_initial'),
+        ('course', '0001_initial'),
+        ('discussion', '0001_initial'),
+        ('exam', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeQueue',
+            fields=[
+                ('engagement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='course.engagement', verbose_name='Engagement')),
+                ('queued', models.DateTimeField(db_index=True, verbose_name='Queued')),
+                ('events', models.PositiveIntegerField(default=1, verbose_name='Events')),
+            ],
+            options={
+                'verbose_name': 'Grade Queue',
+                'verbose_name_plural': 'Grade Queues',
+            },
+        ),
+        migrations.RunSQL(
+            sql=ENQUEUE_FUNCTION,
+            reverse_sql='DROP FUNCTION IF EXISTS course_grade_queue_enqueue(text);',
+        ),
+        migrations.RunSQL(
+            sql=WATCH_TRIGGER,
+            reverse_sql='''
+                DROP TRIGGER IF EXISTS course_grade_queue_watch ON content_watch;
+                DROP FUNCTION IF EXISTS course_grade_queue_watch();
+            ''',
+        ),
+        *[migrations.RunSQL(sql=grade_trigger(app), reverse_sql=drop_grade_trigger(app)) for app in GRADE_APPS],
+    ]
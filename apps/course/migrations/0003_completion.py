@@ -0,0 +1,225 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import apps.content.models
+
+COMPLETION_TABLE = "course_completion"
+
+# cf. apps.course.models.Completion, bits follow lessons then lesson medias, ties broken by id
+SYNC_FUNCTION = f"""
+    CREATE OR REPLACE FUNCTION course_completion_sync(p_course_id text, p_engagement_id bigint)
+    RETURNS void LANGUAGE sql AS $$
+        WITH media AS (
+            SELECT lm.media_id, row_number() OVER (ORDER BY l.ordering, l.id, lm.ordering, lm.id) AS position
+            FROM course_lessonmedia lm
+            JOIN course_lesson l ON l.id = lm.lesson_id
+            WHERE l.course_id = p_course_id
+        )
+        INSERT INTO {COMPLETION_TABLE} (engagement_id, media_bits, modified)
+        SELECT
+            e.id,
+            COALESCE(
+                string_agg(
+                    CASE WHEN EXISTS (
+                        SELECT 1
+                        FROM content_watch w
+                        WHERE w.user_id = e.learner_id
+                            AND w.media_id = m.media_id
+                            AND w.context = 'course::' || e.course_id || '::' || e.id
+                            AND w.passed
+                    ) THEN '1' ELSE '0' END,
+                    '' ORDER BY m.position
+                ) FILTER (WHERE m.media_id IS NOT NULL),
+                ''
+            )::varbit,
+            now()
+        FROM course_engagement e
+        LEFT JOIN media m ON true
+        WHERE e.course_id = p_course_id AND e.active AND (p_engagement_id IS NULL OR e.id = p_engagement_id)
+        GROUP BY e.id
+        ON CONFLICT (engagement_id) DO UPDATE SET media_bits = EXCLUDED.media_bits, modified = EXCLUDED.modified;
+    $$;
+"""
+
+WATCH_TRIGGER = """
+    CREATE OR REPLACE FUNCTION course_completion_watch()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        v_context text;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            IF NEW.passed THEN
+                v_context := NEW.context;
+            END IF;
+        ELSIF TG_OP = 'DELETE' THEN
+            IF OLD.passed THEN
+                v_context := OLD.context;
+            END IF;
+        ELSIF NEW.passed IS DISTINCT FROM OLD.passed THEN
+            v_context := NEW.context;
+        END IF;
+
+        -- cf. apps.course.models.Engagement.issue_context, course::<course_id>::<engagement_id>
+        IF v_context ~ '^course::[^:]+::[0-9]+$' THEN
+            PERFORM course_completion_sync(split_part(v_context, '::', 2), split_part(v_context, '::', 3)::bigint);
+        END IF;
+
+        RETURN NULL;
+    END;
+    $$;
+
+    CREATE TRIGGER course_completion_watch
+    AFTER INSERT OR UPDATE OF passed OR DELETE ON content_watch
+    FOR EACH ROW EXECUTE FUNCTION course_completion_watch();
+"""
+
+# only active engagements have a bitmap, the sync skips the others
+ENGAGEMENT_TRIGGER = f"""
+    CREATE OR REPLACE FUNCTION course_completion_engagement()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND (NEW.active, NEW.course_id) IS NOT DISTINCT FROM (OLD.active, OLD.course_id) THEN
+            RETURN NULL;
+        END IF;
+
+        IF NEW.active THEN
+            PERFORM course_completion_sync(NEW.course_id, NEW.id);
+        ELSE
+            DELETE FROM {COMPLETION_TABLE} WHERE engagement_id = NEW.id;
+        END IF;
+
+        RETURN NULL;
+    END;
+    $$;
+
+    CREATE TRIGGER course_completion_engagement
+    AFTER INSERT OR UPDATE OF active, course_id ON course_engagement
+    FOR EACH ROW EXECUTE FUNCTION course_completion_engagement();
+"""
+
+# bit positions move with the structure, every bitmap of an affected course is rebuilt once per statement
+STRUCTURE_TRIGGER = """
+    CREATE OR REPLACE FUNCTION course_completion_lessonmedia()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        v_course_ids text[];
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT array_agg(DISTINCT l.course_id) INTO v_course_ids
+            FROM new_rows n JOIN course_lesson l ON l.id = n.lesson_id;
+        ELSIF TG_OP = 'DELETE' THEN
+            SELECT array_agg(DISTINCT l.course_id) INTO v_course_ids
+            FROM old_rows o JOIN course_lesson l ON l.id = o.lesson_id;
+        ELSE
+            SELECT array_agg(DISTINCT l.course_id) INTO v_course_ids
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            JOIN course_lesson l ON l.id IN (n.lesson_id, o.lesson_id)
+            WHERE (n.lesson_id, n.media_id, n.ordering) IS DISTINCT FROM (o.lesson_id, o.media_id, o.ordering);
+        END IF;
+
+        PERFORM course_completion_sync(c, NULL) FROM unnest(v_course_ids) c;
+        RETURN NULL;
+    END;
+    $$;
+
+    CREATE OR REPLACE FUNCTION course_completion_lesson()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        v_course_ids text[];
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            SELECT array_agg(DISTINCT o.course_id) INTO v_course_ids FROM old_rows o;
+        ELSE
+            SELECT array_agg(DISTINCT c) INTO v_course_ids
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            CROSS JOIN unnest(ARRAY[n.course_id, o.course_id]) c
+            WHERE (n.course_id, n.ordering) IS DISTINCT FROM (o.course_id, o.ordering);
+        END IF;
+
+        PERFORM course_completion_sync(c, NULL) FROM unnest(v_course_ids) c;
+        RETURN NULL;
+    END;
+    $$;
+
+    CREATE TRIGGER course_completion_lessonmedia_insert
+    AFTER INSERT ON course_lessonmedia REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION course_completion_lessonmedia();
+
+    CREATE TRIGGER course_completion_lessonmedia_update
+    AFTER UPDATE ON course_lessonmedia REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION course_completion_lessonmedia();
+
+    CREATE TRIGGER course_completion_lessonmedia_delete
+    AFTER DELETE ON course_lessonmedia REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION course_completion_lessonmedia();
+
+    CREATE TRIGGER course_completion_lesson_update
+    AFTER UPDATE ON course_lesson REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION course_completion_lesson();
+
+    CREATE TRIGGER course_completion_lesson_delete
+    AFTER DELETE ON course_lesson REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION course_completion_lesson();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0001_initial'),
+        ('course', '0002_gradequeue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Completion',
+            fields=[
+                ('engagement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='course.engagement', verbose_name='Engagement')),
+                ('media_bits', apps.content.models.VarBitField(verbose_name='Media Bits')),
+                ('modified', models.DateTimeField(verbose_name='Modified')),
+            ],
+            options={
+                'verbose_name': 'Completion',
+                'verbose_name_plural': 'Completions',
+            },
+        ),
+        migrations.RunSQL(
+            sql=SYNC_FUNCTION,
+            reverse_sql='DROP FUNCTION IF EXISTS course_completion_sync(text, bigint);',
+        ),
+        migrations.RunSQL(
+            sql=WATCH_TRIGGER,
+            reverse_sql='''
+                DROP TRIGGER IF EXISTS course_completion_watch ON content_watch;
+                DROP FUNCTION IF EXISTS course_completion_watch();
+            ''',
+        ),
+        migrations.RunSQL(
+            sql=ENGAGEMENT_TRIGGER,
+            reverse_sql='''
+                DROP TRIGGER IF EXISTS course_completion_engagement ON course_engagement;
+                DROP FUNCTION IF EXISTS course_completion_engagement();
+            ''',
+        ),
+        migrations.RunSQL(
+            sql=STRUCTURE_TRIGGER,
+            reverse_sql='''
+                DROP TRIGGER IF EXISTS course_completion_lesson_delete ON course_lesson;
+                DROP TRIGGER IF EXISTS course_completion_lesson_update ON course_lesson;
+                DROP TRIGGER IF EXISTS course_completion_lessonmedia_delete ON course_lessonmedia;
+                DROP TRIGGER IF EXISTS course_completion_lessonmedia_update ON course_lessonmedia;
+                DROP TRIGGER IF EXISTS course_completion_lessonmedia_insert ON course_lessonmedia;
+                DROP FUNCTION IF EXISTS course_completion_lesson();
+                DROP FUNCTION IF EXISTS course_completion_lessonmedia();
+            ''',
+        ),
+        # existing engagements, cf. manage.py rebuild_course_completion
+        migrations.RunSQL(
+            sql='SELECT course_completion_sync(id, NULL) FROM course_course;',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,221 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# cf. apps.common.util.SCORE_BUCKET_SIZE
+BUCKET = "(floor({value} / 5) * 5)::int"
+
+# cf. apps.course.models.ASSESSIBLE_GRADE_MODELS, confirmed grades of active attempts
+GRADE_APPS = ["exam", "assignment", "discussion"]
+
+ENGAGEMENT_OF_CONTEXT = """
+    course_engagement e
+    ON e.id = (CASE WHEN {context} ~ '^course::[^:]+::[0-9]+$' THEN split_part({context}, '::', 3)::bigint END)
+    AND e.course_id = split_part({context}, '::', 2)
+    AND e.active
+"""
+
+COMPLETION_VIEW = f"""
+    CREATE MATERIALIZED VIEW course_analytics_completion AS
+    SELECT
+        e.course_id || ':' || b.bucket AS id,
+        e.course_id,
+        b.bucket,
+        count(*) AS learner_count,
+        now() AS refreshed
+    FROM course_engagement e
+    LEFT JOIN course_gradebook g ON g.engagement_id = e.id
+    CROSS JOIN LATERAL (SELECT {BUCKET.format(value="COALESCE(g.completion_rate, 0)")} AS bucket) b
+    WHERE e.active
+    GROUP BY e.course_id, b.bucket;
+
+    CREATE UNIQUE INDEX course_analytics_completion_id ON course_analytics_completion (id);
+    CREATE INDEX course_analytics_completion_course ON course_analytics_completion (course_id);
+"""
+
+SCORE_VIEW = f"""
+    CREATE MATERIALIZED VIEW course_analytics_score AS
+    SELECT
+        e.course_id || ':' || b.bucket AS id,
+        e.course_id,
+        b.bucket,
+        count(*) AS learner_count,
+        count(*) FILTER (WHERE g.passed) AS passed_count,
+        now() AS refreshed
+    FROM course_engagement e
+    JOIN course_gradebook g ON g.engagement_id = e.id
+    CROSS JOIN LATERAL (SELECT {BUCKET.format(value="g.score")} AS bucket) b
+    WHERE e.active
+    GROUP BY e.course_id, b.bucket;
+
+    CREATE UNIQUE INDEX course_analytics_score_id ON course_analytics_score (id);
+    CREATE INDEX course_analytics_score_course ON course_analytics_score (course_id);
+"""
+
+GRADES = "\nUNION ALL\n".join(
+    f"""
+        SELECT '{app}' AS app_label, a.{app}_id AS item_id, e.course_id, e.id AS engagement_id, g.score, g.passed
+        FROM {app}_attempt a
+        JOIN {app}_grade g ON g.attempt_id = a.id
+        JOIN {ENGAGEMENT_OF_CONTEXT.format(context="a.context")}
+        WHERE a.active AND a.learner_id = e.learner_id AND g.completed IS NOT NULL AND g.confirmed IS NOT NULL
+    """
+    for app in GRADE_APPS
+)
+
+TITLES = "\nUNION ALL\n".join(f"SELECT '{app}' AS app_label, id, title FROM {app}_{app}" for app in GRADE_APPS)
+
+ASSESSMENT_VIEW = f"""
+    CREATE MATERIALIZED VIEW course_analytics_assessment AS
+    WITH grade AS ({GRADES}), item AS ({TITLES})
+    SELECT
+        s.id AS assessment_id,
+        s.course_id,
+        COALESCE(i.title, '') AS title,
+        count(r.engagement_id) AS learner_count,
+        count(r.engagement_id) FILTER (WHERE r.passed) AS passed_count,
+        COALESCE(avg(r.score), 0) AS avg_score,
+        now() AS refreshed
+    FROM course_assessment s
+    JOIN django_content_type ct ON ct.id = s.item_type_id
+    LEFT JOIN item i ON i.app_label = ct.app_label AND i.id = s.item_id
+    LEFT JOIN grade r ON r.app_label = ct.app_label AND r.item_id = s.item_id AND r.course_id = s.course_id
+    GROUP BY s.id, s.course_id, i.title;
+
+    CREATE UNIQUE INDEX course_analytics_assessment_id ON course_analytics_assessment (assessment_id);
+    CREATE INDEX course_analytics_assessment_course ON course_analytics_assessment (course_id);
+"""
+
+# lesson segments of the completion bitmap, cf. apps.course.models.Completion
+LESSON_VIEW = """
+    CREATE MATERIALIZED VIEW course_analytics_lesson AS
+    WITH lesson AS (
+        SELECT
+            l.id,
+            l.course_id,
+            l.title,
+            row_number() OVER (PARTITION BY l.course_id ORDER BY l.ordering, l.id) AS position,
+            count(lm.id)::int AS media_count,
+            (COALESCE(sum(count(lm.id)) OVER (
+                PARTITION BY l.course_id ORDER BY l.ordering, l.id ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+            ), 0) + 1)::int AS start
+        FROM course_lesson l
+        LEFT JOIN course_lessonmedia lm ON lm.lesson_id = l.id
+        GROUP BY l.id
+    )
+    SELECT
+        l.id AS lesson_id,
+        l.course_id,
+        l.title,
+        l.position,
+        l.media_count,
+        count(e.id) AS learner_count,
+        count(e.id) FILTER (
+            WHERE l.media_count > 0 AND position('1' IN substring(c.media_bits FROM l.start FOR l.media_count)::text) > 0
+        ) AS started_count,
+        count(e.id) FILTER (
+            WHERE l.media_count > 0 AND substring(c.media_bits FROM l.start FOR l.media_count) = repeat('1', l.media_count)::varbit
+        ) AS completed_count,
+        now() AS refreshed
+    FROM lesson l
+    LEFT JOIN course_engagement e ON e.course_id = l.course_id AND e.active
+    LEFT JOIN course_completion c ON c.engagement_id = e.id
+    GROUP BY l.id, l.course_id, l.title, l.position, l.media_count, l.start;
+
+    CREATE UNIQUE INDEX course_analytics_lesson_id ON course_analytics_lesson (lesson_id);
+    CREATE INDEX course_analytics_lesson_course ON course_analytics_lesson (course_id);
+"""
+
+
+def view(name: str, sql: str):
+    return migrations.RunSQL(sql=sql, reverse_sql=f"DROP MATERIALIZED VIEW IF EXISTS {name};")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0001_initial'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('course', '0003_completion'),
+        ('discussion', '0001_initial'),
+        ('exam', '0001_initial'),
+    ]
+
+    operations = [
+        view("course_analytics_completion", COMPLETION_VIEW),
+        view("course_analytics_score", SCORE_VIEW),
+        view("course_analytics_assessment", ASSESSMENT_VIEW),
+        view("course_analytics_lesson", LESSON_VIEW),
+        migrations.CreateModel(
+            name='CompletionDistribution',
+            fields=[
+                ('id', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('bucket', models.PositiveSmallIntegerField(verbose_name='Completion Rate Bucket')),
+                ('learner_count', models.PositiveIntegerField(verbose_name='Learner Count')),
+                ('refreshed', models.DateTimeField(verbose_name='Refreshed')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='course.course', verbose_name='Course')),
+            ],
+            options={
+                'verbose_name': 'Completion Distribution',
+                'verbose_name_plural': 'Completion Distributions',
+                'db_table': 'course_analytics_completion',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ScoreDistribution',
+            fields=[
+                ('id', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('bucket', models.PositiveSmallIntegerField(verbose_name='Score Bucket')),
+                ('learner_count', models.PositiveIntegerField(verbose_name='Learner Count')),
+                ('passed_count', models.PositiveIntegerField(verbose_name='Passed Count')),
+                ('refreshed', models.DateTimeField(verbose_name='Refreshed')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='course.course', verbose_name='Course')),
+            ],
+            options={
+                'verbose_name': 'Score Distribution',
+                'verbose_name_plural': 'Score Distributions',
+                'db_table': 'course_analytics_score',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AssessmentPassRate',
+            fields=[
+                ('assessment', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='course.assessment', verbose_name='Assessment')),
+                ('title', models.CharField(max_length=255, verbose_name='Title')),
+                ('learner_count', models.PositiveIntegerField(verbose_name='Learner Count')),
+                ('passed_count', models.PositiveIntegerField(verbose_name='Passed Count')),
+                ('avg_score', models.FloatField(verbose_name='Average Score')),
+                ('refreshed', models.DateTimeField(verbose_name='Refreshed')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='course.course', verbose_name='Course')),
+            ],
+            options={
+                'verbose_name': 'Assessment Pass Rate',
+                'verbose_name_plural': 'Assessment Pass Rates',
+                'db_table': 'course_analytics_assessment',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='LessonDropOff',
+            fields=[
+                ('lesson', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='course.lesson', verbose_name='Lesson')),
+                ('title', models.CharField(max_length=255, verbose_name='Title')),
+                ('position', models.PositiveSmallIntegerField(verbose_name='Position')),
+                ('media_count', models.PositiveIntegerField(verbose_name='Media Count')),
+                ('learner_count', models.PositiveIntegerField(verbose_name='Learner Count')),
+                ('started_count', models.PositiveIntegerField(verbose_name='Started Count')),
+                ('completed_count', models.PositiveIntegerField(verbose_name='Completed Count')),
+                ('refreshed', models.DateTimeField(verbose_name='Refreshed')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='course.course', verbose_name='Course')),
+            ],
+            options={
+                'verbose_name': 'Lesson Drop-off',
+                'verbose_name_plural': 'Lesson Drop-offs',
+                'db_table': 'course_analytics_lesson',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 6.0.1 on 2026-10-17 04:20
+
+from django.db import migrations, models
+
+QUEUE_TABLE = "course_completionqueue"
+
+# the affected courses are queued for course.tasks.drain_completion_queue, cf. apps.course.models.CompletionQueue
+ENQUEUE = f"""
+    INSERT INTO {QUEUE_TABLE} (course_id, queued, events)
+    SELECT c, now(), 1 FROM unnest(v_course_ids) c WHERE c IS NOT NULL
+    ON CONFLICT (course_id) DO UPDATE SET events = {QUEUE_TABLE}.events + 1;
+"""
+
+# the rebuild inside the statement, as course 0003 created it
+SYNC = "PERFORM course_completion_sync(c, NULL) FROM unnest(v_course_ids) c;"
+
+
+def structure_functions(action: str):
+    # cf. course 0003 STRUCTURE_TRIGGER, the triggers are kept and only their functions are replaced
+    return f"""
+        CREATE OR REPLACE FUNCTION course_completion_lessonmedia()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            v_course_ids text[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(DISTINCT l.course_id) INTO v_course_ids
+                FROM new_rows n JOIN course_lesson l ON l.id = n.lesson_id;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(DISTINCT l.course_id) INTO v_course_ids
+                FROM old_rows o JOIN course_lesson l ON l.id = o.lesson_id;
+            ELSE
+                SELECT array_agg(DISTINCT l.course_id) INTO v_course_ids
+                FROM new_rows n
+                JOIN old_rows o ON o.id = n.id
+                JOIN course_lesson l ON l.id IN (n.lesson_id, o.lesson_id)
+                WHERE (n.lesson_id, n.media_id, n.ordering) IS DISTINCT FROM (o.lesson_id, o.media_id, o.ordering);
+            END IF;
+
+            {action}
+            RETURN NULL;
+        END;
+        $$;
+
+        CREATE OR REPLACE FUNCTION course_completion_lesson()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            v_course_ids text[];
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                SELECT array_agg(DISTINCT o.course_id) INTO v_course_ids FROM old_rows o;
+            ELSE
+                SELECT array_agg(DISTINCT c) INTO v_course_ids
+                FROM new_rows n
+                JOIN old_rows o ON o.id = n.id
+                CROSS JOIN unnest(ARRAY[n.course_id, o.course_id]) c
+                WHERE (n.course_id, n.ordering) IS DISTINCT FROM (o.course_id, o.ordering);
+            END IF;
+
+            {action}
+            RETURN NULL;
+        END;
+        $$;
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0004_analytics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompletionQueue',
+            fields=[
+                ('course_id', models.CharField(max_length=12, primary_key=True, serialize=False, verbose_name='Course ID')),
+                ('queued', models.DateTimeField(db_index=True, verbose_name='Queued')),
+                ('events', models.PositiveIntegerField(default=1, verbose_name='Events')),
+            ],
+            options={
+                'verbose_name': 'Completion Queue',
+                'verbose_name_plural': 'Completion Queues',
+            },
+        ),
+        migrations.RunSQL(sql=structure_functions(ENQUEUE), reverse_sql=structure_functions(SYNC)),
+    ]
@@ -1,30 +1,42 @@
+from collections import defaultdict
+from collections.abc import Callable, Mapping
 from datetime import datetime, timedelta
 from decimal import ROUND_HALF_UP, Decimal
+from time import time
 from typing import TYPE_CHECKING, NotRequired, TypedDict
 
+import msgspec
 import pghistory
+from asgiref.sync import sync_to_async
 from celery.exceptions import ImproperlyConfigured
 from django.apps import apps
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.postgres.aggregates import ArrayAgg
 from django.contrib.postgres.fields import ArrayField
+from django.core.cache import cache
 from django.core.signing import dumps
+from django.db import connection, transaction
 from django.db.models import (
     CASCADE,
+    DO_NOTHING,
     SET_NULL,
     BooleanField,
     CharField,
     Count,
+    DateTimeField,
     F,
     FloatField,
     ForeignKey,
     Index,
     JSONField,
     ManyToManyField,
+    Min,
     Model,
     OneToOneField,
+    PositiveIntegerField,
     PositiveSmallIntegerField,
     Q,
     QuerySet,
@@ -35,6 +47,7 @@ from django.db.models import (
 )
 from django.db.models.query import Prefetch
 from django.db.utils import IntegrityError
+from django.utils import timezone
 from django.utils.translation import gettext as _
 
 from apps.account.models import OtpLog
@@ -42,15 +55,25 @@ from apps.assignment.models import Assignment
 from apps.assignment.models import Grade as AssignmentGrade
 from apps.common.error import ErrorCode
 from apps.common.models import BooleanNowField, LearningObjectMixin, OrderableMixin, TimeStampedMixin
-from apps.common.util import AccessDate, OtpTokenDict
+from apps.common.util import (
+    AccessDate,
+    OtpTokenDict,
+    bump_model_version,
+    cache_version,
+    model_version,
+    model_version_key,
+    modified_version,
+    tuid,
+)
 from apps.competency.models import Certificate, CertificateAward, CertificateAwardDataDict
-from apps.content.models import Media
+from apps.content.models import Media, VarBitField
 from apps.course.trigger import course_create_grading_policy, lessonmedia_unifier
 from apps.discussion.models import Discussion
 from apps.discussion.models import Grade as DiscussionGrade
 from apps.exam.models import Exam
 from apps.exam.models import Grade as ExamGrade
 from apps.operation.models import FAQ, Category, FAQItem, HonorCode, Instructor
+from apps.partner.models import Partner
 from apps.survey.models import Survey
 
 User = get_user_model()
@@ -81,6 +104,24 @@ class SessionDict(TypedDict):
     # stats: NotRequired["ScoreStatsDict"]
 
 
+def _copy_rows_sql(model: type[Model], overrides: dict[str, str], where: str, joins: str = ""):
+    # INSERT ... SELECT of the rows of model (aliased s) matching where, auto primary keys are left to the sequence
+    table = model._meta.db_table
+    columns = [f.column for f in model._meta.concrete_fields if f.column in overrides or not f.primary_key]
+    values = [overrides.get(c, f"s.{c}") for c in columns]
+    sources = ", ".join([f"{table} s", joins]) if joins else f"{table} s"
+    return f"INSERT INTO {table} ({', '.join(columns)}) SELECT {', '.join(values)} FROM {sources} WHERE {where}"
+
+
+def _json_datetime_sql(column: str):
+    # the text msgspec encodes an aware datetime to, fraction only when there is one
+    utc = f"({column} AT TIME ZONE 'UTC')"
+    return (
+        f"to_char({utc}, 'YYYY-MM-DD\"T\"HH24:MI:SS')"
+        f" || CASE WHEN to_char({utc}, 'US') <> '000000' THEN '.' || to_char({utc}, 'US') ELSE '' END || 'Z'"
+    )
+
+
 @pghistory.track()
 class MessagePreset(Model):
     title = CharField(_("Title"), max_length=255, unique=True)
@@ -140,18 +181,31 @@ class Course(LearningObjectMixin):
         return f"{self.title} ({self.pk})"
 
     @classmethod
-    async def get_session(cls, *, course_id: str, learner_id: str, access_date: AccessDate):
+    async def get_structure(cls, course_id: str):
+        # Lessons with ordered medias and the undated grading criteria are the same for every learner of the course.
+        # The snapshot is tagged with the versions of everything it was built from, learner dates are applied on read.
+        key = f"course:structure:{course_id}"
+        version_keys = [model_version_key(M) for M in COURSE_STRUCTURE_MODELS]
+
+        cached = await cache.aget_many([key, *version_keys])
+        entry = cached.get(key)
+        if entry and entry[0] == [cached.get(k) for k in version_keys]:
+            return entry[1]
+
+        # versions are read before building, a write in between leaves a stale entry that never matches again
+        versions = await cache_version(*version_keys)
         course = (
             await cls.objects
-            .select_related("owner", "gradingpolicy", "honor_code")
+            .select_related("gradingpolicy", "honor_code")
             .prefetch_related(
                 Prefetch(
                     "lesson_set",
-                    queryset=Lesson.objects.order_by("ordering").prefetch_related(
+                    # same order as the completion bits
+                    queryset=Lesson.objects.order_by("ordering", "id").prefetch_related(
                         Prefetch(
                             "medias",
                             queryset=Media.objects.annotate(ordering=F("lessonmedia__ordering")).order_by(
-                                "lessonmedia__ordering"
+                                "lessonmedia__ordering", "lessonmedia__id"
                             ),
                         )
                     ),
@@ -159,7 +213,14 @@ class Course(LearningObjectMixin):
             )
             .aget(id=course_id)
         )
-        course.grading_criteria = await course.gradingpolicy.grading_criteria(access_date)
+        structure = (course, *await course.gradingpolicy.criteria_snapshot())
+        await cache.aset(key, (versions, structure), settings.COURSE_STRUCTURE_CACHE_TIMEOUT)
+        return structure
+
+    @classmethod
+    async def get_session(cls, *, course_id: str, learner_id: str, access_date: AccessDate):
+        course, criteria, offsets = await cls.get_structure(course_id)
+        course.grading_criteria = GradingPolicy.date_criteria(criteria, offsets, access_date)
         session = SessionDict(access_date=access_date, course=course)
 
         for lesson in course.lesson_set.all():
@@ -172,7 +233,7 @@ class Course(LearningObjectMixin):
 
         engagement = (
             await Engagement.objects
-            .select_related("gradebook")
+            .select_related("gradebook", "completion")
             .filter(course=course, learner_id=learner_id, active=True)
             .afirst()
         )
@@ -210,6 +271,229 @@ class Course(LearningObjectMixin):
             .aget(id=id)
         )
 
+    @classmethod
+    async def get_detail_document(cls, id: str, version: object = None):
+        # The detail response as encoded JSON, aggregated by Postgres in one query instead of six prefetches and
+        # pydantic validation. File fields leave the query as storage names and are signed here, which is why the
+        # bytes are cached for less than the url expiry. Keys and order follow CourseDetailSchema, cf. get_detail.
+        # The version is looked up unless the caller already has it, as the etag decorator does.
+        key = f"course:detail:{id}"
+        entry = await cache.aget(key)
+        if version is None:
+            version = await cls.get_detail_version(id)
+        if entry and entry[0] == version:
+            return entry[1]
+
+        def _execute():
+            with connection.cursor() as cursor:
+                cursor.execute(cls._detail_document_sql(), [id])
+                return cursor.fetchone()
+
+        row = await sync_to_async(_execute, thread_sensitive=True)()
+        if not row:
+            raise cls.DoesNotExist
+
+        def url(model: type[Model], field: str, name: str | None):
+            return model._meta.get_field(field).storage.url(name) if name else None
+
+        document = msgspec.json.decode(row[0])
+        document["thumbnail"] = url(cls, "thumbnail", document["thumbnail"])
+        document["owner"]["avatar"] = url(User, "avatar", document["owner"]["avatar"])
+        for certificate in document["certificates"]:
+            certificate["thumbnail"] = url(Certificate, "thumbnail", certificate["thumbnail"])
+            certificate["issuer"]["logo"] = url(Partner, "logo", certificate["issuer"]["logo"])
+        for instructor in document["instructors"]:
+            instructor["avatar"] = url(Instructor, "avatar", instructor["avatar"])
+        for related in document["relatedCourses"]:
+            related["thumbnail"] = url(cls, "thumbnail", related["thumbnail"])
+
+        encoded = msgspec.json.encode(document)
+        await cache.aset(key, (version, encoded), settings.COURSE_DETAIL_CACHE_TIMEOUT)
+        return encoded
+
+    @classmethod
+    def _detail_document_sql(cls):
+        categories, certificates, related_courses = (
+            cls._meta.get_field(name) for name in ("categories", "certificates", "related_courses")
+        )
+        dt = _json_datetime_sql
+        return f"""
+            SELECT json_build_object(
+                'created', {dt("c.created")},
+                'modified', {dt("c.modified")},
+                'title', c.title,
+                'description', c.description,
+                'audience', c.audience,
+                'thumbnail', NULLIF(c.thumbnail, ''),
+                'featured', c.featured,
+                'format', c.format,
+                'durationSeconds', extract(epoch FROM NULLIF(c.duration, interval '0')),
+                'passingPoint', c.passing_point,
+                'maxAttempts', c.max_attempts,
+                'verificationRequired', c.verification_required,
+                'id', c.id,
+                'owner', json_build_object(
+                    'id', u.id, 'name', u.name, 'email', u.email, 'avatar', NULLIF(u.avatar, ''), 'nickname', u.nickname
+                ),
+                'objective', c.objective,
+                'previewUrl', c.preview_url,
+                'effortHours', c.effort_hours,
+                'level', c.level,
+                'faqItems', COALESCE((
+                    SELECT json_agg(json_build_object(
+                        'created', {dt("f.created")},
+                        'modified', {dt("f.modified")},
+                        'id', f.id,
+                        'ordering', f.ordering,
+                        'question', f.question,
+                        'answer', f.answer,
+                        'active', f.active
+                    ) ORDER BY f.ordering)
+                    FROM {FAQItem._meta.db_table} f
+                    WHERE f.faq_id = c.faq_id AND f.active
+                ), '[]'),
+                'categories', COALESCE((
+                    SELECT json_agg(json_build_object('id', k.id, 'name', k.name, 'ancestors', k.ancestors) ORDER BY k.id)
+                    FROM {categories.m2m_db_table()} t
+                    JOIN {Category._meta.db_table} k ON k.id = t.{categories.m2m_reverse_name()}
+                    WHERE t.{categories.m2m_column_name()} = c.id
+                ), '[]'),
+                'certificates', COALESCE((
+                    SELECT json_agg(json_build_object(
+                        'id', r.id,
+                        'name', r.name,
+                        'thumbnail', NULLIF(r.thumbnail, ''),
+                        'description', r.description,
+                        'issuer', json_build_object('name', p.name, 'logo', NULLIF(p.logo, ''), 'website', p.website)
+                    ) ORDER BY r.created DESC)
+                    FROM {certificates.m2m_db_table()} t
+                    JOIN {Certificate._meta.db_table} r ON r.id = t.{certificates.m2m_reverse_name()}
+                    JOIN {Partner._meta.db_table} p ON p.id = r.issuer_id
+                    WHERE t.{certificates.m2m_column_name()} = c.id AND r.active
+                ), '[]'),
+                'instructors', COALESCE((
+                    SELECT json_agg(json_build_object(
+                        'id', i.id,
+                        'name', i.name,
+                        'about', i.about,
+                        'bio', i.bio,
+                        'avatar', NULLIF(i.avatar, ''),
+                        'lead', ci.lead
+                    ) ORDER BY ci.ordering)
+                    FROM {CourseInstructor._meta.db_table} ci
+                    JOIN {Instructor._meta.db_table} i ON i.id = ci.instructor_id
+                    WHERE ci.course_id = c.id AND i.active
+                ), '[]'),
+                'relatedCourses', COALESCE((
+                    SELECT json_agg(json_build_object(
+                        'id', r.id, 'title', r.title, 'description', r.description, 'thumbnail', NULLIF(r.thumbnail, '')
+                    ) ORDER BY r.modified DESC)
+                    FROM {related_courses.m2m_db_table()} t
+                    JOIN {cls._meta.db_table} r ON r.id = t.{related_courses.m2m_reverse_name()}
+                    WHERE t.{related_courses.m2m_column_name()} = c.id
+                ), '[]')
+            )::text
+            FROM {cls._meta.db_table} c
+            JOIN {User._meta.db_table} u ON u.id = c.owner_id
+            WHERE c.id = %s
+        """
+
+    @classmethod
+    async def get_detail_version(cls, id: str):
+        # the time bucket turns over before the signed file urls of the document expire
+        return [
+            await modified_version(User.objects.filter(course__id=id)),
+            await model_version(cls, CourseInstructor, FAQItem, Category, Certificate, Partner, Instructor),
+            int(time()) // settings.COURSE_DETAIL_CACHE_TIMEOUT,
+        ]
+
+    @classmethod
+    async def get_analytics(cls, *, course_id: str, user_id: str):
+        course = await cls.objects.only("id", "owner_id").aget(id=course_id)
+        if course.owner_id != user_id and not await User.objects.filter(id=user_id, is_staff=True).aexists():
+            raise ValueError(ErrorCode.PERMISSION_DENIED)
+
+        completion = [c async for c in CompletionDistribution.objects.filter(course_id=course_id).order_by("bucket")]
+        score = [s async for s in ScoreDistribution.objects.filter(course_id=course_id).order_by("bucket")]
+        assessments = [a async for a in AssessmentPassRate.objects.filter(course_id=course_id).order_by("pk")]
+        lessons = [lesson async for lesson in LessonDropOff.objects.filter(course_id=course_id).order_by("position")]
+
+        # a course enrolled after the last refresh has no rows yet
+        refreshed = min((row.refreshed for row in [*completion, *score, *assessments, *lessons]), default=None)
+        return {
+            "completion": [(c.bucket, c.learner_count) for c in completion],
+            "score": [(s.bucket, s.learner_count) for s in score],
+            "passed_count": sum(s.passed_count for s in score),
+            "assessments": assessments,
+            "lessons": lessons,
+            "refreshed": refreshed,
+        }
+
+    @classmethod
+    def refresh_analytics(cls):
+        # concurrently, readers keep the previous rows until the new ones are swapped in
+        with connection.cursor() as cursor:
+            for M in ANALYTICS_MODELS:
+                cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {M._meta.db_table}")
+
+    @classmethod
+    def clone(cls, *, course_id: str, owner_id: str | None = None, title: str | None = None):
+        # The course graph is copied with one INSERT ... SELECT per table, orderings as they are. OrderableMixin.save
+        # and signals are skipped, learner data (engagements, gradebooks) is not copied.
+        params = {"source": course_id, "target": tuid(), "owner": owner_id, "title": title, "suffix": _(" (Copy)")}
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                _copy_rows_sql(
+                    cls,
+                    {
+                        "id": "%(target)s",
+                        "created": "now()",
+                        "modified": "now()",
+                        "title": "COALESCE(%(title)s, s.title || %(suffix)s)",
+                        "owner_id": "COALESCE(%(owner)s, s.owner_id)",
+                    },
+                    "s.id = %(source)s",
+                ),
+                params,
+            )
+            if not cursor.rowcount:
+                raise cls.DoesNotExist("Course matching query does not exist.")
+
+            # the grading policy is created by the course insert trigger
+            policy_columns = [f.column for f in GradingPolicy._meta.concrete_fields if not f.primary_key]
+            cursor.execute(
+                f"""
+                    UPDATE {GradingPolicy._meta.db_table} t
+                    SET {", ".join(f"{c} = s.{c}" for c in policy_columns if c != "course_id")}
+                    FROM {GradingPolicy._meta.db_table} s
+                    WHERE t.course_id = %(target)s AND s.course_id = %(source)s
+                """,
+                params,
+            )
+
+            for field in cls._meta.many_to_many:
+                through = field.remote_field.through
+                if through._meta.auto_created:
+                    column = field.m2m_column_name()
+                    cursor.execute(_copy_rows_sql(through, {column: "%(target)s"}, f"s.{column} = %(source)s"), params)
+
+            for M in [CourseInstructor, CourseSurvey, Lesson, Assessment]:
+                cursor.execute(_copy_rows_sql(M, {"course_id": "%(target)s"}, "s.course_id = %(source)s"), params)
+
+            # lesson titles are unique in a course, they pair the copied lessons with their sources
+            cursor.execute(
+                _copy_rows_sql(
+                    LessonMedia,
+                    {"lesson_id": "t.id"},
+                    "s.lesson_id = l.id AND l.course_id = %(source)s AND t.course_id = %(target)s AND t.title = l.title",
+                    f"{Lesson._meta.db_table} l, {Lesson._meta.db_table} t",
+                ),
+                params,
+            )
+
+        return params["target"]
+
     @classmethod
     async def content_effective_date(
         cls, *, course_id: str, content_id: str, app_label: str, model: str, access_date: AccessDate
@@ -230,8 +514,10 @@ class Course(LearningObjectMixin):
 
     @classmethod
     async def issue_context(cls, *, course_id: str, user_id: str):
-        en = await Engagement.objects.only("pk", "course_id").aget(course_id=course_id, learner_id=user_id, active=True)
-        return en.issue_context()
+        contexts = await Engagement.get_contexts(learner_id=user_id)
+        if course_id not in contexts:
+            raise Engagement.DoesNotExist("Engagement matching query does not exist.")
+        return contexts[course_id]
 
     @classmethod
     def normalize_context(cls, context: str) -> str:
@@ -297,6 +583,17 @@ class Lesson(OrderableMixin):
     def __str__(self):
         return self.title
 
+    def reorder(self, new_position: int):
+        super().reorder(new_position)
+        # siblings are shifted by queryset updates, which send no signals
+        bump_model_version(Lesson)
+
+    @classmethod
+    def reorder_many(cls, orderings: Mapping[int | str, int]):
+        updated = super().reorder_many(orderings)
+        bump_model_version(cls)
+        return updated
+
 
 @pghistory.track()
 class LessonMedia(OrderableMixin):
@@ -313,6 +610,17 @@ class LessonMedia(OrderableMixin):
     if TYPE_CHECKING:
         media_id = str()
 
+    def reorder(self, new_position: int):
+        super().reorder(new_position)
+        # siblings are shifted by queryset updates, which send no signals
+        bump_model_version(LessonMedia)
+
+    @classmethod
+    def reorder_many(cls, orderings: Mapping[int | str, int]):
+        updated = super().reorder_many(orderings)
+        bump_model_version(cls)
+        return updated
+
 
 setattr(LessonMedia._meta, "triggers", [lessonmedia_unifier(LessonMedia._meta.db_table, Lesson._meta.db_table)])
 
@@ -368,8 +676,36 @@ class GradingPolicy(Model):
         course_id: str
 
     async def grading_criteria(self, access_date: AccessDate | None = None) -> list[GradingCriterionDict]:
-        start_date = access_date["start"] if access_date else None
-        end_date = access_date["end"] if access_date else None
+        criteria, offsets = await self.criteria_snapshot()
+        return self.date_criteria(criteria, offsets, access_date)
+
+    async def criteria_snapshot(self) -> tuple[list[GradingCriterionDict], dict[str, tuple[int, int | None]]]:
+        # undated criteria and the assessment offsets by item_id, dates depend on the learner's access date
+        offsets: dict[str, tuple[int, int | None]] = {}
+        return await self._build_criteria(offsets), offsets
+
+    @staticmethod
+    def date_criteria(
+        criteria: list[GradingCriterionDict], offsets: dict[str, tuple[int, int | None]], access_date: AccessDate | None
+    ) -> list[GradingCriterionDict]:
+        dated: list[GradingCriterionDict] = []
+        for criterion in criteria:
+            criterion = criterion.copy()
+            if access_date and criterion["model"] == "completion":
+                criterion["start_date"] = access_date["start"]
+                criterion["end_date"] = access_date["end"]
+            elif access_date and criterion["item_id"] in offsets:
+                start_offset, end_offset = offsets[criterion["item_id"]]
+                criterion["start_date"] = access_date["start"] + timedelta(days=start_offset)
+                criterion["end_date"] = (
+                    access_date["start"] + timedelta(days=start_offset + end_offset)
+                    if end_offset
+                    else access_date["end"]
+                )
+            dated.append(criterion)
+        return dated
+
+    async def _build_criteria(self, offsets: dict[str, tuple[int, int | None]]) -> list[GradingCriterionDict]:
         criteria: list[GradingCriterionDict] = []
 
         total_weight = self.completion_weight + self.assessment_weight
@@ -384,8 +720,8 @@ class GradingPolicy(Model):
                     passing_point=self.completion_passing_point,
                     normalized_weight=float(self.completion_weight * 100 / total_weight) if total_weight else 0.0,
                     item_id=self.course_id,
-                    start_date=start_date,
-                    end_date=end_date,
+                    start_date=None,
+                    end_date=None,
                 )
             )
 
@@ -429,8 +765,7 @@ class GradingPolicy(Model):
             if not assessment.weight and not item["passing_point"]:
                 continue
 
-            start_offset = assessment.start_offset
-            end_offset = assessment.end_offset
+            offsets[assessment.item_id] = (assessment.start_offset, assessment.end_offset)
 
             criteria.append(
                 GradingCriterionDict(
@@ -441,10 +776,8 @@ class GradingPolicy(Model):
                     passing_point=item["passing_point"],
                     normalized_weight=0.0,
                     item_id=assessment.item_id,
-                    start_date=start_date + timedelta(days=start_offset) if start_date else None,
-                    end_date=None
-                    if not start_date
-                    else (start_date + timedelta(days=start_offset + end_offset) if end_offset else end_date),
+                    start_date=None,
+                    end_date=None,
                 )
             )
 
@@ -484,6 +817,9 @@ class GradingPolicy(Model):
 
 setattr(Course._meta, "triggers", [course_create_grading_policy(Course._meta.db_table, GradingPolicy._meta.db_table)])
 
+# cf. Course.get_structure, the criteria carry titles and passing points of the assessed items
+COURSE_STRUCTURE_MODELS = [Course, Lesson, LessonMedia, Media, Assessment, GradingPolicy, HonorCode, *ASSESSIBLE_MODELS]
+
 
 @pghistory.track()
 class Engagement(TimeStampedMixin):
@@ -509,6 +845,25 @@ class Engagement(TimeStampedMixin):
     def issue_context(self):
         return f"course::{self.course_id}::{self.pk}"
 
+    @classmethod
+    async def get_contexts(cls, *, learner_id: str) -> dict[str, str]:
+        # course_id to active engagement context, tagged with the learner's engagement version
+        key = f"course:engagement:contexts:{learner_id}"
+        version_key = model_version_key(cls, learner_id)
+
+        cached = await cache.aget_many([key, version_key])
+        entry = cached.get(key)
+        if entry and entry[0] == cached.get(version_key):
+            return entry[1]
+
+        [version] = await cache_version(version_key)
+        contexts = {
+            en.course_id: en.issue_context()
+            async for en in cls.objects.only("pk", "course_id").filter(learner_id=learner_id, active=True)
+        }
+        await cache.aset(key, (version, contexts), settings.ENGAGEMENT_CONTEXT_CACHE_TIMEOUT)
+        return contexts
+
     @classmethod
     async def start(cls, *, course_id: str, learner_id: str):
         course = await Course.objects.aget(id=course_id)
@@ -523,6 +878,7 @@ class Engagement(TimeStampedMixin):
             raise ValueError(ErrorCode.ALREADY_EXISTS)
 
         engagement._state.fields_cache["gradebook"] = None
+        engagement._state.fields_cache["completion"] = None
 
         return engagement
 
@@ -577,37 +933,14 @@ class Engagement(TimeStampedMixin):
 
         for criterion in criteria:
             if criterion["model"] == "completion":
-                completion = await (
-                    Lesson.objects
-                    .filter(course_id=criterion["item_id"])
-                    .annotate(
-                        media_count=Count("lessonmedia"),
-                        passed_count=Count(
-                            "lessonmedia",
-                            filter=Q(
-                                lessonmedia__media__watch__user_id=learner_id,
-                                lessonmedia__media__watch__context=engagement.issue_context(),
-                                lessonmedia__media__watch__passed=True,
-                            ),
-                        ),
-                    )
-                    .aaggregate(
-                        total_lessons=Count("id"),
-                        passed_lessons=Count("id", filter=Q(media_count__gt=0, passed_count=F("media_count"))),
-                    )
+                media_bits = (
+                    await Completion.objects.filter(engagement=engagement).values_list("media_bits", flat=True).afirst()
                 )
-                total = completion["total_lessons"]
-                passed = completion["passed_lessons"]
-                completion_rate = (passed * 100.0 / total) if total else 0.0
+                media_counts = await Completion.get_media_counts(criterion["item_id"])
+                completion_rate = Completion.completion_rate(media_bits or "", media_counts)
 
             else:
-                M = ASSESSIBLE_MODEL_MAP.get((criterion["app_label"], criterion["model"]))
-                G = ASSESSIBLE_GRADE_MODELS.get(M)
-                if not (M and G):
-                    raise ImproperlyConfigured(
-                        f"Cannot find assessable model {criterion['app_label']}.{criterion['model']}"
-                    )
-
+                M, G = cls._assessible_models(criterion)
                 pk_path = f"attempt__{M._meta.model.__name__.lower()}_id"
                 qss.append(
                     G.objects.filter(
@@ -626,6 +959,108 @@ class Engagement(TimeStampedMixin):
         else:
             assessment_results = {}
 
+        await Gradebook.objects.aupdate_or_create(
+            engagement=engagement,
+            defaults={**cls.summarize_grade(criteria, completion_rate, assessment_results), "grader": grader},
+        )
+
+    @classmethod
+    async def grade_course(
+        cls,
+        *,
+        course_id: str,
+        grader_id: str | None = None,
+        engagement_ids: list[int] | None = None,
+        progress: Callable[[int, int], None] | None = None,
+    ):
+        # Engagement.grade for every active engagement of the course, or the given ones. Each batch of engagements
+        # costs one bitmap read, one grade union and one gradebook upsert instead of three queries per learner.
+        policy = await GradingPolicy.objects.select_related("course").aget(course_id=course_id)
+        criteria = await policy.grading_criteria()
+        media_counts = await Completion.get_media_counts(course_id)
+
+        engagement_qs = cls.objects.filter(course_id=course_id, active=True)
+        if engagement_ids is not None:
+            engagement_qs = engagement_qs.filter(id__in=engagement_ids)
+
+        total = await engagement_qs.acount()
+        graded = 0
+        last_id = 0
+
+        while True:
+            engagements = [
+                engagement
+                async for engagement in engagement_qs
+                .filter(id__gt=last_id)
+                .only("id", "course_id", "learner_id")
+                .order_by("id")[: settings.GRADE_COURSE_BATCH_SIZE]
+            ]
+            if not engagements:
+                break
+            last_id = engagements[-1].pk
+            contexts = {engagement.issue_context(): engagement for engagement in engagements}
+
+            media_bits: dict[int, str] = {}
+            if any(criterion["model"] == "completion" for criterion in criteria):
+                media_bits = {
+                    engagement_id: bits
+                    async for engagement_id, bits in Completion.objects.filter(
+                        engagement_id__in=[engagement.pk for engagement in engagements]
+                    ).values_list("engagement_id", "media_bits")
+                }
+
+            qss = []
+            for criterion in criteria:
+                if criterion["model"] == "completion":
+                    continue
+                M, G = cls._assessible_models(criterion)
+                pk_path = f"attempt__{M._meta.model.__name__.lower()}_id"
+                qss.append(
+                    G.objects.filter(
+                        **{pk_path: criterion["item_id"]},
+                        attempt__context__in=contexts,
+                        attempt__active=True,
+                        completed__isnull=False,
+                        confirmed__isnull=False,
+                    ).values_list("attempt__context", "attempt__learner_id", pk_path, "score", "passed")
+                )
+
+            assessment_results: dict[str, dict[str, dict]] = defaultdict(dict)
+            if qss:
+                qs = qss[0].union(*qss[1:]) if len(qss) > 1 else qss[0]
+                async for context, learner_id, item_id, score, passed in qs:
+                    if learner_id == contexts[context].learner_id:
+                        assessment_results[context][item_id] = {"score": score, "passed": passed}
+
+            gradebooks = []
+            for context, engagement in contexts.items():
+                completion_rate = Completion.completion_rate(media_bits.get(engagement.pk, ""), media_counts)
+                summary = cls.summarize_grade(criteria, completion_rate, assessment_results[context])
+                gradebooks.append(Gradebook(engagement=engagement, grader_id=grader_id, **summary))
+
+            await Gradebook.objects.abulk_create(
+                gradebooks,
+                update_conflicts=True,
+                unique_fields=["engagement"],
+                update_fields=["details", "score", "completion_rate", "passed", "grader", "modified"],
+            )
+
+            graded += len(gradebooks)
+            if progress:
+                progress(graded, total)
+
+        return {"graded_count": graded}
+
+    @staticmethod
+    def _assessible_models(criterion: GradingCriterionDict):
+        M = ASSESSIBLE_MODEL_MAP.get((criterion["app_label"], criterion["model"]))
+        G = ASSESSIBLE_GRADE_MODELS.get(M)
+        if not (M and G):
+            raise ImproperlyConfigured(f"Cannot find assessable model {criterion['app_label']}.{criterion['model']}")
+        return M, G
+
+    @staticmethod
+    def summarize_grade(criteria: list[GradingCriterionDict], completion_rate: float, assessment_results: dict):
         total_score = 0.0
         total_weight = 0.0
         failed_exist = False
@@ -675,16 +1110,12 @@ class Engagement(TimeStampedMixin):
 
         final_score = total_score if total_weight > 0 else 0.0
 
-        await Gradebook.objects.aupdate_or_create(
-            engagement=engagement,
-            defaults={
-                "details": details,
-                "score": final_score,
-                "completion_rate": completion_rate,
-                "passed": not failed_exist,
-                "grader": grader,
-            },
-        )
+        return {
+            "details": details,
+            "score": final_score,
+            "completion_rate": completion_rate,
+            "passed": not failed_exist,
+        }
 
 
 @pghistory.track()
@@ -701,3 +1132,226 @@ class Gradebook(TimeStampedMixin):
     class Meta(TimeStampedMixin.Meta):
         verbose_name = _("Gradebook")
         verbose_name_plural = _("Gradebooks")
+
+
+class GradeQueue(Model):
+    # Engagements whose gradebook is due for a recompute, filled by triggers (course 0002) when a watch crosses
+    # passed or an assessed grade is confirmed. One row per engagement coalesces a burst of events, the row is
+    # due a debounce window after its first event and events counts the ones folded into it.
+    engagement = OneToOneField(Engagement, CASCADE, primary_key=True, verbose_name=_("Engagement"))
+    queued = DateTimeField(_("Queued"), db_index=True)
+    events = PositiveIntegerField(_("Events"), default=1)
+
+    class Meta:
+        verbose_name = _("Grade Queue")
+        verbose_name_plural = _("Grade Queues")
+
+    if TYPE_CHECKING:
+        engagement_id: int
+
+    @classmethod
+    async def drain(cls, *, limit: int | None = None):
+        due = [
+            row
+            async for row in cls.objects
+            .filter(queued__lte=timezone.now() - timedelta(seconds=settings.GRADE_QUEUE_DEBOUNCE_SECONDS))
+            .values("engagement_id", "events", "engagement__course_id", "engagement__gradebook__confirmed")
+            .order_by("queued")[: limit or settings.GRADE_QUEUE_BATCH_SIZE]
+        ]
+
+        # confirmed gradebooks are final, their rows are only dropped
+        by_course: dict[str, list[int]] = defaultdict(list)
+        for row in due:
+            if not row["engagement__gradebook__confirmed"]:
+                by_course[row["engagement__course_id"]].append(row["engagement_id"])
+
+        graded = 0
+        for course_id, engagement_ids in by_course.items():
+            result = await Engagement.grade_course(course_id=course_id, engagement_ids=engagement_ids)
+            graded += result["graded_count"]
+
+        # an event folded in while grading changed events, that row stays for the next window
+        if due:
+            q = Q()
+            for row in due:
+                q |= Q(engagement_id=row["engagement_id"], events=row["events"])
+            await cls.objects.filter(q).adelete()
+
+        return {"drained_count": len(due), "graded_count": graded, **await cls.stats()}
+
+    @classmethod
+    async def stats(cls):
+        stats = await cls.objects.aaggregate(depth=Count("pk"), oldest=Min("queued"))
+        lag = (timezone.now() - stats["oldest"]).total_seconds() if stats["oldest"] else 0.0
+        return {"depth": stats["depth"], "lag_seconds": lag}
+
+
+class Completion(Model):
+    # One bit per lesson media of the course for an engagement, set when the engagement's watch of the media has
+    # passed. Bits follow the lesson order then the lesson media order (ties broken by id), kept by triggers
+    # (course 0003) on watches, so completion is read without joining watches. Structure changes queue the course
+    # in CompletionQueue (course 0005) and its bits move when the queue is drained.
+    engagement = OneToOneField(Engagement, CASCADE, primary_key=True, verbose_name=_("Engagement"))
+    media_bits = VarBitField(_("Media Bits"))
+    modified = DateTimeField(_("Modified"))
+
+    class Meta:
+        verbose_name = _("Completion")
+        verbose_name_plural = _("Completions")
+
+    if TYPE_CHECKING:
+        engagement_id: int
+
+    @classmethod
+    async def get_media_counts(cls, course_id: str) -> list[int]:
+        # lesson media count of every lesson in bit order
+        return [
+            media_count
+            async for media_count in Lesson.objects
+            .filter(course_id=course_id)
+            .annotate(media_count=Count("lessonmedia"))
+            .order_by("ordering", "id")
+            .values_list("media_count", flat=True)
+        ]
+
+    @staticmethod
+    def lesson_progress(media_bits: str, media_counts: list[int]):
+        # passed lesson media count of every lesson, a missing or short bitmap reads as unwatched
+        bits = media_bits.ljust(sum(media_counts), "0")
+        progress = []
+        start = 0
+        for media_count in media_counts:
+            progress.append(bits.count("1", start, start + media_count))
+            start += media_count
+        return progress
+
+    @classmethod
+    def completion_rate(cls, media_bits: str, media_counts: list[int]):
+        # completed lessons count rate, a lesson without media is never completed
+        if not media_counts:
+            return 0.0
+        passed_lessons = sum(
+            1
+            for passed_count, media_count in zip(cls.lesson_progress(media_bits, media_counts), media_counts)
+            if media_count > 0 and passed_count == media_count
+        )
+        return passed_lessons * 100.0 / len(media_counts)
+
+    @classmethod
+    def rebuild(cls, course_id: str | None = None):
+        # backfill or repair the bitmaps of active engagements from their watches
+        qs = Course.objects.all() if course_id is None else Course.objects.filter(id=course_id)
+        course_ids = list(qs.values_list("id", flat=True))
+        with transaction.atomic(), connection.cursor() as cursor:
+            for pk in course_ids:
+                cursor.execute("SELECT course_completion_sync(%s, NULL)", [pk])
+        completions = cls.objects.filter(engagement__course_id__in=course_ids).count()
+        return {"course_count": len(course_ids), "completion_count": completions}
+
+
+class CompletionQueue(Model):
+    # Courses whose bitmaps are due for a rebuild after a lesson or lesson media insert, update or delete, filled
+    # by statement triggers (course 0005). One row per course coalesces the statements of a reorder or an import,
+    # the rebuild runs in course.tasks.drain_completion_queue instead of the transaction that changed the structure.
+    # No foreign key, deleting a course queues it from the cascaded lesson deletes in the same transaction.
+    course_id = CharField(_("Course ID"), max_length=12, primary_key=True)
+    queued = DateTimeField(_("Queued"), db_index=True)
+    events = PositiveIntegerField(_("Events"), default=1)
+
+    class Meta:
+        verbose_name = _("Completion Queue")
+        verbose_name_plural = _("Completion Queues")
+
+    @classmethod
+    async def drain(cls, *, limit: int | None = None):
+        due = [
+            row
+            async for row in cls.objects.values("course_id", "events").order_by("queued")[
+                : limit or settings.COMPLETION_QUEUE_BATCH_SIZE
+            ]
+        ]
+
+        def _execute():
+            # a course per transaction, the rebuild locks the completion rows of that course only
+            for row in due:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute("SELECT course_completion_sync(%s, NULL)", [row["course_id"]])
+                    # a structure change folded in meanwhile changed events, that row stays for the next drain
+                    cls.objects.filter(course_id=row["course_id"], events=row["events"]).delete()
+
+        await sync_to_async(_execute, thread_sensitive=True)()
+        return {"drained_count": len(due), **await cls.stats()}
+
+    @classmethod
+    async def stats(cls):
+        stats = await cls.objects.aaggregate(depth=Count("pk"), oldest=Min("queued"))
+        lag = (timezone.now() - stats["oldest"]).total_seconds() if stats["oldest"] else 0.0
+        return {"depth": stats["depth"], "lag_seconds": lag}
+
+
+# Course analytics are materialized views (course 0004) refreshed concurrently by course.tasks.refresh_analytics,
+# requests read only the views. Buckets are lower bounds of SCORE_BUCKET_SIZE wide ranges as in get_score_stats.
+class CompletionDistribution(Model):
+    id = CharField(primary_key=True, max_length=50)
+    course = ForeignKey(Course, DO_NOTHING, verbose_name=_("Course"), related_name="+")
+    bucket = PositiveSmallIntegerField(_("Completion Rate Bucket"))
+    learner_count = PositiveIntegerField(_("Learner Count"))
+    refreshed = DateTimeField(_("Refreshed"))
+
+    class Meta:
+        managed = False
+        db_table = "course_analytics_completion"
+        verbose_name = _("Completion Distribution")
+        verbose_name_plural = _("Completion Distributions")
+
+
+class ScoreDistribution(Model):
+    id = CharField(primary_key=True, max_length=50)
+    course = ForeignKey(Course, DO_NOTHING, verbose_name=_("Course"), related_name="+")
+    bucket = PositiveSmallIntegerField(_("Score Bucket"))
+    learner_count = PositiveIntegerField(_("Learner Count"))
+    passed_count = PositiveIntegerField(_("Passed Count"))
+    refreshed = DateTimeField(_("Refreshed"))
+
+    class Meta:
+        managed = False
+        db_table = "course_analytics_score"
+        verbose_name = _("Score Distribution")
+        verbose_name_plural = _("Score Distributions")
+
+
+class AssessmentPassRate(Model):
+    assessment = OneToOneField(Assessment, DO_NOTHING, primary_key=True, verbose_name=_("Assessment"), related_name="+")
+    course = ForeignKey(Course, DO_NOTHING, verbose_name=_("Course"), related_name="+")
+    title = CharField(_("Title"), max_length=255)
+    learner_count = PositiveIntegerField(_("Learner Count"))
+    passed_count = PositiveIntegerField(_("Passed Count"))
+    avg_score = FloatField(_("Average Score"))
+    refreshed = DateTimeField(_("Refreshed"))
+
+    class Meta:
+        managed = False
+        db_table = "course_analytics_assessment"
+        verbose_name = _("Assessment Pass Rate")
+        verbose_name_plural = _("Assessment Pass Rates")
+
+
+class LessonDropOff(Model):
+    lesson = OneToOneField(Lesson, DO_NOTHING, primary_key=True, verbose_name=_("Lesson"), related_name="+")
+    course = ForeignKey(Course, DO_NOTHING, verbose_name=_("Course"), related_name="+")
+    title = CharField(_("Title"), max_length=255)
+    position = PositiveSmallIntegerField(_("Position"))
+    media_count = PositiveIntegerField(_("Media Count"))
+    learner_count = PositiveIntegerField(_("Learner Count"))
+    started_count = PositiveIntegerField(_("Started Count"))
+    completed_count = PositiveIntegerField(_("Completed Count"))
+    refreshed = DateTimeField(_("Refreshed"))
+
+    class Meta:
+        managed = False
+        db_table = "course_analytics_lesson"
+        verbose_name = _("Lesson Drop-off")
+        verbose_name_plural = _("Lesson Drop-offs")
+
+
+ANALYTICS_MODELS = [CompletionDistribution, ScoreDistribution, AssessmentPassRate, LessonDropOff]
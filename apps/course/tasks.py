@@ -0,0 +1,38 @@
+import logging
+
+import pghistory
+from asgiref.sync import async_to_sync
+from celery import shared_task
+
+from apps.course.models import CompletionQueue, Course, Engagement, GradeQueue
+
+log = logging.getLogger(__name__)
+
+
+@shared_task(name="course.tasks.grade_course", bind=True)
+def grade_course(self, course_id: str, grader_id: str | None = None):
+    def progress(graded: int, total: int):
+        self.update_state(state="PROGRESS", meta={"graded": graded, "total": total})
+
+    with pghistory.context(task="grade_course", course_id=course_id):
+        return async_to_sync(Engagement.grade_course)(course_id=course_id, grader_id=grader_id, progress=progress)
+
+
+@shared_task(name="course.tasks.drain_grade_queue")
+def drain_grade_queue():
+    with pghistory.context(task="drain_grade_queue"):
+        result = async_to_sync(GradeQueue.drain)()
+    log.info("grade queue drained %(drained_count)s, depth %(depth)s, lag %(lag_seconds).1fs", result)
+    return result
+
+
+@shared_task(name="course.tasks.drain_completion_queue")
+def drain_completion_queue():
+    result = async_to_sync(CompletionQueue.drain)()
+    log.info("completion queue drained %(drained_count)s, depth %(depth)s, lag %(lag_seconds).1fs", result)
+    return result
+
+
+@shared_task(name="course.tasks.refresh_analytics")
+def refresh_analytics():
+    Course.refresh_analytics()
@@ -0,0 +1,28 @@
+from time import time
+
+import pytest
+from django.conf import settings
+from django.test.client import Client
+
+from apps.course.tests.factories import CourseFactory
+from conftest import AdminUser
+
+
+@pytest.mark.e2e
+@pytest.mark.django_db
+def test_course_detail_etag(client: Client, admin_user: AdminUser, monkeypatch: pytest.MonkeyPatch):
+    admin_user.login()
+    course = CourseFactory.create()
+    url = f"/api/v1/course/{course.pk}/detail"
+
+    res = client.get(url)
+    assert res.status_code == 200, "get course detail"
+    res_not_modified = client.get(url, headers={"If-None-Match": res["ETag"]})
+    assert res_not_modified.status_code == 304, "course detail not modified"
+
+    # once the cached document expires its signed urls are renewed, so the etag changes with them
+    later = time() + settings.COURSE_DETAIL_CACHE_TIMEOUT
+    monkeypatch.setattr("apps.course.models.time", lambda: later)
+    res_renewed = client.get(url, headers={"If-None-Match": res["ETag"]})
+    assert res_renewed.status_code == 200, "course detail renewed"
+    assert res_renewed["ETag"] != res["ETag"]
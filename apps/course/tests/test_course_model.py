@@ -1,9 +1,41 @@
+import re
+from datetime import timedelta
+from uuid import uuid4
+
+import msgspec
 import pytest
+from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
 from mimesis.plugins.factory import FactoryField
 from pytest_django import DjangoDbBlocker
 
+from apps.account.tests.factories import UserFactory
+from apps.common.util import AccessDate
+from apps.competency.tests.factories import CertificateFactory
+from apps.content.tests.factories import MediaFactory, WatchFactory
+from apps.course.models import (
+    Assessment,
+    AssessmentPassRate,
+    Completion,
+    CompletionQueue,
+    Course,
+    CourseInstructor,
+    Engagement,
+    Gradebook,
+    GradeQueue,
+    GradingPolicy,
+    Lesson,
+    LessonMedia,
+)
 from apps.course.tests.factories import CourseFactory
+from apps.exam.models import Exam
+from apps.exam.models import Grade as ExamGrade
+from apps.exam.tests.factories import AttemptFactory, ExamFactory
+from apps.operation.models import Category
 
 
 @pytest.mark.order(-2)
@@ -12,6 +44,314 @@ def test_course():
     CourseFactory.create()
 
 
+@pytest.mark.django_db
+def test_engagement_contexts(django_assert_num_queries):
+    course = CourseFactory.create()
+    learner = UserFactory.create()
+    issue_context = async_to_sync(Course.issue_context)
+
+    with pytest.raises(Engagement.DoesNotExist):
+        issue_context(course_id=course.pk, user_id=learner.pk)
+
+    engagement = Engagement.objects.create(course=course, learner=learner)
+    assert issue_context(course_id=course.pk, user_id=learner.pk) == engagement.issue_context()
+    with django_assert_num_queries(0):
+        assert issue_context(course_id=course.pk, user_id=learner.pk) == engagement.issue_context()
+
+    engagement.active = False
+    engagement.save()
+    with pytest.raises(Engagement.DoesNotExist):
+        issue_context(course_id=course.pk, user_id=learner.pk)
+
+    engagement = Engagement.objects.create(course=course, learner=learner)
+    assert issue_context(course_id=course.pk, user_id=learner.pk) == engagement.issue_context()
+
+
+@pytest.mark.django_db
+def test_course_structure_cache(django_assert_num_queries):
+    course = CourseFactory.create()
+    learner = UserFactory.create()
+    lesson = Lesson.objects.create(course=course, title="Structure", start_offset=7, end_offset=None)
+    now = timezone.now()
+    access_date = AccessDate(start=now, end=now + timedelta(days=30), archive=now + timedelta(days=60))
+    get_session = async_to_sync(Course.get_session)
+
+    get_session(course_id=course.pk, learner_id=learner.pk, access_date=access_date)
+    # only the engagement is queried once the structure is cached
+    with django_assert_num_queries(1):
+        session = get_session(course_id=course.pk, learner_id=learner.pk, access_date=access_date)
+
+    [cached] = [item for item in session["course"].lesson_set.all() if item.pk == lesson.pk]
+    assert (cached.start_date, cached.end_date) == (now + timedelta(days=7), access_date["end"])
+    policy = GradingPolicy.objects.select_related("course").get(course=course)
+    assert session["course"].grading_criteria == async_to_sync(policy.grading_criteria)(access_date)
+
+    lesson.title = "Structure Renamed"
+    lesson.save()
+    session = get_session(course_id=course.pk, learner_id=learner.pk, access_date=access_date)
+    assert lesson.title in [item.title for item in session["course"].lesson_set.all()]
+
+    # reorders move siblings with queryset updates
+    Lesson.reorder_many({lesson.pk: 99})
+    session = get_session(course_id=course.pk, learner_id=learner.pk, access_date=access_date)
+    assert [item.ordering for item in session["course"].lesson_set.all() if item.pk == lesson.pk] == [99]
+
+
+@pytest.mark.django_db
+def test_grade_course_golden():
+    course = CourseFactory.create()
+    GradingPolicy.objects.filter(course=course).update(assessment_weight=60, completion_weight=40)
+    lesson = Lesson.objects.create(course=course, title="Golden", start_offset=0)
+    medias = [MediaFactory.create(url=f"https://example.com/{uuid4().hex}.mp4") for _ in range(2)]
+    for i, media in enumerate(medias):
+        LessonMedia.objects.create(lesson=lesson, media=media, ordering=i)
+    exam = ExamFactory.create()
+    Assessment.objects.create(
+        course=course, weight=50, start_offset=0, item_type=ContentType.objects.get_for_model(Exam), item_id=exam.pk
+    )
+
+    # full, partial and no progress, plus a watch of another course context on the same media
+    engagements = [Engagement.objects.create(course=course, learner=UserFactory.create()) for _ in range(3)]
+    for engagement, watched in zip(engagements, [medias, medias[:1], []], strict=True):
+        for media in watched:
+            WatchFactory.create(user=engagement.learner, media=media, context=engagement.issue_context(), passed=True)
+    WatchFactory.create(media=medias[0], context="", passed=True)
+    attempt = AttemptFactory.create(exam=exam, learner=engagements[0].learner, context=engagements[0].issue_context())
+    now = timezone.now()
+    ExamGrade.objects.filter(attempt=attempt).update(completed=now, confirmed=now, score=90.0, passed=True)
+
+    def gradebooks():
+        return {
+            g.engagement_id: (g.details, g.score, g.completion_rate, g.passed)
+            for g in Gradebook.objects.filter(engagement__course=course)
+        }
+
+    for engagement in engagements:
+        async_to_sync(Engagement.grade)(course_id=course.pk, learner_id=engagement.learner_id)
+    golden = gradebooks()
+    assert len(golden) == len(engagements)
+
+    Gradebook.objects.filter(engagement__course=course).delete()
+    progress = []
+    result = async_to_sync(Engagement.grade_course)(course_id=course.pk, progress=lambda *args: progress.append(args))
+    assert result["graded_count"] == len(engagements) and progress[-1] == (3, 3)
+    assert gradebooks() == golden
+
+    # regrading upserts in place
+    async_to_sync(Engagement.grade_course)(course_id=course.pk)
+    assert gradebooks() == golden
+
+
+@pytest.mark.django_db
+def test_grade_queue():
+    course = CourseFactory.create()
+    lesson = Lesson.objects.create(course=course, title="Queued", start_offset=0)
+    media = MediaFactory.create(url=f"https://example.com/{uuid4().hex}.mp4")
+    LessonMedia.objects.create(lesson=lesson, media=media, ordering=0)
+    engagement = Engagement.objects.create(course=course, learner=UserFactory.create())
+
+    # a burst of passed crossings coalesces into one row, heartbeats without a crossing are not events
+    watch = WatchFactory.create(user=engagement.learner, media=media, context=engagement.issue_context(), passed=True)
+    watch.last_position += 1
+    watch.save()
+    watch.passed = False
+    watch.save()
+    watch.passed = True
+    watch.save()
+    assert GradeQueue.objects.get(engagement=engagement).events == 3
+
+    drain = async_to_sync(GradeQueue.drain)
+    result = drain()
+    assert (result["drained_count"], result["depth"]) == (0, 1)
+
+    with override_settings(GRADE_QUEUE_DEBOUNCE_SECONDS=0):
+        result = drain()
+    assert (result["drained_count"], result["graded_count"], result["depth"]) == (1, 1, 0)
+    assert Gradebook.objects.filter(engagement=engagement).exists()
+
+
+@pytest.mark.django_db
+def test_completion_bits():
+    course = CourseFactory.create()
+    lessons = [Lesson.objects.create(course=course, title=f"Bits {i}", start_offset=0, ordering=i) for i in range(2)]
+    medias = [MediaFactory.create(url=f"https://example.com/{uuid4().hex}.mp4") for _ in range(3)]
+    for i, media in enumerate(medias):
+        LessonMedia.objects.create(lesson=lessons[min(i, 1)], media=media, ordering=i)
+    engagement = Engagement.objects.create(course=course, learner=UserFactory.create())
+
+    def media_bits():
+        return Completion.objects.get(engagement=engagement).media_bits
+
+    assert media_bits() == "000"
+
+    # a watch flipping passed sets its bit, watches of another context do not
+    watch = WatchFactory.create(
+        user=engagement.learner, media=medias[0], context=engagement.issue_context(), passed=True
+    )
+    WatchFactory.create(user=engagement.learner, media=medias[1], context="", passed=True)
+    assert media_bits() == "100"
+    WatchFactory.create(user=engagement.learner, media=medias[2], context=engagement.issue_context(), passed=True)
+    assert media_bits() == "101"
+    media_counts = async_to_sync(Completion.get_media_counts)(course.pk)
+    assert Completion.lesson_progress(media_bits(), media_counts) == [1, 1]
+    assert Completion.completion_rate(media_bits(), media_counts) == 50.0
+
+    # reordering lessons queues the course once, the bits move when the queue is drained
+    CompletionQueue.objects.all().delete()
+    lessons[1].reorder(0)
+    assert list(CompletionQueue.objects.values_list("course_id", flat=True)) == [course.pk]
+    assert media_bits() == "101"
+    result = async_to_sync(CompletionQueue.drain)()
+    assert (result["drained_count"], result["depth"]) == (1, 0)
+    assert media_bits() == "011"
+    watch.passed = False
+    watch.save()
+    assert media_bits() == "010"
+
+    Completion.objects.all().delete()
+    assert Completion.rebuild(course.pk) == {"course_count": 1, "completion_count": 1}
+    assert media_bits() == "010"
+
+    # the bitmap follows the engagement active flag
+    engagement.active = False
+    engagement.save()
+    assert not Completion.objects.filter(engagement=engagement).exists()
+    engagement.active = True
+    engagement.save()
+    assert media_bits() == "010"
+
+
+@pytest.mark.django_db
+def test_course_analytics():
+    course = CourseFactory.create()
+    lesson = Lesson.objects.create(course=course, title="Analytics", start_offset=0)
+    medias = [MediaFactory.create(url=f"https://example.com/{uuid4().hex}.mp4") for _ in range(2)]
+    for i, media in enumerate(medias):
+        LessonMedia.objects.create(lesson=lesson, media=media, ordering=i)
+    exam = ExamFactory.create()
+    assessment = Assessment.objects.create(
+        course=course, weight=50, start_offset=0, item_type=ContentType.objects.get_for_model(Exam), item_id=exam.pk
+    )
+
+    # full, partial and no progress, the first one passes the exam
+    engagements = [Engagement.objects.create(course=course, learner=UserFactory.create()) for _ in range(3)]
+    for engagement, watched in zip(engagements, [medias, medias[:1], []], strict=True):
+        for media in watched:
+            WatchFactory.create(user=engagement.learner, media=media, context=engagement.issue_context(), passed=True)
+    attempt = AttemptFactory.create(exam=exam, learner=engagements[0].learner, context=engagements[0].issue_context())
+    now = timezone.now()
+    ExamGrade.objects.filter(attempt=attempt).update(completed=now, confirmed=now, score=90.0, passed=True)
+    async_to_sync(Engagement.grade_course)(course_id=course.pk)
+
+    get_analytics = async_to_sync(Course.get_analytics)
+    with pytest.raises(ValueError):
+        get_analytics(course_id=course.pk, user_id=engagements[0].learner_id)
+
+    # nothing is read from the raw tables until a refresh
+    Course.refresh_analytics()
+    analytics = get_analytics(course_id=course.pk, user_id=course.owner_id)
+    assert sum(count for _, count in analytics["completion"]) == 3
+    assert sum(count for _, count in analytics["score"]) == 3 and analytics["refreshed"]
+    [pass_rate] = analytics["assessments"]
+    assert (pass_rate.assessment_id, pass_rate.learner_count, pass_rate.passed_count) == (assessment.pk, 1, 1)
+    [drop_off] = analytics["lessons"]
+    assert (drop_off.learner_count, drop_off.started_count, drop_off.completed_count) == (3, 2, 1)
+
+    ExamGrade.objects.filter(attempt=attempt).update(passed=False)
+    assert AssessmentPassRate.objects.get(assessment=assessment).passed_count == 1
+    Course.refresh_analytics()
+    assert AssessmentPassRate.objects.get(assessment=assessment).passed_count == 0
+
+
+@pytest.mark.django_db
+def test_clone_course(django_assert_max_num_queries):
+    course = CourseFactory.create()
+    GradingPolicy.objects.filter(course=course).update(assessment_weight=70, completion_weight=30)
+    lessons = [Lesson.objects.create(course=course, title=f"Clone {i}", start_offset=i, ordering=i) for i in range(2)]
+    for i, lesson in enumerate(lessons):
+        media = MediaFactory.create(url=f"https://example.com/{uuid4().hex}.mp4")
+        LessonMedia.objects.create(lesson=lesson, media=media, ordering=i)
+    owner = UserFactory.create()
+
+    def graph(course_id: str):
+        return {
+            "lessons": list(
+                Lesson.objects.filter(course_id=course_id).values_list("title", "ordering", "start_offset")
+            ),
+            "medias": list(
+                LessonMedia.objects
+                .filter(lesson__course_id=course_id)
+                .order_by("lesson__ordering", "lesson__id", "ordering")
+                .values_list("lesson__title", "media_id", "ordering")
+            ),
+            "instructors": list(
+                CourseInstructor.objects.filter(course_id=course_id).values_list("instructor_id", "lead", "ordering")
+            ),
+            "assessments": set(Assessment.objects.filter(course_id=course_id).values_list("item_id", "weight")),
+            "categories": set(Course.objects.get(id=course_id).categories.values_list("id", flat=True)),
+            "policy": GradingPolicy.objects.values("assessment_weight", "completion_weight").get(course_id=course_id),
+        }
+
+    # a handful of statements whatever the size of the course
+    with django_assert_max_num_queries(12):
+        clone_id = Course.clone(course_id=course.pk, owner_id=owner.pk)
+
+    clone = Course.objects.get(id=clone_id)
+    assert (clone.owner_id, clone.title) == (owner.pk, f"{course.title} (Copy)")
+    assert graph(clone_id) == graph(course.pk)
+
+    with pytest.raises(Course.DoesNotExist):
+        Course.clone(course_id="missing")
+
+
+@pytest.mark.django_db
+def test_course_detail_document(rf: RequestFactory, django_assert_num_queries):
+    import minima.api  # noqa: F401, attaches the routers to the api
+    from apps.course.api.v1 import get_detail, router
+
+    related = CourseFactory.create()
+    course = CourseFactory.create()
+    # the factory only links categories, certificates and courses that already exist
+    leaf = Category.add_root(name="Detail Root").add_child(name="Detail Branch").add_child(name="Detail Leaf")
+    course.categories.set([leaf])
+    course.certificates.set([CertificateFactory.create(post_generation={"user": course.owner})])
+    course.related_courses.set([related])
+    instructors = CourseInstructor.objects.filter(course=course).order_by("pk").values_list("pk", flat=True)
+    CourseInstructor.reorder_many({pk: i for i, pk in enumerate(instructors)})
+
+    [op] = [
+        op for path_view in router.path_operations.values() for op in path_view.operations if op.view_func is get_detail
+    ]
+    get_detail_document = async_to_sync(Course.get_detail_document)
+
+    def unsigned(content: bytes):
+        # signatures carry the signing time
+        return re.sub(rb'\?X-Amz-[^"]*', b"", content)
+
+    expected = op._result_to_response(rf.get("/"), async_to_sync(Course.get_detail)(course.pk), HttpResponse()).content
+    assert unsigned(get_detail_document(course.pk)) == unsigned(expected)
+    document = msgspec.json.decode(expected)
+    assert document["faqItems"]
+    assert document["categories"] == [{"id": leaf.pk, "name": leaf.name, "ancestors": ["Detail Root", "Detail Branch"]}]
+    assert document["certificates"][0]["issuer"]["name"]
+    assert document["instructors"][0]["lead"] and document["instructors"][0]["bio"]
+    assert [related_course["id"] for related_course in document["relatedCourses"]] == [related.pk]
+
+    # only the version lookup once cached, nothing when the etag decorator passes its version
+    with django_assert_num_queries(1):
+        assert unsigned(get_detail_document(course.pk)) == unsigned(expected)
+    version = async_to_sync(Course.get_detail_version)(course.pk)
+    with django_assert_num_queries(0):
+        assert unsigned(get_detail_document(course.pk, version=version)) == unsigned(expected)
+
+    course.title = "Detail Renamed"
+    course.save()
+    assert msgspec.json.decode(get_detail_document(course.pk))["title"] == course.title
+
+    with pytest.raises(Course.DoesNotExist):
+        get_detail_document("missing")
+
+
 @pytest.mark.order(-2)
 @pytest.mark.load_data
 def test_load_course_data(db_no_rollback: DjangoDbBlocker):
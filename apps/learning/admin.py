@@ -1,7 +1,51 @@
+import csv
+import io
+
+from asgiref.sync import async_to_sync
+from django import forms
 from django.contrib import admin
+from django.contrib.contenttypes.models import ContentType
+from django.shortcuts import redirect, render
+from django.utils.translation import gettext_lazy as _
+from unfold.decorators import action
+from unfold.widgets import (
+    UnfoldAdminFileFieldWidget,
+    UnfoldAdminSelectWidget,
+    UnfoldAdminSplitDateTimeWidget,
+    UnfoldAdminTextInputWidget,
+)
 
 from apps.common.admin import ModelAdmin, ReadOnlyHiddenModelAdmin, ReadOnlyTabularInline
-from apps.learning.models import Catalog, CatalogItem, Enrollment, UserCatalog
+from apps.common.util import AuthenticatedRequest
+from apps.learning.models import ENROLLABLE_MODELS, Catalog, CatalogItem, Enrollment, UserCatalog
+from apps.partner.models import Cohort
+
+
+class BulkEnrollmentForm(forms.Form):
+    content_type = forms.ModelChoiceField(
+        ContentType.objects.filter(model__in=[m.__name__.lower() for m in ENROLLABLE_MODELS]),
+        label=_("Content Type"),
+        widget=UnfoldAdminSelectWidget(),
+    )
+    content_id = forms.CharField(label=_("Content ID"), max_length=36, widget=UnfoldAdminTextInputWidget())
+    cohort = forms.ModelChoiceField(
+        Cohort.objects.all(), label=_("Cohort"), required=False, widget=UnfoldAdminSelectWidget()
+    )
+    emails = forms.FileField(
+        label=_("Email CSV"),
+        required=False,
+        help_text=_("One email per row in the first column"),
+        widget=UnfoldAdminFileFieldWidget(),
+    )
+    end = forms.SplitDateTimeField(label=_("End"), widget=UnfoldAdminSplitDateTimeWidget())
+
+    def clean_emails(self):
+        file = self.cleaned_data["emails"]
+        if not file:
+            return []
+        rows = csv.reader(io.StringIO(file.read().decode("utf-8-sig")))
+        # header and blank rows have no email
+        return [row[0].strip() for row in rows if row and "@" in row[0]]
 
 
 @admin.register(Enrollment)
@@ -11,6 +55,42 @@ class EnrollmentAdmin(ModelAdmin[Enrollment]):
 
     inlines = (EnrollmentEventInline,)
 
+    actions_list = ["bulk_enroll"]
+
+    @action(description=_("Bulk Enroll"), url_path="bulk-enroll", permissions=["bulk_enroll"])
+    def bulk_enroll(self, request: AuthenticatedRequest):
+        form = BulkEnrollmentForm(request.POST or None, request.FILES or None)
+
+        if request.method == "POST" and form.is_valid():
+            content_type = form.cleaned_data["content_type"]
+            cohort = form.cleaned_data["cohort"]
+            try:
+                result = async_to_sync(Enrollment.bulk_enroll)(
+                    app_label=content_type.app_label,
+                    model=content_type.model,
+                    content_id=form.cleaned_data["content_id"],
+                    enrolled_by_id=request.user.pk,
+                    end=form.cleaned_data["end"],
+                    emails=form.cleaned_data["emails"],
+                    cohort_id=cohort.pk if cohort else None,
+                )
+            except ValueError as e:
+                form.add_error(None, str(e))
+            else:
+                self.message_user(
+                    request, _("%(inserted_count)s enrolled, %(skipped_count)s already enrolled") % result
+                )
+                return redirect("admin:learning_enrollment_changelist")
+
+        return render(
+            request,
+            "learning/admin/bulk_enroll.html",
+            {**self.admin_site.each_context(request), "title": _("Bulk Enroll"), "form": form},
+        )
+
+    def has_bulk_enroll_permission(self, request: AuthenticatedRequest):
+        return request.user.is_staff
+
 
 @admin.register(Enrollment.pgh_event_model)
 class EnrollmentEventAdmin(ReadOnlyHiddenModelAdmin[Enrollment.pgh_event_model]):
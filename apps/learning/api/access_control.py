@@ -1,13 +1,17 @@
 import logging
 from functools import wraps
 
+from asgiref.sync import sync_to_async
 from celery.exceptions import ImproperlyConfigured
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
 from django.utils import timezone
 
 from apps.common.error import ErrorCode
-from apps.common.util import AccessDate, HttpRequest, openapi_query_param
+from apps.common.util import AccessDate, HttpRequest, cache_version, model_version_key, openapi_query_param
 from apps.content.models import PublicAccessMedia
-from apps.course.models import Course
+from apps.course.models import ASSESSIBLE_MODEL_MAP, Assessment, Course, Lesson, LessonMedia
 from apps.learning.models import Enrollment
 
 log = logging.getLogger(__name__)
@@ -26,43 +30,9 @@ def access_date(app_label, model, *, id_field: str = "id"):
                 raise ImproperlyConfigured("id_field is required")
 
             course_id = request.GET.get("course")
-
-            # step 1: check enrollment
-
-            if course_id:
-                candidate = (course_id, Course._meta.app_label, Course._meta.model.__name__.lower())
-            else:
-                candidate = (content_id, app_label, model)
-
-            enrollment = await Enrollment.objects.filter(
-                user_id=user_id,
-                active=True,
-                content_id=candidate[0],
-                content_type__app_label=candidate[1],
-                content_type__model=candidate[2],
-            ).afirst()  # unique
-
-            public_access = None
-            if app_label == "content" and model == "media":
-                public_access = await PublicAccessMedia.get_access_date(media_id=content_id)
-
-            # more favorable access date between enrollment and public access
-            accessible = _get_favorable_date(enrollment, public_access)
-
-            # step 2: override accessible date by context
-
-            if course_id:
-                try:
-                    accessible = await Course.content_effective_date(
-                        course_id=course_id,
-                        content_id=content_id,
-                        app_label=app_label,
-                        model=model,
-                        access_date=accessible,
-                    )
-                except ValueError as e:
-                    log.error(e, exc_info=True)
-                    raise ValueError(ErrorCode.ACCESS_DENIED)
+            accessible = await get_access_date(
+                user_id=user_id, content_id=content_id, app_label=app_label, model=model, course_id=course_id
+            )
 
             # step 3: check access date
 
@@ -87,6 +57,102 @@ def access_date(app_label, model, *, id_field: str = "id"):
     return decorator
 
 
+async def get_access_date(*, user_id: str, content_id: str, app_label: str, model: str, course_id: str | None):
+    # Resolved access dates are cached per (user, content, course) and tagged with the versions they were resolved
+    # under: the user's enrollments and the course/public access tables. A single cache round trip serves the
+    # steady state, any tracked write changes a version and the next request resolves again.
+    entry_key = f"learning:accessdate:{user_id}:{app_label}.{model}:{content_id}:{course_id or ''}"
+    version_keys = [
+        model_version_key(Enrollment, user_id),
+        *[model_version_key(m) for m in (Assessment, Lesson, LessonMedia, PublicAccessMedia)],
+    ]
+
+    cached = await cache.aget_many([entry_key, *version_keys])
+    entry = cached.get(entry_key)
+    if entry and entry[0] == [cached.get(key) for key in version_keys]:
+        return entry[1]
+
+    # versions are read before resolving, a write in between leaves a stale entry that never matches again
+    versions = await cache_version(*version_keys)
+    accessible, public_archive = await resolve_access_date(
+        user_id=user_id, content_id=content_id, app_label=app_label, model=model, course_id=course_id
+    )
+
+    # public access is filtered by now, the entry must not outlive the window it was resolved in
+    timeout = settings.ACCESS_DATE_CACHE_TIMEOUT
+    if public_archive:
+        timeout = min(timeout, int((public_archive - timezone.now()).total_seconds()))
+    if timeout > 0:
+        await cache.aset(entry_key, (versions, accessible), timeout)
+
+    return accessible
+
+
+async def resolve_access_date(*, user_id: str, content_id: str, app_label: str, model: str, course_id: str | None):
+    # One round trip to learning_access_date (learning 0002), which merges enrollment and public access
+    # and applies the course offsets like cascade_access_date does step by step.
+    if course_id and not (ASSESSIBLE_MODEL_MAP.get((app_label, model)) or (app_label, model) == ("content", "media")):
+        log.error(ErrorCode.UNKNOWN_COURSE_CONTENT)
+        raise ValueError(ErrorCode.ACCESS_DENIED)
+
+    def _execute():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT * FROM learning_access_date(%s, %s, %s, %s, %s, %s)",
+                [user_id, app_label, model, str(content_id), course_id or None, timezone.now()],
+            )
+            return cursor.fetchone()
+
+    row = await sync_to_async(_execute, thread_sensitive=True)()
+    if not row:
+        raise ValueError(ErrorCode.ACCESS_DENIED)
+
+    start, end, archive, item_found, public_archive = row
+    if course_id and not item_found:
+        M = Assessment if ASSESSIBLE_MODEL_MAP.get((app_label, model)) else Lesson
+        raise M.DoesNotExist(f"{M._meta.object_name} matching query does not exist.")
+
+    return AccessDate(start=start, end=end, archive=archive), public_archive
+
+
+async def cascade_access_date(*, user_id: str, content_id: str, app_label: str, model: str, course_id: str | None):
+    # reference implementation of resolve_access_date
+    # step 1: check enrollment
+
+    if course_id:
+        candidate = (course_id, Course._meta.app_label, Course._meta.model.__name__.lower())
+    else:
+        candidate = (content_id, app_label, model)
+
+    enrollment = await Enrollment.objects.filter(
+        user_id=user_id,
+        active=True,
+        content_id=candidate[0],
+        content_type__app_label=candidate[1],
+        content_type__model=candidate[2],
+    ).afirst()  # unique
+
+    public_access = None
+    if app_label == "content" and model == "media":
+        public_access = await PublicAccessMedia.get_access_date(media_id=content_id)
+
+    # more favorable access date between enrollment and public access
+    accessible = _get_favorable_date(enrollment, public_access)
+
+    # step 2: override accessible date by context
+
+    if course_id:
+        try:
+            accessible = await Course.content_effective_date(
+                course_id=course_id, content_id=content_id, app_label=app_label, model=model, access_date=accessible
+            )
+        except ValueError as e:
+            log.error(e, exc_info=True)
+            raise ValueError(ErrorCode.ACCESS_DENIED)
+
+    return accessible, public_access.archive if public_access else None
+
+
 def _get_favorable_date(a: Enrollment | None, b: PublicAccessMedia | None) -> AccessDate:
     if a and b:
         return AccessDate(start=min(a.start, b.start), end=max(a.end, b.end), archive=max(a.archive, b.archive))
@@ -4,7 +4,7 @@ from pydantic.root_model import RootModel
 
 from apps.account.api.schema import OwnerSchema
 from apps.common.schema import ContentTypeSchema, LearningObjectMixinSchema, Schema, TimeStampedMixinSchema
-from apps.learning.models import CatalogItem, Enrollment
+from apps.learning.models import CatalogItem, Enrollment, Recommendation
 
 
 class EnrollmentSchema(TimeStampedMixinSchema):
@@ -57,6 +57,17 @@ class CatalogItemSchema(TimeStampedMixinSchema):
         return item._content_cache
 
 
+class RecommendationSchema(Schema):
+    content: CatalogItemSchema.CatalogContentSchema
+    content_type: ContentTypeSchema
+    score: float
+    learner_count: int
+
+    @staticmethod
+    def resolve_content(item: Recommendation):
+        return item._content_cache
+
+
 class CatalogItemEnrollSchema(Schema):
     app_label: str
     model: str
@@ -75,3 +86,17 @@ class EnrollmentSuccessSchema(TimeStampedMixinSchema):
 
 class UnEnrollSchema(Schema):
     enrollment_id: int
+
+
+class BulkEnrollmentSchema(CatalogItemEnrollSchema):
+    user_ids: list[str] = []
+    emails: list[str] = []
+    cohort_id: int | None = None
+    start: datetime | None = None
+    end: datetime
+    archive: datetime | None = None
+
+
+class BulkEnrollmentResultSchema(Schema):
+    inserted_count: int
+    skipped_count: int
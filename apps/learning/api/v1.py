@@ -4,28 +4,33 @@ from django.conf import settings
 from ninja.params import functions
 from ninja.router import Router
 
-from apps.common.util import HttpRequest, PaginatedResponse
+from apps.common.util import CursorPaginatedResponse, HttpRequest, PaginatedResponse, struct_response
 from apps.learning.api.schema import (
+    BulkEnrollmentResultSchema,
+    BulkEnrollmentSchema,
     CatalogItemEnrollSchema,
     CatalogItemSchema,
     CatalogSchema,
     EnrollmentSchema,
     EnrollmentSuccessSchema,
     LearningRecordSchema,
+    RecommendationSchema,
 )
-from apps.learning.models import Catalog, Enrollment
+from apps.learning.models import Catalog, Enrollment, Recommendation
 
 router = Router(by_alias=True)
 
 
-@router.get("/enrollment", response=PaginatedResponse[EnrollmentSchema])
+@router.get("/enrollment", response=CursorPaginatedResponse[EnrollmentSchema])
+@struct_response
 async def get_enrolled(
     request: HttpRequest,
     page: Annotated[int, functions.Query(1, ge=1)],
     size: Annotated[int, functions.Query(settings.DEFAULT_PAGINATION_SIZE, gte=1, le=100)],
+    cursor: Annotated[str | None, functions.Query(None)],
 ):
     # Custom pagination with generic relationship
-    return await Enrollment.get_enrolled(user_id=request.auth, page=page, size=size)
+    return await Enrollment.get_enrolled(user_id=request.auth, page=page, size=size, cursor=cursor)
 
 
 @router.delete("/enrollment/{id}")
@@ -33,14 +38,21 @@ async def unenroll(request: HttpRequest, id: int):
     await Enrollment.deactivate(id=id, user_id=request.auth)
 
 
+@router.post("/enrollment/bulk", response=BulkEnrollmentResultSchema)
+async def bulk_enroll(request: HttpRequest, data: BulkEnrollmentSchema):
+    # staff only, users are given as ids, emails or a partner cohort
+    return await Enrollment.bulk_enroll(**data.model_dump(), enrolled_by_id=request.auth)
+
+
 @router.get("/record", response=LearningRecordSchema)
+@struct_response
 async def get_records(request: HttpRequest):
     return await Enrollment.get_records(request.auth)
 
 
 @router.get("/catalog", response=list[CatalogSchema])
 async def get_catalogs(request: HttpRequest):
-    return [c async for c in Catalog.get_catalogs(request.auth)]
+    return await Catalog.get_catalogs(request.auth)
 
 
 @router.get("/catalog/{id}/item", response=PaginatedResponse[CatalogItemSchema])
@@ -64,3 +76,17 @@ async def enroll_catalog_item(request: HttpRequest, id: int, data: CatalogItemEn
         model=data.model,
         enrolled_by_id=request.auth,
     )
+
+
+@router.get("/recommendation/{app_label}/{model}/{id}", response=list[RecommendationSchema])
+async def get_recommendations(
+    request: HttpRequest,
+    app_label: str,
+    model: str,
+    id: str,
+    size: Annotated[int, functions.Query(10, ge=1, le=settings.RECOMMENDATION_TOP_N)],
+):
+    # learners also took, precomputed by the rebuild_recommendation task
+    return await Recommendation.get_recommendations(
+        app_label=app_label, model=model, content_id=id, user_id=request.auth, size=size
+    )
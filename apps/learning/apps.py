@@ -6,3 +6,17 @@ class LearningConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.learning"
     verbose_name = _("Learning")
+
+    def ready(self):
+        from apps.common.util import track_model_version
+        from apps.content.models import PublicAccessMedia
+        from apps.course.models import Assessment, Lesson, LessonMedia
+        from apps.learning.models import Catalog, CatalogItem, Enrollment, UserCatalog
+
+        # access date cache
+        track_model_version(Assessment, Lesson, LessonMedia, PublicAccessMedia)
+        track_model_version(Enrollment, scope="user_id")
+
+        # catalog cache, enrollment versions above also tag the enrolled sets
+        track_model_version(Catalog, CatalogItem)
+        track_model_version(UserCatalog, scope="user_id")
@@ -0,0 +1,18 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext as _
+
+from apps.learning.models import ContentCard
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = _("Rebuild content cards from enrollable contents and their owners")
+
+    def handle(self, *args: object, **options: dict[str, object]):
+        result = ContentCard.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(_("Replaced %(deleted_count)s cards with %(card_count)s content cards") % result)
+        )
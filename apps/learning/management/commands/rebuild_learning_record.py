@@ -0,0 +1,21 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils.translation import gettext as _
+
+from apps.learning.models import LearningRecord
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = _("Rebuild learning records from watches, confirmed grades and gradebooks")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--user", dest="user_id", default=None, help=_("Rebuild only this user's records"))
+
+    def handle(self, *args: object, **options: dict[str, object]):
+        result = LearningRecord.rebuild(options["user_id"])  # type: ignore[arg-type]
+        self.stdout.write(
+            self.style.SUCCESS(_("Replaced %(deleted_count)s records with %(record_count)s learning records") % result)
+        )
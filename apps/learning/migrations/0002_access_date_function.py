@@ -0,0 +1,87 @@
+# Generated by Django 6.0.1 on 2026-10-16 21:52
+
+from django.db import migrations
+
+# cf. apps.learning.api.access_control.cascade_access_date
+ACCESS_DATE_FUNCTION = """
+    CREATE OR REPLACE FUNCTION learning_access_date(
+        p_user_id text, p_app_label text, p_model text, p_content_id text, p_course_id text, p_now timestamptz
+    )
+    RETURNS TABLE (
+        start timestamptz, "end" timestamptz, archive timestamptz, item_found boolean, public_archive timestamptz
+    )
+    LANGUAGE sql STABLE AS $$
+        WITH enrollment AS (
+            SELECT e.start, e."end", e.archive
+            FROM learning_enrollment e
+            JOIN django_content_type ct ON ct.id = e.content_type_id
+            WHERE e.user_id = p_user_id
+                AND e.active
+                AND e.content_id = coalesce(p_course_id, p_content_id)
+                AND ct.app_label = CASE WHEN p_course_id IS NULL THEN p_app_label ELSE 'course' END
+                AND ct.model = CASE WHEN p_course_id IS NULL THEN p_model ELSE 'course' END
+            ORDER BY e.id
+            LIMIT 1
+        ),
+        public_access AS (
+            SELECT p.start, p."end", p.archive
+            FROM content_publicaccessmedia p
+            WHERE p_app_label = 'content'
+                AND p_model = 'media'
+                AND p.media_id = p_content_id
+                AND p.start <= p_now
+                AND p.archive >= p_now
+            ORDER BY p.id
+            LIMIT 1
+        ),
+        accessible AS (
+            -- more favorable access date between enrollment and public access
+            SELECT min(a.start) AS start, max(a."end") AS "end", max(a.archive) AS archive
+            FROM (SELECT * FROM enrollment UNION ALL SELECT * FROM public_access) a
+            HAVING count(*) > 0
+        ),
+        item AS (
+            SELECT a.start_offset, a.end_offset
+            FROM course_assessment a
+            JOIN django_content_type ct ON ct.id = a.item_type_id
+            WHERE a.course_id = p_course_id AND a.item_id = p_content_id
+                AND ct.app_label = p_app_label AND ct.model = p_model
+            UNION ALL
+            -- unique by lessonmedia trigger
+            SELECT l.start_offset, l.end_offset
+            FROM course_lesson l
+            JOIN course_lessonmedia lm ON lm.lesson_id = l.id
+            WHERE l.course_id = p_course_id AND lm.media_id = p_content_id
+                AND p_app_label = 'content' AND p_model = 'media'
+            LIMIT 1
+        )
+        SELECT
+            a.start + make_interval(days => coalesce(i.start_offset, 0)),
+            CASE
+                WHEN i.end_offset IS NULL THEN a."end"
+                ELSE a.start + make_interval(days => i.start_offset + i.end_offset)
+            END,
+            a.archive,
+            i.start_offset IS NOT NULL,
+            (SELECT p.archive FROM public_access p)
+        FROM accessible a
+        LEFT JOIN item i ON p_course_id IS NOT NULL
+    $$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0001_initial'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('course', '0001_initial'),
+        ('learning', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=ACCESS_DATE_FUNCTION,
+            reverse_sql='DROP FUNCTION IF EXISTS learning_access_date(text, text, text, text, text, timestamptz);',
+        ),
+    ]
@@ -0,0 +1,214 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+RECORD_TABLE = "learning_learningrecord"
+
+# cf. apps.learning.models.LearningRecord.get_sources
+UPSERT_RECORD = f"""
+    INSERT INTO {RECORD_TABLE} (user_id, content_id, context, value, source, source_id, modified)
+    %s
+    ON CONFLICT (user_id, content_id, context) DO UPDATE
+    SET value = EXCLUDED.value, source = EXCLUDED.source, source_id = EXCLUDED.source_id, modified = EXCLUDED.modified
+"""
+
+WATCH_TRIGGER = f"""
+    CREATE OR REPLACE FUNCTION learning_record_watch()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        -- heartbeats only move last_position and watch_bits most of the time
+        IF TG_OP = 'UPDATE' AND (NEW.user_id, NEW.media_id, NEW.context, NEW.rate)
+            IS NOT DISTINCT FROM (OLD.user_id, OLD.media_id, OLD.context, OLD.rate) THEN
+            RETURN NULL;
+        END IF;
+
+        IF TG_OP <> 'INSERT' THEN
+            DELETE FROM {RECORD_TABLE} WHERE source = 'watch' AND source_id = OLD.id;
+        END IF;
+
+        IF TG_OP <> 'DELETE' THEN
+            {UPSERT_RECORD % "VALUES (NEW.user_id, NEW.media_id, NEW.context, round(NEW.rate::numeric, 2), 'watch', NEW.id, now())"};
+        END IF;
+
+        RETURN NULL;
+    END;
+    $$;
+
+    CREATE TRIGGER learning_record_watch
+    AFTER INSERT OR UPDATE OR DELETE ON content_watch
+    FOR EACH ROW EXECUTE FUNCTION learning_record_watch();
+"""
+
+GRADEBOOK_TRIGGER = f"""
+    CREATE OR REPLACE FUNCTION learning_record_gradebook()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND (NEW.engagement_id, NEW.score) IS NOT DISTINCT FROM (OLD.engagement_id, OLD.score) THEN
+            RETURN NULL;
+        END IF;
+
+        IF TG_OP <> 'INSERT' THEN
+            DELETE FROM {RECORD_TABLE} WHERE source = 'gradebook' AND source_id = OLD.id;
+        END IF;
+
+        IF TG_OP <> 'DELETE' THEN
+            {UPSERT_RECORD % '''
+                SELECT e.learner_id, e.course_id, 'course::' || e.course_id || '::' || e.id, NEW.score, 'gradebook', NEW.id, now()
+                FROM course_engagement e
+                WHERE e.id = NEW.engagement_id
+            '''};
+        END IF;
+
+        RETURN NULL;
+    END;
+    $$;
+
+    CREATE TRIGGER learning_record_gradebook
+    AFTER INSERT OR UPDATE OR DELETE ON course_gradebook
+    FOR EACH ROW EXECUTE FUNCTION learning_record_gradebook();
+"""
+
+# cf. apps.learning.models.ALL_GRADE_MODELS
+GRADE_APPS = ["exam", "assignment", "discussion", "quiz"]
+
+
+def grade_trigger(app: str):
+    # a record exists only for the confirmed grade of an active attempt, source_id is the attempt id
+    return f"""
+        CREATE OR REPLACE FUNCTION learning_record_sync_{app}(p_attempt_id bigint)
+        RETURNS void LANGUAGE sql AS $$
+            DELETE FROM {RECORD_TABLE} WHERE source = '{app}' AND source_id = p_attempt_id;
+            {UPSERT_RECORD % f'''
+                SELECT a.learner_id, a.{app}_id, a.context, round(g.score::numeric, 2), '{app}', a.id, now()
+                FROM {app}_attempt a
+                JOIN {app}_grade g ON g.attempt_id = a.id
+                WHERE a.id = p_attempt_id AND a.active AND g.completed IS NOT NULL AND g.confirmed IS NOT NULL
+            '''};
+        $$;
+
+        CREATE OR REPLACE FUNCTION learning_record_{app}_grade()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND (NEW.attempt_id, NEW.score, NEW.completed, NEW.confirmed)
+                IS NOT DISTINCT FROM (OLD.attempt_id, OLD.score, OLD.completed, OLD.confirmed) THEN
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND NEW.attempt_id <> OLD.attempt_id) THEN
+                PERFORM learning_record_sync_{app}(OLD.attempt_id);
+            END IF;
+
+            IF TG_OP <> 'DELETE' THEN
+                PERFORM learning_record_sync_{app}(NEW.attempt_id);
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$;
+
+        CREATE OR REPLACE FUNCTION learning_record_{app}_attempt()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                DELETE FROM {RECORD_TABLE} WHERE source = '{app}' AND source_id = OLD.id;
+            ELSIF (NEW.learner_id, NEW.{app}_id, NEW.context, NEW.active)
+                IS DISTINCT FROM (OLD.learner_id, OLD.{app}_id, OLD.context, OLD.active) THEN
+                PERFORM learning_record_sync_{app}(NEW.id);
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$;
+
+        CREATE TRIGGER learning_record_{app}_grade
+        AFTER INSERT OR UPDATE OR DELETE ON {app}_grade
+        FOR EACH ROW EXECUTE FUNCTION learning_record_{app}_grade();
+
+        CREATE TRIGGER learning_record_{app}_attempt
+        AFTER UPDATE OR DELETE ON {app}_attempt
+        FOR EACH ROW EXECUTE FUNCTION learning_record_{app}_attempt();
+    """
+
+
+# existing sources, cf. apps.learning.models.LearningRecord.rebuild
+BACKFILL = f"""
+    INSERT INTO {RECORD_TABLE} (user_id, content_id, context, value, source, source_id, modified)
+    SELECT w.user_id, w.media_id, w.context, round(w.rate::numeric, 2), 'watch', w.id, now()
+    FROM content_watch w
+    {"".join(f'''
+    UNION ALL
+    SELECT a.learner_id, a.{app}_id, a.context, round(g.score::numeric, 2), '{app}', a.id, now()
+    FROM {app}_attempt a
+    JOIN {app}_grade g ON g.attempt_id = a.id
+    WHERE a.active AND g.completed IS NOT NULL AND g.confirmed IS NOT NULL
+    ''' for app in GRADE_APPS)}
+    UNION ALL
+    SELECT e.learner_id, e.course_id, 'course::' || e.course_id || '::' || e.id, gb.score, 'gradebook', gb.id, now()
+    FROM course_gradebook gb
+    JOIN course_engagement e ON e.id = gb.engagement_id
+    ON CONFLICT (user_id, content_id, context) DO NOTHING;
+"""
+
+
+def drop_grade_trigger(app: str):
+    return f"""
+        DROP TRIGGER IF EXISTS learning_record_{app}_attempt ON {app}_attempt;
+        DROP TRIGGER IF EXISTS learning_record_{app}_grade ON {app}_grade;
+        DROP FUNCTION IF EXISTS learning_record_{app}_attempt();
+        DROP FUNCTION IF EXISTS learning_record_{app}_grade();
+        DROP FUNCTION IF EXISTS learning_record_sync_{app}(bigint);
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0001_initial'),
+        ('content', '0001_initial'),
+        ('course', '0001_initial'),
+        ('discussion', '0001_initial'),
+        ('exam', '0001_initial'),
+        ('learning', '0002_access_date_function'),
+        ('quiz', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearningRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_id', models.CharField(max_length=36, verbose_name='Content ID')),
+                ('context', models.CharField(blank=True, default='', max_length=255, verbose_name='Context Key')),
+                ('value', models.FloatField(verbose_name='Value')),
+                ('source', models.CharField(max_length=20, verbose_name='Source')),
+                ('source_id', models.BigIntegerField(verbose_name='Source ID')),
+                ('modified', models.DateTimeField(auto_now=True, verbose_name='Modified')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Learning Record',
+                'verbose_name_plural': 'Learning Records',
+                'indexes': [models.Index(fields=['source', 'source_id'], name='learning_le_source_2087bb_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'content_id', 'context'), name='learning_learningrecord_us_coid_co_uniq')],
+            },
+        ),
+        migrations.RunSQL(
+            sql=WATCH_TRIGGER,
+            reverse_sql='''
+                DROP TRIGGER IF EXISTS learning_record_watch ON content_watch;
+                DROP FUNCTION IF EXISTS learning_record_watch();
+            ''',
+        ),
+        migrations.RunSQL(
+            sql=GRADEBOOK_TRIGGER,
+            reverse_sql='''
+                DROP TRIGGER IF EXISTS learning_record_gradebook ON course_gradebook;
+                DROP FUNCTION IF EXISTS learning_record_gradebook();
+            ''',
+        ),
+        *[migrations.RunSQL(sql=grade_trigger(app), reverse_sql=drop_grade_trigger(app)) for app in GRADE_APPS],
+        migrations.RunSQL(sql=BACKFILL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,171 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+CARD_TABLE = "learning_contentcard"
+
+# cf. apps.learning.models.CONTENT_CARD_FIELDS
+CARD_FIELDS = [
+    "created",
+    "modified",
+    "title",
+    "description",
+    "audience",
+    "thumbnail",
+    "featured",
+    "format",
+    "duration",
+    "passing_point",
+    "max_attempts",
+    "verification_required",
+]
+
+OWNER_OBJ = "jsonb_build_object('id', u.id, 'name', u.name, 'email', u.email, 'avatar', u.avatar, 'nickname', u.nickname)"
+
+CONTENT_CARD_TRIGGER = f"""
+    CREATE OR REPLACE FUNCTION learning_content_card()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        v_content_type_id integer;
+    BEGIN
+        -- TG_ARGV: app_label, model
+        SELECT id INTO v_content_type_id
+        FROM django_content_type
+        WHERE app_label = TG_ARGV[0] AND model = TG_ARGV[1];
+
+        IF v_content_type_id IS NULL THEN
+            RETURN NULL;
+        END IF;
+
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM {CARD_TABLE} WHERE content_type_id = v_content_type_id AND content_id = OLD.id;
+            RETURN NULL;
+        END IF;
+
+        INSERT INTO {CARD_TABLE} (content_type_id, content_id, {", ".join(CARD_FIELDS)}, owner_id, owner_obj)
+        SELECT v_content_type_id, NEW.id, {", ".join(f"NEW.{f}" for f in CARD_FIELDS)}, u.id, {OWNER_OBJ}
+        FROM account_user u
+        WHERE u.id = NEW.owner_id
+        ON CONFLICT (content_type_id, content_id) DO UPDATE
+        SET {", ".join(f"{f} = EXCLUDED.{f}" for f in [*CARD_FIELDS, "owner_id", "owner_obj"])};
+
+        RETURN NULL;
+    END;
+    $$;
+
+    CREATE OR REPLACE FUNCTION learning_content_card_owner()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE {CARD_TABLE} c
+        SET owner_obj = {OWNER_OBJ}
+        FROM account_user u
+        WHERE u.id = NEW.id AND c.owner_id = NEW.id;
+
+        RETURN NULL;
+    END;
+    $$;
+
+    CREATE TRIGGER learning_content_card_owner
+    AFTER UPDATE ON account_user
+    FOR EACH ROW
+    WHEN ((NEW.name, NEW.email, NEW.avatar, NEW.nickname) IS DISTINCT FROM (OLD.name, OLD.email, OLD.avatar, OLD.nickname))
+    EXECUTE FUNCTION learning_content_card_owner();
+"""
+
+# cf. apps.learning.models.ENROLLABLE_MODELS
+ENROLLABLE_TABLES = [
+    ("course", "course"),
+    ("content", "media"),
+    ("exam", "exam"),
+    ("assignment", "assignment"),
+    ("discussion", "discussion"),
+    ("survey", "survey"),
+]
+
+
+def content_trigger(app_label: str, model: str):
+    return f"""
+        CREATE TRIGGER learning_content_card
+        AFTER INSERT OR UPDATE OR DELETE ON {app_label}_{model}
+        FOR EACH ROW EXECUTE FUNCTION learning_content_card('{app_label}', '{model}');
+    """
+
+
+def content_backfill(app_label: str, model: str):
+    # existing rows, cf. apps.learning.models.ContentCard.rebuild
+    # content types are created after migrate, a fresh database has no rows to backfill either
+    return f"""
+        INSERT INTO {CARD_TABLE} (content_type_id, content_id, {", ".join(CARD_FIELDS)}, owner_id, owner_obj)
+        SELECT ct.id, c.id, {", ".join(f"c.{f}" for f in CARD_FIELDS)}, u.id, {OWNER_OBJ}
+        FROM {app_label}_{model} c
+        JOIN account_user u ON u.id = c.owner_id
+        JOIN django_content_type ct ON ct.app_label = '{app_label}' AND ct.model = '{model}'
+        ON CONFLICT (content_type_id, content_id) DO NOTHING;
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_user_tokens_revoked'),
+        ('assignment', '0001_initial'),
+        ('content', '0001_initial'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('course', '0001_initial'),
+        ('discussion', '0001_initial'),
+        ('exam', '0001_initial'),
+        ('learning', '0003_learningrecord'),
+        ('survey', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_id', models.CharField(max_length=36, verbose_name='Content ID')),
+                ('created', models.DateTimeField(verbose_name='Created')),
+                ('modified', models.DateTimeField(verbose_name='Modified')),
+                ('title', models.CharField(max_length=255, verbose_name='Title')),
+                ('description', models.TextField(blank=True, default='', verbose_name='Description')),
+                ('audience', models.TextField(blank=True, default='', verbose_name='Audience')),
+                ('thumbnail', models.ImageField(blank=True, null=True, upload_to='', verbose_name='Thumbnail')),
+                ('featured', models.BooleanField(default=False, verbose_name='Featured')),
+                ('format', models.CharField(blank=True, default='', max_length=30, verbose_name='Format')),
+                ('duration', models.DurationField(blank=True, null=True, verbose_name='Duration')),
+                ('passing_point', models.PositiveSmallIntegerField(default=60, verbose_name='Passing Point')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Max Attempts')),
+                ('verification_required', models.BooleanField(default=False, verbose_name='Verification Required')),
+                ('owner_obj', models.JSONField(verbose_name='Owner Snapshot')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype', verbose_name='Content Type')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Owner')),
+            ],
+            options={
+                'verbose_name': 'Content Card',
+                'verbose_name_plural': 'Content Cards',
+                'constraints': [models.UniqueConstraint(fields=('content_type', 'content_id'), name='learning_contentcard_coty_coid_uniq')],
+            },
+        ),
+        migrations.RunSQL(
+            sql=CONTENT_CARD_TRIGGER,
+            reverse_sql='''
+                DROP TRIGGER IF EXISTS learning_content_card_owner ON account_user;
+                DROP FUNCTION IF EXISTS learning_content_card_owner();
+                DROP FUNCTION IF EXISTS learning_content_card();
+            ''',
+        ),
+        *[
+            migrations.RunSQL(
+                sql=content_trigger(app_label, model),
+                reverse_sql=f'DROP TRIGGER IF EXISTS learning_content_card ON {app_label}_{model};',
+            )
+            for app_label, model in ENROLLABLE_TABLES
+        ],
+        *[
+            migrations.RunSQL(sql=content_backfill(app_label, model), reverse_sql=migrations.RunSQL.noop)
+            for app_label, model in ENROLLABLE_TABLES
+        ],
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:05
+
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0004_contentcard'),
+    ]
+
+    operations = [
+        pgtrigger.migrations.RemoveTrigger(
+            model_name='enrollment',
+            name='learning_enrollment_content_exists',
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name='enrollment',
+            trigger=pgtrigger.compiler.Trigger(name='learning_enrollment_content_exists', sql=pgtrigger.compiler.UpsertTriggerSql(func="\n        DECLARE\n            target record;\n            missing_id text;\n        BEGIN\n            FOR target IN\n                SELECT ct.app_label || '_' || ct.model AS table_name, array_agg(DISTINCT n.content_id) AS content_ids\n                FROM new_enrollments n\n                JOIN django_content_type ct ON ct.id = n.content_type_id\n                GROUP BY ct.app_label, ct.model\n            LOOP\n                EXECUTE format(\n                    'SELECT c FROM unnest($1) c WHERE NOT EXISTS (SELECT 1 FROM %I WHERE id = c) LIMIT 1',\n                    target.table_name\n                )\n                INTO missing_id USING target.content_ids;\n\n                IF missing_id IS NOT NULL THEN\n                    RAISE EXCEPTION 'Content % does not exist in %', missing_id, target.table_name;\n                END IF;\n            END LOOP;\n\n            RETURN NULL;\n        END;\n    ", hash='ef4cda6053333c1256bfe364cb07eebe5789af01', level='STATEMENT', operation='INSERT', pgid='pgtrigger_learning_enrollment_content_exists_91444', referencing='REFERENCING NEW TABLE AS new_enrollments ', table='learning_enrollment', when='AFTER')),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name='enrollment',
+            trigger=pgtrigger.compiler.Trigger(name='learning_enrollment_content_exists_update', sql=pgtrigger.compiler.UpsertTriggerSql(func="\n        DECLARE\n            target record;\n            missing_id text;\n        BEGIN\n            FOR target IN\n                SELECT ct.app_label || '_' || ct.model AS table_name, array_agg(DISTINCT n.content_id) AS content_ids\n                FROM new_enrollments n\n                JOIN django_content_type ct ON ct.id = n.content_type_id\n                GROUP BY ct.app_label, ct.model\n            LOOP\n                EXECUTE format(\n                    'SELECT c FROM unnest($1) c WHERE NOT EXISTS (SELECT 1 FROM %I WHERE id = c) LIMIT 1',\n                    target.table_name\n                )\n                INTO missing_id USING target.content_ids;\n\n                IF missing_id IS NOT NULL THEN\n                    RAISE EXCEPTION 'Content % does not exist in %', missing_id, target.table_name;\n                END IF;\n            END LOOP;\n\n            RETURN NULL;\n        END;\n    ", hash='d35afc22a4e9f10606cab3c6d12cf98757c6654e', level='STATEMENT', operation='UPDATE', pgid='pgtrigger_learning_enrollment_content_exists_update_7da58', referencing='REFERENCING NEW TABLE AS new_enrollments ', table='learning_enrollment', when='AFTER')),
+        ),
+    ]
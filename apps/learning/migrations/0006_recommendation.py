@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('learning', '0005_enrollment_content_exists_statement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Created')),
+                ('modified', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Modified')),
+                ('source_id', models.CharField(max_length=36, verbose_name='Source ID')),
+                ('content_id', models.CharField(max_length=36, verbose_name='Content ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Rank')),
+                ('score', models.FloatField(verbose_name='Score')),
+                ('learner_count', models.PositiveIntegerField(verbose_name='Learner Count')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype', verbose_name='Content Type')),
+                ('source_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype', verbose_name='Source Type')),
+            ],
+            options={
+                'verbose_name': 'Recommendation',
+                'verbose_name_plural': 'Recommendations',
+                'constraints': [models.UniqueConstraint(fields=('source_type', 'source_id', 'rank'), name='learning_recommendation_soty_soid_ra_uniq')],
+            },
+        ),
+    ]
@@ -1,26 +1,38 @@
+import math
 from collections import defaultdict
-from datetime import timedelta
-from typing import TYPE_CHECKING
+from collections.abc import Awaitable, Callable, Mapping
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
 
 import pghistory
+import pgtrigger
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from django.contrib.postgres.aggregates.general import ArrayAgg
-from django.db import IntegrityError
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
 from django.db.models import (
     CASCADE,
     SET_NULL,
+    BigIntegerField,
     BooleanField,
     CharField,
     Count,
     DateTimeField,
+    DurationField,
     Exists,
     F,
+    FloatField,
     ForeignKey,
+    ImageField,
     Index,
+    JSONField,
+    Model,
     OuterRef,
+    PositiveIntegerField,
+    PositiveSmallIntegerField,
     Q,
     Subquery,
     TextField,
@@ -38,7 +50,7 @@ from apps.assignment.models import Assignment
 from apps.assignment.models import Grade as AssignmentGrade
 from apps.common.error import ErrorCode
 from apps.common.models import OrderableMixin, TimeStampedMixin
-from apps.common.util import offset_paginate
+from apps.common.util import bump_model_version, cache_version, hybrid_paginate, model_version_key
 from apps.content.models import Media, Watch
 from apps.course.models import Course, Engagement, Gradebook
 from apps.discussion.models import Discussion
@@ -111,9 +123,9 @@ class Enrollment(TimeStampedMixin):
                 raise ValidationError(_("Content does not exist"))
 
     @classmethod
-    async def get_enrolled(cls, *, user_id: str, page: int, size: int):
+    async def get_enrolled(cls, *, user_id: str, page: int, size: int, cursor: str | None = None):
         base_qs = cls.objects.select_related("content_type").filter(user_id=user_id, active=True).order_by("-enrolled")
-        paginated = await offset_paginate(base_qs, page=page, size=size)
+        paginated = await hybrid_paginate(base_qs, page=page, size=size, cursor=cursor, count_strategy="cached")
 
         if not paginated["items"]:
             return paginated
@@ -129,47 +141,35 @@ class Enrollment(TimeStampedMixin):
 
     @classmethod
     async def get_records(cls, user_id: str):
-        # Asserted content_id is actually unique
-
         # to exclude inactive course engagements
         # this makes contect_key unique in course engagement
-        active_course_keys = Engagement.objects.filter(learner_id=user_id, active=True).values_list(
-            Concat(Value("course::"), F("course_id"), Value("::"), F("pk"), output_field=CharField())
-        )
+        active_course_keys = list((await Engagement.get_contexts(learner_id=user_id)).values())
 
         qs = (
-            # media
-            Watch.objects
+            LearningRecord.objects
+            .filter(Q(~Q(context__startswith="course::")) | Q(context__in=active_course_keys), user_id=user_id)
             .filter(
-                Q(~Q(context__startswith="course::")) | Q(context__in=Subquery(active_course_keys)), user_id=user_id
-            )
-            .annotate(rate_=Round("rate", 2))
-            .values_list("media_id", "context", "rate_")
-        )
-
-        for M, G in ALL_GRADE_MODELS.items():
-            pk_path = f"attempt__{M._meta.model.__name__.lower()}_id"
-            qs = qs.union(
-                G.objects
-                .annotate(score_=Round("score", 2))
-                .filter(
-                    Q(~Q(attempt__context__startswith="course::"))
-                    | Q(attempt__context__in=Subquery(active_course_keys)),
-                    attempt__learner_id=user_id,
-                    attempt__active=True,
-                    completed__isnull=False,
-                    confirmed__isnull=False,
+                ~Q(source=LearningRecord.GRADEBOOK)
+                | Exists(
+                    cls.objects.filter(
+                        user_id=user_id,
+                        active=True,
+                        content_id=OuterRef("content_id"),
+                        content_type__app_label="course",
+                        content_type__model="course",
+                    )
                 )
-                .values_list(pk_path, "attempt__context", "score_"),
-                all=True,
             )
+            .values_list("content_id", "context", "source", "value")
+        )
 
         # content_id, context, rate or score
         records: dict[str, dict[str, float]] = {}
-        async for record in qs:
-            content_id, context, value = record
-
-            if context.startswith("course"):
+        async for content_id, context, source, value in qs:
+            if source == LearningRecord.GRADEBOOK:
+                # course have rate and score
+                context = ""
+            elif context.startswith("course"):
                 # cf learning.api.access_control.active_context
                 # Frontend only accesses active context, so we can safely normalize
                 # Active contexts are unique per user (only one active engagement per course)
@@ -181,39 +181,89 @@ class Enrollment(TimeStampedMixin):
                 records[content_id] = {}
             records[content_id][context] = value
 
-        enrollments = [
-            e
-            async for e in Enrollment.objects
-            .filter(user_id=user_id, active=True)
-            .values("content_type__app_label", "content_type__model")
-            .annotate(content_ids=ArrayAgg("content_id"))
-        ]
+        return records
+
+    @classmethod
+    async def bulk_enroll(
+        cls,
+        *,
+        app_label: str,
+        model: str,
+        content_id: str,
+        enrolled_by_id: str,
+        end: datetime,
+        start: datetime | None = None,
+        archive: datetime | None = None,
+        user_ids: list[str] | None = None,
+        emails: list[str] | None = None,
+        cohort_id: int | None = None,
+    ):
+        if not await User.objects.filter(id=enrolled_by_id, is_staff=True).aexists():
+            raise ValueError(ErrorCode.PERMISSION_DENIED)
 
-        course_ids: list[str] = []
+        # validate the content once instead of every row
+        M = ENROLLABLE_MODEL_MAP.get((app_label, model))
+        if not M or not await M.objects.filter(id=content_id).aexists():
+            raise ValueError(ErrorCode.NOT_FOUND)
+
+        q = Q()
+        if user_ids:
+            q |= Q(id__in=user_ids)
+        if emails:
+            q |= Q(email__in=emails)
+        if cohort_id:
+            q |= Q(employee__cohortemployee__cohort_id=cohort_id)
+        if not q:
+            raise ValueError(ErrorCode.EMPTY_REQUEST)
+
+        content_type = await sync_to_async(ContentType.objects.get_for_model)(M)
+        start = start or timezone.now()
+        archive = archive or end + timedelta(days=settings.DEFAULT_REVIEW_PERIOD_DAYS)
+        users_sql, users_params = User.objects.filter(q).values("id").distinct().query.sql_with_params()
+
+        table = cls._meta.db_table
+        event_table = cls.pgh_event_model._meta.db_table
+        columns = (
+            'active, archive, content_id, content_type_id, created, "end", '
+            "enrolled, enrolled_by_id, modified, start, user_id"
+        )
 
-        for enrollment in enrollments:
-            app_label = enrollment["content_type__app_label"]
-            model = enrollment["content_type__model"]
-            M = ENROLLABLE_MODEL_MAP.get((app_label, model), None)
+        # active enrollments already exist for skipped users, cf enrollment_enrollment_us_itty_itid_uniq
+        # history events are written in the same statement instead of the row level pghistory trigger
+        sql = f"""
+            WITH
+            users AS ({users_sql}),
+            inserted AS (
+                INSERT INTO {table} ({columns})
+                SELECT true, %s, %s, %s, NOW(), %s, NOW(), %s, NOW(), %s, u.id
+                FROM users u
+                ON CONFLICT DO NOTHING
+                RETURNING *
+            ),
+            events AS (
+                INSERT INTO {event_table} ({columns}, id, pgh_context_id, pgh_created_at, pgh_label, pgh_obj_id)
+                SELECT {columns}, id, _pgh_attach_context(), NOW(), 'insert', id
+                FROM inserted
+            )
+            SELECT ARRAY(SELECT user_id FROM inserted), (SELECT COUNT(*) FROM users)
+        """
+        params = [*users_params, archive, content_id, content_type.pk, end, enrolled_by_id, start]
 
-            if M == Course:
-                course_ids.extend(enrollment["content_ids"])
+        def _execute_insert():
+            with (
+                transaction.atomic(),
+                pgtrigger.ignore(f"learning.{cls.__name__}:insert_insert"),
+                connection.cursor() as cursor,
+            ):
+                cursor.execute(sql, params)
+                return cursor.fetchone()
 
-        if course_ids:
-            # course have rate and score
-            course_grades = [
-                g
-                async for g in Gradebook.objects.filter(
-                    engagement__course_id__in=course_ids, engagement__learner_id=user_id, engagement__active=True
-                ).values_list("engagement__course_id", "score")
-            ]
+        inserted_user_ids, user_count = await sync_to_async(_execute_insert, thread_sensitive=True)()
 
-            for course_id, score in course_grades:
-                if course_id not in records:
-                    records[course_id] = {}
-                records[course_id][""] = score
+        # no post_save signals, a dropped version key is reissued as a fresh one
+        await cache.adelete_many([model_version_key(cls, user_id) for user_id in inserted_user_ids])
 
-        return records
+        return {"inserted_count": len(inserted_user_ids), "skipped_count": user_count - len(inserted_user_ids)}
 
     @classmethod
     async def deactivate(cls, *, id: int, user_id: str):
@@ -224,11 +274,174 @@ class Enrollment(TimeStampedMixin):
         await enrollment.asave()
 
 
-setattr(
-    Enrollment._meta, "triggers", [enrollment_content_exists(Enrollment._meta.db_table, ContentType._meta.db_table)]
+setattr(Enrollment._meta, "triggers", enrollment_content_exists(Enrollment._meta.db_table, ContentType._meta.db_table))
+
+
+class LearningRecord(Model):
+    # projection of Watch, confirmed grades and Gradebook for Enrollment.get_records
+    # maintained by triggers, cf migrations/0003_learningrecord.py
+    GRADEBOOK = "gradebook"
+    WATCH = "watch"
+
+    user = ForeignKey(User, CASCADE, verbose_name=_("User"))
+    content_id = CharField(_("Content ID"), max_length=36)
+    context = CharField(_("Context Key"), max_length=255, blank=True, default="")
+    value = FloatField(_("Value"))
+    # watch, gradebook or the app label of the grade model
+    source = CharField(_("Source"), max_length=20)
+    # watch id, gradebook id or attempt id
+    source_id = BigIntegerField(_("Source ID"))
+    modified = DateTimeField(_("Modified"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Learning Record")
+        verbose_name_plural = _("Learning Records")
+        indexes = [Index(fields=["source", "source_id"])]
+        constraints = [
+            UniqueConstraint(fields=["user", "content_id", "context"], name="learning_learningrecord_us_coid_co_uniq")
+        ]
+
+    if TYPE_CHECKING:
+        user_id: str
+
+    @classmethod
+    def get_sources(cls, user_id: str | None = None):
+        # user_id, content_id, context, value, source, source_id
+        # Asserted content_id is actually unique
+        watch_qs = Watch.objects.all()
+        if user_id is not None:
+            watch_qs = watch_qs.filter(user_id=user_id)
+
+        qs = watch_qs.annotate(value_=Round("rate", 2), source_=Value(cls.WATCH)).values_list(
+            "user_id", "media_id", "context", "value_", "source_", "id"
+        )
+
+        for M, G in ALL_GRADE_MODELS.items():
+            grade_qs = G.objects.filter(attempt__active=True, completed__isnull=False, confirmed__isnull=False)
+            if user_id is not None:
+                grade_qs = grade_qs.filter(attempt__learner_id=user_id)
+            qs = qs.union(
+                grade_qs.annotate(value_=Round("score", 2), source_=Value(G._meta.app_label)).values_list(
+                    "attempt__learner_id",
+                    f"attempt__{M._meta.model_name}_id",
+                    "attempt__context",
+                    "value_",
+                    "source_",
+                    "attempt_id",
+                ),
+                all=True,
+            )
+
+        # course have rate and score
+        gradebook_qs = Gradebook.objects.all()
+        if user_id is not None:
+            gradebook_qs = gradebook_qs.filter(engagement__learner_id=user_id)
+
+        return qs.union(
+            gradebook_qs.annotate(
+                context_=Concat(
+                    Value("course::"), "engagement__course_id", Value("::"), "engagement_id", output_field=CharField()
+                ),
+                source_=Value(cls.GRADEBOOK),
+            ).values_list("engagement__learner_id", "engagement__course_id", "context_", "score", "source_", "id"),
+            all=True,
+        )
+
+    @classmethod
+    def rebuild(cls, user_id: str | None = None):
+        # backfill or repair the projection from its sources
+        sql, params = cls.get_sources(user_id).query.sql_with_params()
+        with transaction.atomic():
+            qs = cls.objects.all() if user_id is None else cls.objects.filter(user_id=user_id)
+            deleted = qs.delete()[0]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                        INSERT INTO {cls._meta.db_table} (user_id, content_id, context, value, source, source_id, modified)
+                        SELECT *, now() FROM ({sql}) s
+                        ON CONFLICT (user_id, content_id, context) DO NOTHING
+                    """,
+                    params,
+                )
+                inserted = cursor.rowcount
+        return {"deleted_count": deleted, "record_count": inserted}
+
+
+# cf LearningObjectMixin
+CONTENT_CARD_FIELDS = (
+    "created",
+    "modified",
+    "title",
+    "description",
+    "audience",
+    "thumbnail",
+    "featured",
+    "format",
+    "duration",
+    "passing_point",
+    "max_attempts",
+    "verification_required",
 )
 
 
+class ContentCard(Model):
+    # card fields and owner snapshot of ENROLLABLE_MODELS for listings
+    # maintained by triggers, cf migrations/0004_contentcard.py
+    content_type = ForeignKey(ContentType, CASCADE, verbose_name=_("Content Type"))
+    content_id = CharField(_("Content ID"), max_length=36)
+    created = DateTimeField(_("Created"))
+    modified = DateTimeField(_("Modified"))
+    title = CharField(_("Title"), max_length=255)
+    description = TextField(_("Description"), blank=True, default="")
+    audience = TextField(_("Audience"), blank=True, default="")
+    thumbnail = ImageField(_("Thumbnail"), null=True, blank=True)
+    featured = BooleanField(_("Featured"), default=False)
+    format = CharField(_("Format"), max_length=30, blank=True, default="")
+    duration = DurationField(_("Duration"), null=True, blank=True)
+    passing_point = PositiveSmallIntegerField(_("Passing Point"), default=60)
+    max_attempts = PositiveSmallIntegerField(_("Max Attempts"), default=0)
+    verification_required = BooleanField(_("Verification Required"), default=False)
+    owner = ForeignKey(User, CASCADE, verbose_name=_("Owner"), related_name="+")
+    owner_obj = JSONField(_("Owner Snapshot"))
+
+    class Meta:
+        verbose_name = _("Content Card")
+        verbose_name_plural = _("Content Cards")
+        constraints = [
+            UniqueConstraint(fields=["content_type", "content_id"], name="learning_contentcard_coty_coid_uniq")
+        ]
+
+    @classmethod
+    def get_sources(cls):
+        # content_type_id, content_id, *CONTENT_CARD_FIELDS, owner_id, owner_obj
+        content_types = ContentType.objects.get_for_models(*ENROLLABLE_MODELS)
+        union_qs = [
+            M.objects.annotate(
+                content_type_id_=Value(content_types[M].id),
+                owner_obj=JSONObject(
+                    id=F("owner__id"),
+                    name=F("owner__name"),
+                    email=F("owner__email"),
+                    avatar=F("owner__avatar"),
+                    nickname=F("owner__nickname"),
+                ),
+            ).values_list("content_type_id_", "id", *CONTENT_CARD_FIELDS, "owner_id", "owner_obj")
+            for M in ENROLLABLE_MODELS
+        ]
+        return union_qs[0].union(*union_qs[1:], all=True)
+
+    @classmethod
+    def rebuild(cls):
+        sql, params = cls.get_sources().query.sql_with_params()
+        columns = ", ".join(["content_type_id", "content_id", *CONTENT_CARD_FIELDS, "owner_id", "owner_obj"])
+        with transaction.atomic():
+            deleted = cls.objects.all().delete()[0]
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {cls._meta.db_table} ({columns}) {sql}", params)
+                inserted = cursor.rowcount
+        return {"deleted_count": deleted, "card_count": inserted}
+
+
 @pghistory.track()
 class Catalog(TimeStampedMixin):
     name = CharField(_("Name"), max_length=255, unique=True)
@@ -253,44 +466,62 @@ class Catalog(TimeStampedMixin):
         return self.available_from <= now <= self.available_until
 
     @classmethod
-    def get_catalogs(cls, user_id: str):
+    async def get_catalogs(cls, user_id: str):
+        # active catalogs and the user's grants are cached apart, the window and visibility are applied per request
+        async def load_catalogs():
+            qs = cls.objects.filter(active=True).annotate(item_count=Count("catalogitem")).order_by("-id")
+            return [c async for c in qs]
+
+        async def load_granted():
+            return {c async for c in UserCatalog.objects.filter(user_id=user_id).values_list("catalog_id", flat=True)}
+
+        catalogs, granted = await _get_versioned_many([
+            ("learning:catalogs", [model_version_key(Catalog), model_version_key(CatalogItem)], load_catalogs),
+            (f"learning:catalog:granted:{user_id}", [model_version_key(UserCatalog, user_id)], load_granted),
+        ])
+
         now = timezone.now()
-        return (
-            cls.objects
-            .filter(
-                Q(available_from__lte=now, available_until__gte=now, active=True)
-                & (Q(public=True) | Q(usercatalog__user_id=user_id))
-            )
-            .annotate(item_count=Count("catalogitem", distinct=True))
-            .distinct()
-            .order_by("-id")
-        )
+        return [c for c in catalogs if c.available_from <= now <= c.available_until and (c.public or c.id in granted)]
 
     @classmethod
     async def get_items(cls, *, catalog_id: int, user_id: str, page: int, size: int):
-        base_qs = (
-            CatalogItem.objects
-            .select_related("content_type")
-            .annotate(
-                enrolled=Exists(
-                    Enrollment.objects.filter(
-                        user_id=user_id,
-                        active=True,
-                        content_id=OuterRef("content_id"),
-                        content_type=OuterRef("content_type"),
-                    )
-                )
+        # the ordered item list is shared by every learner, enrollment is marked from the learner's enrolled set
+        async def load_items():
+            qs = (
+                CatalogItem.objects
+                .select_related("content_type")
+                .filter(catalog_id=catalog_id, catalog__active=True)
+                .order_by("ordering", "-id")
             )
-            .filter(catalog_id=catalog_id, catalog__active=True)
-            .order_by("ordering", "-id")
-        )
-        paginated = await offset_paginate(base_qs, page=page, size=size)
+            return [item async for item in qs]
+
+        items, enrolled = await _get_versioned_many([
+            (
+                f"learning:catalog:items:{catalog_id}",
+                [model_version_key(Catalog), model_version_key(CatalogItem)],
+                load_items,
+            ),
+            _enrolled_entry(user_id),
+        ])
+
+        offset = (page - 1) * size
+        count = len(items)
+        pages = math.ceil(count / size) if count > 0 else 1
+        paginated = {
+            "items": items[offset : offset + size],
+            "count": count,
+            "size": size,
+            "page": page,
+            "pages": pages,
+            "exact": True,
+        }
 
         if not paginated["items"]:
             return paginated
 
         content_ids = defaultdict(set)
         for item in paginated["items"]:
+            item.enrolled = (item.content_type_id, item.content_id) in enrolled
             content_ids[(item.content_type.app_label, item.content_type.model)].add(item.content_id)
 
         contents = await _fetch_enrollable_contents(content_ids)
@@ -370,6 +601,18 @@ class CatalogItem(TimeStampedMixin, OrderableMixin):
 
     if TYPE_CHECKING:
         _content_cache: GenericForeignKey
+        enrolled: bool
+
+    def reorder(self, new_position: int):
+        super().reorder(new_position)
+        # siblings are shifted by queryset updates, which send no signals
+        bump_model_version(CatalogItem)
+
+    @classmethod
+    def reorder_many(cls, orderings: Mapping[int | str, int]):
+        updated = super().reorder_many(orderings)
+        bump_model_version(cls)
+        return updated
 
 
 @pghistory.track()
@@ -385,51 +628,46 @@ class UserCatalog(TimeStampedMixin):
         constraints = [UniqueConstraint(fields=["user", "catalog"], name="learning_usercatalog_us_ca_uniq")]
 
 
-async def _fetch_enrollable_contents(content_ids_by_type: dict):
-    union_qs = []
+def _enrolled_entry(user_id: str):
+    # (content_type_id, content_id) pairs the user is actively enrolled in, cf. _get_versioned_many
+    async def load():
+        qs = Enrollment.objects.filter(user_id=user_id, active=True).values_list("content_type_id", "content_id")
+        return {(content_type_id, content_id) async for content_type_id, content_id in qs}
+
+    return f"learning:enrolled:{user_id}", [model_version_key(Enrollment, user_id)], load
+
 
-    for M in ENROLLABLE_MODELS:
-        key = (M._meta.app_label.lower(), M._meta.model.__name__.lower())
-        ids = content_ids_by_type.get(key)
+async def _get_versioned_many(entries: list[tuple[str, list[str], Callable[[], Awaitable[Any]]]]):
+    # entries are (key, version keys, loader), a single cache round trip serves all of them in the steady state
+    keys = list(dict.fromkeys(key for entry_key, version_keys, _ in entries for key in (entry_key, *version_keys)))
+    cached = await cache.aget_many(keys)
 
-        if not ids:
+    values = []
+    for key, version_keys, load in entries:
+        entry = cached.get(key)
+        if entry and entry[0] == [cached.get(k) for k in version_keys]:
+            values.append(entry[1])
             continue
 
-        union_qs.append(
-            M.objects
-            .filter(id__in=ids)
-            .annotate(
-                owner_obj=JSONObject(
-                    id=F("owner__id"),
-                    name=F("owner__name"),
-                    email=F("owner__email"),
-                    avatar=F("owner__avatar"),
-                    nickname=F("owner__nickname"),
-                )
-            )
-            .values(
-                "id",
-                "created",
-                "modified",
-                "title",
-                "description",
-                "audience",
-                "thumbnail",
-                "featured",
-                "format",
-                "duration",
-                "passing_point",
-                "max_attempts",
-                "verification_required",
-                "owner_obj",
-            )
-        )
+        # versions are read before loading, a write in between leaves a stale entry that never matches again
+        versions = await cache_version(*version_keys)
+        value = await load()
+        await cache.aset(key, (versions, value), settings.CATALOG_CACHE_TIMEOUT)
+        values.append(value)
+
+    return values
+
+
+async def _fetch_enrollable_contents(content_ids_by_type: dict):
+    q = Q()
+    for (app_label, model), ids in content_ids_by_type.items():
+        q |= Q(content_type__app_label=app_label, content_type__model=model, content_id__in=ids)
 
-    if not union_qs:
+    if not q:
         return {}
 
-    qs = union_qs[0] if len(union_qs) == 1 else union_qs[0].union(*union_qs[1:], all=True)
-    return {content["id"]: content async for content in qs}
+    qs = ContentCard.objects.filter(q).values("content_id", *CONTENT_CARD_FIELDS, "owner_obj")
+    return {card["content_id"]: card async for card in qs}
 
 
 async def _attach_contents(items, contents):
@@ -443,9 +681,161 @@ async def _attach_contents(items, contents):
             continue
 
         content_data = origin_content.copy()
+        content_data["id"] = content_data.pop("content_id")
         user = User(**content_data.pop("owner_obj"))
         item._content_cache = M(**content_data, owner=user)
 
 
-# TODO: !!!!!!!!!!!!!!!!!!!!!!
-# class Recommendation(TimeStampedMixin):
+class Recommendation(TimeStampedMixin):
+    # "learners also took", the top neighbours of a source content by co-enrollment
+    source_type = ForeignKey(ContentType, CASCADE, verbose_name=_("Source Type"), related_name="+")
+    source_id = CharField(_("Source ID"), max_length=36)
+    content_type = ForeignKey(ContentType, CASCADE, verbose_name=_("Content Type"), related_name="+")
+    content_id = CharField(_("Content ID"), max_length=36)
+    content = GenericForeignKey("content_type", "content_id")
+    rank = PositiveSmallIntegerField(_("Rank"))
+    score = FloatField(_("Score"))
+    learner_count = PositiveIntegerField(_("Learner Count"))
+
+    class Meta:
+        verbose_name = _("Recommendation")
+        verbose_name_plural = _("Recommendations")
+        constraints = [
+            UniqueConstraint(
+                fields=["source_type", "source_id", "rank"], name="learning_recommendation_soty_soid_ra_uniq"
+            )
+        ]
+
+    if TYPE_CHECKING:
+        _content_cache: GenericForeignKey
+
+    @classmethod
+    def get_sources(cls):
+        # user_id, content_type_id, content_id of active enrollments and course engagements
+        course_type = ContentType.objects.get_for_model(Course)
+        return (
+            Enrollment.objects
+            .filter(active=True)
+            .values_list("user_id", "content_type_id", "content_id")
+            .union(
+                Engagement.objects
+                .filter(active=True)
+                .annotate(content_type_id_=Value(course_type.id))
+                .values_list("learner_id", "content_type_id_", "course_id")
+            )
+        )
+
+    @classmethod
+    def rebuild(cls, *, top_n: int | None = None, chunk_size: int | None = None):
+        # Cosine similarity of the binary user x content matrix: learners(a, b) / sqrt(learners(a) * learners(b)).
+        # Contents are numbered densely and the pairs are aggregated a chunk of source contents at a time, so the
+        # self join never spans the whole matrix. Readers keep the previous rows until the transaction commits.
+        top_n = top_n or settings.RECOMMENDATION_TOP_N
+        chunk_size = chunk_size or settings.RECOMMENDATION_CHUNK_SIZE
+        sql, params = cls.get_sources().query.sql_with_params()
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # ON COMMIT DROP does not fire when an outer transaction is still open
+            cursor.execute("""
+                DROP TABLE IF EXISTS
+                    learning_recommendation_matrix, learning_recommendation_item, learning_recommendation_cell
+            """)
+            cursor.execute(
+                f"""
+                CREATE TEMP TABLE learning_recommendation_matrix ON COMMIT DROP AS
+                SELECT DISTINCT user_id, content_type_id, content_id
+                FROM ({sql}) s(user_id, content_type_id, content_id)
+                """,
+                params,
+            )
+            cursor.execute("""
+                CREATE TEMP TABLE learning_recommendation_item ON COMMIT DROP AS
+                SELECT
+                    row_number() OVER (ORDER BY content_type_id, content_id)::integer AS id,
+                    content_type_id,
+                    content_id,
+                    count(*) AS learner_count
+                FROM learning_recommendation_matrix
+                GROUP BY content_type_id, content_id
+            """)
+            cursor.execute("""
+                CREATE TEMP TABLE learning_recommendation_cell ON COMMIT DROP AS
+                SELECT m.user_id, i.id AS item_id
+                FROM learning_recommendation_matrix m
+                JOIN learning_recommendation_item i USING (content_type_id, content_id);
+
+                CREATE INDEX ON learning_recommendation_cell (item_id, user_id);
+                CREATE INDEX ON learning_recommendation_cell (user_id, item_id);
+                CREATE UNIQUE INDEX ON learning_recommendation_item (id);
+                ANALYZE learning_recommendation_cell;
+                ANALYZE learning_recommendation_item;
+            """)
+            cursor.execute("SELECT count(*) FROM learning_recommendation_item")
+            [item_count] = cursor.fetchone()
+
+            deleted = cls.objects.all().delete()[0]
+            inserted = 0
+            for start in range(1, item_count + 1, chunk_size):
+                cursor.execute(
+                    f"""
+                    INSERT INTO {cls._meta.db_table} (
+                        created, modified, source_type_id, source_id, content_type_id, content_id,
+                        rank, score, learner_count
+                    )
+                    SELECT
+                        now(), now(), a.content_type_id, a.content_id, b.content_type_id, b.content_id,
+                        r.rank, r.score, r.learner_count
+                    FROM (
+                        SELECT
+                            p.source, p.target, p.learner_count, p.score,
+                            row_number() OVER (
+                                PARTITION BY p.source ORDER BY p.score DESC, p.learner_count DESC, p.target
+                            ) AS rank
+                        FROM (
+                            SELECT
+                                x.item_id AS source,
+                                y.item_id AS target,
+                                count(*) AS learner_count,
+                                count(*) / sqrt(ia.learner_count * ib.learner_count) AS score
+                            FROM learning_recommendation_cell x
+                            JOIN learning_recommendation_cell y ON y.user_id = x.user_id AND y.item_id <> x.item_id
+                            JOIN learning_recommendation_item ia ON ia.id = x.item_id
+                            JOIN learning_recommendation_item ib ON ib.id = y.item_id
+                            WHERE x.item_id >= %s AND x.item_id < %s
+                            GROUP BY x.item_id, y.item_id, ia.learner_count, ib.learner_count
+                            HAVING count(*) >= %s
+                        ) p
+                    ) r
+                    JOIN learning_recommendation_item a ON a.id = r.source
+                    JOIN learning_recommendation_item b ON b.id = r.target
+                    WHERE r.rank <= %s
+                    """,
+                    [start, start + chunk_size, settings.RECOMMENDATION_MIN_LEARNERS, top_n],
+                )
+                inserted += cursor.rowcount
+
+        return {"deleted_count": deleted, "content_count": item_count, "recommendation_count": inserted}
+
+    @classmethod
+    async def get_recommendations(cls, *, app_label: str, model: str, content_id: str, user_id: str, size: int):
+        # precomputed neighbours in rank order, minus what the learner is already enrolled in
+        qs = (
+            cls.objects
+            .select_related("content_type")
+            .filter(source_type__app_label=app_label, source_type__model=model, source_id=content_id)
+            .order_by("rank")
+        )
+        [enrolled] = await _get_versioned_many([_enrolled_entry(user_id)])
+        items = [r async for r in qs if (r.content_type_id, r.content_id) not in enrolled][:size]
+
+        if not items:
+            return items
+
+        content_ids = defaultdict(set)
+        for item in items:
+            content_ids[(item.content_type.app_label, item.content_type.model)].add(item.content_id)
+
+        contents = await _fetch_enrollable_contents(content_ids)
+        await _attach_contents(items, contents)
+
+        return [item for item in items if hasattr(item, "_content_cache")]
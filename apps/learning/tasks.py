@@ -0,0 +1,10 @@
+import pghistory
+from celery import shared_task
+
+from apps.learning.models import Recommendation
+
+
+@shared_task(name="learning.tasks.rebuild_recommendation")
+def rebuild_recommendation():
+    with pghistory.context(task="rebuild_recommendation"):
+        return Recommendation.rebuild()
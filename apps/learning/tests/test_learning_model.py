@@ -1,13 +1,30 @@
+from datetime import timedelta
+
 import mimesis
 import pytest
+from asgiref.sync import async_to_sync
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
 from mimesis.plugins.factory import FactoryField
 from pytest_django import DjangoDbBlocker
 
-from apps.learning.models import ENROLLABLE_MODELS
-from apps.learning.tests.factories import CatalogFactory, EnrollmentFactory
+from apps.account.tests.factories import UserFactory
+from apps.common.error import ErrorCode
+from apps.content.models import Media
+from apps.content.tests.factories import MediaFactory, PublicAccessMediaFactory, WatchFactory
+from apps.course.models import Assessment, Course, Lesson, LessonMedia
+from apps.course.tests.factories import CourseFactory
+from apps.exam.models import Exam
+from apps.exam.tests.factories import ExamFactory
+from apps.learning.api.access_control import cascade_access_date, get_access_date, resolve_access_date
+from apps.learning.api.v1 import get_enrolled, get_records, router
+from apps.learning.models import ENROLLABLE_MODELS, Catalog, ContentCard, Enrollment, LearningRecord, Recommendation
+from apps.learning.tests.factories import CatalogFactory, CatalogItemFactory, EnrollmentFactory, UserCatalogFactory
 from apps.operation.tests.factories import InquiryFactory
+from apps.partner.models import Cohort, CohortEmployee
+from apps.partner.tests.factories import EmployeeFactory
 from conftest import AdminUser
 
 generic = mimesis.Generic(settings.DEFAULT_LANGUAGE)
@@ -20,6 +37,251 @@ def test_enrollment():
     CatalogFactory.create_batch(2)
 
 
+@pytest.mark.django_db
+def test_enrollment_struct_parity(struct_parity):
+    enrollment = EnrollmentFactory.create()
+    EnrollmentFactory.create_batch(3, user=enrollment.user)
+
+    paginated = async_to_sync(Enrollment.get_enrolled)(user_id=enrollment.user_id, page=1, size=24)
+    struct_parity(router, get_enrolled, paginated)
+
+    records = async_to_sync(Enrollment.get_records)(enrollment.user_id)
+    struct_parity(router, get_records, records)
+    # integer scores are encoded as floats like pydantic does
+    assert struct_parity(router, get_records, {"media": {"context": 1, "other": 0.5}}) == (
+        b'{"media":{"context":1.0,"other":0.5}}'
+    )
+
+
+@pytest.mark.django_db
+def test_learning_record_projection(django_assert_num_queries):
+    watch = WatchFactory.create(context="")
+    WatchFactory.create(user=watch.user, context="")
+    user_id = watch.user_id
+
+    records = async_to_sync(Enrollment.get_records)(user_id)
+    assert records[watch.media_id] == {"": round(watch.rate, 2)}
+
+    # heartbeats without a rate change leave the projection alone
+    watch.last_position += 1
+    watch.save()
+    watch.rate = 12.345
+    watch.save()
+    records = async_to_sync(Enrollment.get_records)(user_id)
+    assert records[watch.media_id] == {"": 12.35}
+    with django_assert_num_queries(1):
+        assert async_to_sync(Enrollment.get_records)(user_id) == records
+
+    # rebuild reproduces the trigger maintained rows
+    def snapshot():
+        return set(
+            LearningRecord.objects.values_list("user_id", "content_id", "context", "value", "source", "source_id")
+        )
+
+    maintained = snapshot()
+    LearningRecord.objects.filter(user_id=user_id).delete()
+    assert LearningRecord.rebuild(user_id)["record_count"] == 2
+    assert snapshot() == maintained
+
+    watch.delete()
+    assert watch.media_id not in async_to_sync(Enrollment.get_records)(user_id)
+
+
+@pytest.mark.django_db
+def test_content_card_projection():
+    enrollment = EnrollmentFactory.create(content_type=ContentType.objects.get_for_model(Exam))
+    exam = Exam.objects.select_related("owner").get(id=enrollment.content_id)
+
+    def enrolled_content():
+        paginated = async_to_sync(Enrollment.get_enrolled)(user_id=enrollment.user_id, page=1, size=24)
+        return paginated["items"][0].content
+
+    exam.title = "renamed"
+    exam.save()
+    exam.owner.nickname = "renamed"
+    exam.owner.save()
+    content = enrolled_content()
+    assert (content.id, content.title, content.owner.nickname) == (exam.id, "renamed", "renamed")
+
+    def snapshot():
+        return list(ContentCard.objects.values("content_type_id", "content_id", "title", "owner_obj"))
+
+    maintained = snapshot()
+    ContentCard.rebuild()
+    assert sorted(snapshot(), key=str) == sorted(maintained, key=str)
+
+    exam.delete()
+    assert not ContentCard.objects.filter(content_id=exam.id).exists()
+
+
+@pytest.mark.django_db
+def test_bulk_enroll():
+    exam = ExamFactory.create()
+    staff = UserFactory.create(is_staff=True)
+    users = UserFactory.create_batch(3)
+    cohort = Cohort.objects.create(name="bulk enrollment")
+    CohortEmployee.objects.create(cohort=cohort, employee=EmployeeFactory.create(user=users[0]))
+    EnrollmentFactory.create(user=users[1], content_type=ContentType.objects.get_for_model(Exam), content_id=exam.pk)
+    kwargs = {
+        "app_label": "exam",
+        "model": "exam",
+        "content_id": exam.pk,
+        "enrolled_by_id": staff.pk,
+        "end": timezone.now() + timedelta(days=30),
+    }
+
+    result = async_to_sync(Enrollment.bulk_enroll)(
+        **kwargs, cohort_id=cohort.pk, user_ids=[users[1].pk], emails=[users[2].email]
+    )
+    assert result == {"inserted_count": 2, "skipped_count": 1}
+    assert Enrollment.objects.filter(content_id=exam.pk, active=True).count() == 3
+    assert Enrollment.pgh_event_model.objects.filter(content_id=exam.pk, pgh_label="insert").count() == 3
+
+    with pytest.raises(ValueError, match=ErrorCode.PERMISSION_DENIED):
+        async_to_sync(Enrollment.bulk_enroll)(**{**kwargs, "enrolled_by_id": users[0].pk}, user_ids=[users[0].pk])
+    with pytest.raises(ValueError, match=ErrorCode.NOT_FOUND):
+        async_to_sync(Enrollment.bulk_enroll)(**{**kwargs, "content_id": "missing"}, user_ids=[users[0].pk])
+
+
+@pytest.mark.django_db
+def test_access_date_cache(django_assert_num_queries):
+    enrollment = EnrollmentFactory.create(content_type=ContentType.objects.get_for_model(Exam))
+    kwargs = {
+        "user_id": enrollment.user_id,
+        "content_id": enrollment.content_id,
+        "app_label": "exam",
+        "model": "exam",
+        "course_id": None,
+    }
+
+    accessible = async_to_sync(get_access_date)(**kwargs)
+    assert accessible["end"] == enrollment.end
+    with django_assert_num_queries(0):
+        assert async_to_sync(get_access_date)(**kwargs) == accessible
+
+    enrollment.end += timedelta(days=1)
+    enrollment.save()
+    assert async_to_sync(get_access_date)(**kwargs)["end"] == enrollment.end
+
+    enrollment.active = False
+    enrollment.save()
+    with pytest.raises(ValueError, match=ErrorCode.ACCESS_DENIED):
+        async_to_sync(get_access_date)(**kwargs)
+
+
+@pytest.mark.django_db
+def test_catalog_cache(django_assert_num_queries):
+    user = UserFactory.create()
+    catalog = CatalogFactory.create(public=False)
+    get_catalogs = async_to_sync(Catalog.get_catalogs)
+    get_items = async_to_sync(Catalog.get_items)
+
+    assert catalog not in get_catalogs(user.pk)
+    UserCatalogFactory.create(user=user, catalog=catalog)
+    [cached] = [c for c in get_catalogs(user.pk) if c.pk == catalog.pk]
+    assert cached.item_count == catalog.catalogitem_set.count()
+    with django_assert_num_queries(0):
+        assert cached in get_catalogs(user.pk)
+
+    paginated = get_items(catalog_id=catalog.pk, user_id=user.pk, page=1, size=4)
+    assert paginated["count"] == cached.item_count and len(paginated["items"]) == 4
+    assert not any(item.enrolled for item in paginated["items"])
+
+    # only the content cards are queried once the lists are cached
+    item = paginated["items"][0]
+    with django_assert_num_queries(1):
+        assert get_items(catalog_id=catalog.pk, user_id=user.pk, page=1, size=4)["items"] == paginated["items"]
+
+    EnrollmentFactory.create(user=user, content_type=item.content_type, content_id=item.content_id)
+    assert get_items(catalog_id=catalog.pk, user_id=user.pk, page=1, size=4)["items"][0].enrolled
+
+    exam = ExamFactory.create()
+    CatalogItemFactory.create(
+        catalog=catalog, content_type=ContentType.objects.get_for_model(Exam), content_id=exam.pk, ordering=0
+    )
+    paginated = get_items(catalog_id=catalog.pk, user_id=user.pk, page=1, size=4)
+    assert paginated["count"] == cached.item_count + 1 and paginated["items"][1] == item
+
+    catalog.active = False
+    catalog.save()
+    assert catalog not in get_catalogs(user.pk)
+
+
+@pytest.mark.django_db
+def test_recommendation():
+    exam_type = ContentType.objects.get_for_model(Exam)
+    users = UserFactory.create_batch(3)
+    exams = ExamFactory.create_batch(3)
+    for user, taken in zip(users, [exams[:2], exams[:2], [exams[0], exams[2]]], strict=True):
+        for exam in taken:
+            EnrollmentFactory.create(user=user, content_type=exam_type, content_id=exam.pk)
+
+    # a single shared learner is below RECOMMENDATION_MIN_LEARNERS
+    result = Recommendation.rebuild(chunk_size=1)
+    assert result["recommendation_count"] == Recommendation.objects.count()
+    [recommendation] = Recommendation.objects.filter(source_type=exam_type, source_id=exams[0].pk)
+    assert (recommendation.content_id, recommendation.learner_count, recommendation.rank) == (exams[1].pk, 2, 1)
+    assert recommendation.score == pytest.approx(2 / (3 * 2) ** 0.5)
+
+    get_recommendations = async_to_sync(Recommendation.get_recommendations)
+    kwargs = {"app_label": "exam", "model": "exam", "content_id": exams[0].pk, "size": 10}
+    [item] = get_recommendations(**kwargs, user_id=users[2].pk)
+    assert item._content_cache.pk == exams[1].pk
+    assert get_recommendations(**kwargs, user_id=users[0].pk) == []
+
+
+@pytest.mark.django_db
+def test_access_date_function():
+    def resolve(**kwargs):
+        results = []
+        for resolver in (resolve_access_date, cascade_access_date):
+            try:
+                results.append(async_to_sync(resolver)(**kwargs))
+            except (ValueError, ObjectDoesNotExist) as e:
+                results.append((type(e), str(e)))
+        assert results[0] == results[1]
+        return results[0]
+
+    course = CourseFactory.create()
+    lesson = Lesson.objects.create(course=course, title="first", start_offset=3, end_offset=None)
+    LessonMedia.objects.create(lesson=lesson, media=MediaFactory.create())
+    lesson = Lesson.objects.create(course=course, title="second", start_offset=7, end_offset=7)
+    LessonMedia.objects.create(lesson=lesson, media=MediaFactory.create())
+    Assessment.objects.create(course=course, weight=100, start_offset=14, end_offset=None, item=ExamFactory.create())
+    enrollment = EnrollmentFactory.create(content_type=ContentType.objects.get_for_model(Course), content_id=course.pk)
+    contents = [
+        ("content", "media", media_id)
+        for media_id in LessonMedia.objects.filter(lesson__course=course).values_list("media_id", flat=True)
+    ]
+    contents += [
+        (assessment.item_type.app_label, assessment.item_type.model, assessment.item_id)
+        for assessment in Assessment.objects.select_related("item_type").filter(course=course)
+    ]
+    for app_label, model, content_id in contents:
+        kwargs = {"content_id": content_id, "app_label": app_label, "model": model}
+        accessible, _ = resolve(user_id=enrollment.user_id, course_id=course.pk, **kwargs)
+        assert accessible["start"] >= enrollment.start
+        assert accessible["archive"] == enrollment.archive
+        resolve(user_id=enrollment.user_id, course_id=None, **kwargs)
+        resolve(user_id=enrollment.user_id, course_id=CourseFactory.create().pk, **kwargs)
+
+    # public access merged with a standalone enrollment
+    public_access = PublicAccessMediaFactory.create(media=MediaFactory.create())
+    media_enrollment = EnrollmentFactory.create(
+        content_type=ContentType.objects.get_for_model(Media), content_id=public_access.media_id
+    )
+    kwargs = {"content_id": public_access.media_id, "app_label": "content", "model": "media", "course_id": None}
+    accessible, public_archive = resolve(user_id=media_enrollment.user_id, **kwargs)
+    assert public_archive == public_access.archive
+    assert accessible["start"] == min(media_enrollment.start, public_access.start)
+    resolve(user_id=enrollment.user_id, **kwargs)
+
+    # unknown course content
+    assert resolve(
+        user_id=enrollment.user_id, content_id=course.pk, app_label="course", model="course", course_id=course.pk
+    ) == (ValueError, ErrorCode.ACCESS_DENIED)
+
+
 @pytest.mark.order(-1)
 @pytest.mark.load_data
 def test_load_enrollment_data(db_no_rollback: DjangoDbBlocker, admin_user: AdminUser):
@@ -2,27 +2,41 @@ import pgtrigger
 
 
 def enrollment_content_exists(enrollment_table: str, content_type_table: str):
-    return pgtrigger.Trigger(
-        name=f"{enrollment_table}_content_exists",
-        operation=pgtrigger.Insert | pgtrigger.Update,
-        when=pgtrigger.Before,
-        func=f"""
-            DECLARE
-                table_name text;
-                exists_check boolean;
-            BEGIN
-                SELECT app_label || '_' || model INTO table_name
-                FROM {content_type_table}
-                WHERE id = NEW.content_type_id;
+    # statement level, a bulk insert checks each content type once instead of every row
+    func = f"""
+        DECLARE
+            target record;
+            missing_id text;
+        BEGIN
+            FOR target IN
+                SELECT ct.app_label || '_' || ct.model AS table_name, array_agg(DISTINCT n.content_id) AS content_ids
+                FROM new_enrollments n
+                JOIN {content_type_table} ct ON ct.id = n.content_type_id
+                GROUP BY ct.app_label, ct.model
+            LOOP
+                EXECUTE format(
+                    'SELECT c FROM unnest($1) c WHERE NOT EXISTS (SELECT 1 FROM %I WHERE id = c) LIMIT 1',
+                    target.table_name
+                )
+                INTO missing_id USING target.content_ids;
 
-                EXECUTE format('SELECT EXISTS(SELECT 1 FROM %I WHERE id = $1)', table_name)
-                INTO exists_check USING NEW.content_id;
-
-                IF NOT exists_check THEN
-                    RAISE EXCEPTION 'Content % does not exist in %', NEW.content_id, table_name;
+                IF missing_id IS NOT NULL THEN
+                    RAISE EXCEPTION 'Content % does not exist in %', missing_id, target.table_name;
                 END IF;
+            END LOOP;
 
-                RETURN NEW;
-            END;
-        """,
-    )
+            RETURN NULL;
+        END;
+    """
+    # transition tables allow a single event per trigger
+    return [
+        pgtrigger.Trigger(
+            name=f"{enrollment_table}_{name}",
+            operation=operation,
+            when=pgtrigger.After,
+            level=pgtrigger.Statement,
+            referencing=pgtrigger.Referencing(new="new_enrollments"),
+            func=func,
+        )
+        for name, operation in (("content_exists", pgtrigger.Insert), ("content_exists_update", pgtrigger.Update))
+    ]
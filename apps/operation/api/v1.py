@@ -8,7 +8,7 @@ from ninja.pagination import paginate
 from ninja.params import Form, Query, functions
 from ninja.router import Router
 
-from apps.common.util import HttpRequest, Pagination
+from apps.common.util import CursorPagination, HttpRequest, Pagination, etag, struct_response
 from apps.operation.api.schema import (
     AnnounceSchema,
     AppealCreateSchema,
@@ -94,7 +94,7 @@ async def update_inquiry(
 
 
 @router.get("/message", response=list[MessageSchema])
-@paginate(Pagination)
+@paginate(CursorPagination)
 async def get_messages(request: HttpRequest):
     return Message.objects.filter(user_id=request.auth)
 
@@ -118,6 +118,7 @@ async def create_appeal(
 
 
 @router.get("/policyversion/join", auth=None, response=list[SitePolicySchema])
+@etag(lambda request: Policy.get_join_version())
 async def get_policies_to_join(request: HttpRequest):
     return await Policy.get_policies_to_join()
 
@@ -150,7 +151,8 @@ async def create_thread(request: HttpRequest, data: ThreadCreateSchema):
 
 
 @router.get("/thread/{id}/comment", response=list[CommentNestedSchema])
-@paginate(Pagination)
+@struct_response
+@paginate(CursorPagination)
 async def get_thread_comments(request: HttpRequest, id: int):
     return (
         Comment.objects
@@ -185,7 +187,7 @@ async def delete_comment(request: HttpRequest, id: int, comment_id: Annotated[in
 
 
 @router.get("/comment", response=list[CommentBriefSchema])
-@paginate(Pagination)
+@paginate(CursorPagination)
 async def get_comments(request: HttpRequest):
     return (
         Comment.objects
@@ -5,7 +5,6 @@ from typing import TYPE_CHECKING, Sequence
 
 import pghistory
 from asgiref.sync import sync_to_async
-from bs4 import BeautifulSoup
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -52,6 +51,7 @@ from treebeard.mp_tree import MP_Node
 
 from apps.common.error import ErrorCode
 from apps.common.models import BooleanNowField, OrderableMixin, SoftDeleteMixin, TimeStampedMixin
+from apps.common.util import modified_version
 from apps.operation.trigger import thread_comment_stats
 
 User = get_user_model()
@@ -544,6 +544,13 @@ class Policy(TimeStampedMixin):
     def __str__(self):
         return self.title
 
+    @classmethod
+    async def get_join_version(cls):
+        # a newly effective version changes the count
+        return await modified_version(
+            cls.objects.filter(show_on_join=True), PolicyVersion.objects.filter(effective_date__lte=timezone.now())
+        )
+
     @classmethod
     async def get_policies_to_join(cls):
         latest_versions = (
@@ -695,6 +702,8 @@ class Comment(TimeStampedMixin, AttachmentMixin):
 
     @property
     def comment_brief(self):
+        from bs4 import BeautifulSoup
+
         content = BeautifulSoup(self.comment, "html.parser").get_text(separator=" ", strip=True)
         return content[:100] if (content and len(content) > 100) else content
 
@@ -1,3 +1,4 @@
+import base64
 import json
 
 import pytest
@@ -41,18 +42,39 @@ def test_inquiry_flow(client: Client, admin_user: AdminUser, mimesis: Generic):
 def test_message_flow(client: Client, admin_user: AdminUser, mimesis: Generic):
     admin_user.login()
 
-    MessageFactory.create(user=admin_user.get_user())
+    MessageFactory.create_batch(3, user=admin_user.get_user())
 
     # get messages
     res = client.get("/api/v1/operation/message")
     assert res.status_code == 200, "get messages"
 
+    # get messages by cursor
+    res = client.get("/api/v1/operation/message", {"cursor": "", "size": 2})
+    assert res.status_code == 200, "get messages by cursor"
+    first_page = res.json()
+    assert first_page["count"] is None and first_page["nextCursor"]
+
+    res = client.get("/api/v1/operation/message", {"cursor": first_page["nextCursor"], "size": 2})
+    assert res.status_code == 200, "get next messages by cursor"
+    first_ids = {item["id"] for item in first_page["items"]}
+    assert not first_ids & {item["id"] for item in res.json()["items"]}
+
     # get message
     items = res.json()["items"]
     message_id = items[-1]["id"]
     res = client.get(f"/api/v1/operation/message/{message_id}")
     assert res.status_code == 200, "get message"
 
+    res = client.get("/api/v1/operation/message", {"cursor": "invalid"})
+    assert res.status_code == 400, "invalid cursor"
+
+    # same ordering, but the values are not a list
+    next_cursor = first_page["nextCursor"]
+    ordering, _values = json.loads(base64.urlsafe_b64decode(next_cursor + "=" * (-len(next_cursor) % 4)))
+    cursor = base64.urlsafe_b64encode(json.dumps([ordering, 1]).encode()).decode()
+    res = client.get("/api/v1/operation/message", {"cursor": cursor})
+    assert res.status_code == 400, "invalid cursor values"
+
 
 @pytest.mark.e2e
 @pytest.mark.django_db
@@ -61,6 +83,10 @@ def test_policy_flow(client: Client, admin_user: AdminUser):
     res = client.get("/api/v1/operation/policyversion/join")
     assert res.status_code == 200, "get join policies"
 
+    # revalidate join policies
+    res_not_modified = client.get("/api/v1/operation/policyversion/join", headers={"If-None-Match": res["ETag"]})
+    assert res_not_modified.status_code == 304, "join policies not modified"
+
     join_policies: dict[str, bool] = {}
     for policy in res.json():
         join_policies[str(policy["effectiveVersion"]["id"])] = True
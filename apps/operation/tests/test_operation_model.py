@@ -2,6 +2,7 @@ import os
 import tempfile
 
 import pytest
+from asgiref.sync import async_to_sync
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from mimesis.plugins.factory import FactoryField
@@ -10,8 +11,10 @@ from pytest_django import DjangoDbBlocker
 from tablib import Dataset
 
 from apps.account.tests.factories import UserFactory
+from apps.common.util import hybrid_paginate
+from apps.operation.api.v1 import get_thread_comments, router
 from apps.operation.import_export import CategoryResource
-from apps.operation.models import Category
+from apps.operation.models import Category, Comment, FAQItem
 from apps.operation.tests.factories import (
     AnnouncementFactory,
     AttachmentFactory,
@@ -47,6 +50,39 @@ def test_faq():
     FAQFactory.create()
 
 
+@pytest.mark.django_db
+def test_faq_item_ordering():
+    faq = FAQFactory.create()
+    # factory questions are random and get_or_create may collapse them, make sure there is enough to drag around
+    FAQItem.objects.bulk_create([FAQItem(faq=faq, question=f"question {i}", answer="answer") for i in range(5)])
+    FAQItem.reorder_many({item.pk: i for i, item in enumerate(faq.faqitem_set.order_by("ordering", "pk"))})
+    items = list(faq.faqitem_set.order_by("ordering"))
+
+    def ordered_pks():
+        return list(faq.faqitem_set.order_by("ordering").values_list("pk", flat=True))
+
+    # drag down
+    items[1].ordering = 3
+    items[1].save()
+    expected = [items[0], items[2], items[3], items[1], *items[4:]]
+    assert ordered_pks() == [item.pk for item in expected]
+
+    # drag up
+    items[4].reorder(0)
+    expected = [items[4], *[item for item in expected if item != items[4]]]
+    assert ordered_pks() == [item.pk for item in expected]
+    assert list(faq.faqitem_set.order_by("ordering").values_list("ordering", flat=True)) == list(range(len(items)))
+
+    # insert
+    new_item = FAQItem.objects.create(faq=faq, question="inserted", answer="answer", ordering=1)
+    assert ordered_pks() == [expected[0].pk, new_item.pk, *[item.pk for item in expected[1:]]]
+
+    # the default position is the top, ordering=None appends
+    first_item = FAQItem.objects.create(faq=faq, question="first", answer="answer")
+    last_item = FAQItem.objects.create(faq=faq, question="last", answer="answer", ordering=None)
+    assert ordered_pks()[0] == first_item.pk and ordered_pks()[-1] == last_item.pk
+
+
 @pytest.mark.django_db
 def test_attachment(admin_user: AdminUser):
     AttachmentFactory.create(owner=admin_user.get_user())
@@ -130,6 +166,21 @@ def test_load_policy_data(db_no_rollback: DjangoDbBlocker):
         PolicyFactory.create_batch(5)
 
 
+@pytest.mark.django_db
+def test_thread_comment_struct_parity(struct_parity):
+    subject = UserFactory.create()
+    thread = ThreadFactory.create(subject_type=ContentType.objects.get_for_model(subject), subject_id=subject.pk)
+    qs = (
+        Comment.objects
+        .select_related("writer")
+        .prefetch_related("children__writer", "children__attachments", "attachments")
+        .filter(parent_id=None, thread_id=thread.pk)
+        .order_by("-pinned", "-created")
+    )
+    paginated = async_to_sync(hybrid_paginate)(qs, page=1, size=10, cursor=None)
+    struct_parity(router, get_thread_comments, paginated)
+
+
 @pytest.mark.django_db
 def test_thread():
     subject = UserFactory.create()
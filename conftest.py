@@ -6,14 +6,16 @@ import pyotp
 import pytest
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test.client import Client
+from django.http import HttpResponse
+from django.test.client import Client, RequestFactory
 from django.utils import timezone
 from mimesis import Generic, random
+from ninja import Router
 from pytest_django import DjangoDbBlocker
 from pytest_mock import MockerFixture
 
 from apps.common.error import ErrorCode
-from apps.common.util import TokenDict, encode_token
+from apps.common.util import TokenDict, compile_struct, encode_token
 
 random.global_seed = 0xFF
 
@@ -118,6 +120,27 @@ def token_spy(mocker: MockerFixture):
     return captured_tokens
 
 
+@pytest.fixture
+def struct_parity(rf: RequestFactory):
+    # compares struct response output with ninja's pydantic validation and serialization
+    import minima.api  # noqa: F401, attaches the routers to the api
+
+    def check(router: Router, view: object, result: object):
+        [op] = [
+            op for path_view in router.path_operations.values() for op in path_view.operations if op.view_func is view
+        ]
+        request = rf.get("/")
+        expected = op._result_to_response(request, result, HttpResponse()).content
+
+        [(status, response_model)] = op.response_models.items()
+        _, build = compile_struct(response_model.model_fields["response"].annotation, by_alias=op.by_alias)
+        actual = op.api.renderer.render(request, build(result) if build else result, response_status=status)
+        assert actual == expected
+        return actual
+
+    return check
+
+
 def parse_sse(chunks):
     buffer = b"".join(chunks).decode("utf-8")
     events = []
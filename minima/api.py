@@ -47,6 +47,13 @@ class MinimaAPI(NinjaAPI):
             title="Minima API", version="0.1.0", auth=cookie_auth, renderer=MsgSpecRenderer(), parser=MsgSpecParser()
         )
 
+    def create_response(self, request, data, *args, **kwargs):
+        response = super().create_response(request, data, *args, **kwargs)
+        # set by etag decorator
+        if etag := getattr(request, "etag", None):
+            response["ETag"] = etag
+        return response
+
     def get_openapi_operation_id(self, operation):
         name = operation.view_func.__name__
         module = operation.view_func.__module__
@@ -24,6 +24,23 @@ REFRESH_TOKEN_EXPIRE_SECONDS: int = 60 * 60 * 24  # 1 day
 SUBMISSION_GRACE_PERIOD: int = 5  # 5 seconds
 OTP_VERIFICATION_EXPIRY: int = 60 * 5  # 5 minutes
 DEFAULT_PAGINATION_SIZE: int = 24
+PAGINATION_COUNT_CACHE_TIMEOUT: int = 60  # 1 minute
+PAGINATION_ESTIMATE_THRESHOLD: int = 10_000  # exact count below this
+ACCESS_DATE_CACHE_TIMEOUT: int = 60 * 5  # 5 minutes
+ENGAGEMENT_CONTEXT_CACHE_TIMEOUT: int = 60 * 60 * 24  # 1 day
+CATALOG_CACHE_TIMEOUT: int = 60 * 60  # 1 hour
+COURSE_STRUCTURE_CACHE_TIMEOUT: int = 60 * 60 * 24  # 1 day
+COURSE_DETAIL_CACHE_TIMEOUT: int = 60 * 30  # 30 minutes, below the signed file url expiry, also the etag bucket
+RECOMMENDATION_TOP_N: int = 20
+RECOMMENDATION_MIN_LEARNERS: int = 2  # shared learners below this are noise
+RECOMMENDATION_CHUNK_SIZE: int = 1_000  # source contents per pass
+GRADE_COURSE_BATCH_SIZE: int = 500  # engagements per upsert
+GRADE_QUEUE_DEBOUNCE_SECONDS: int = 60  # 1 minute
+GRADE_QUEUE_BATCH_SIZE: int = 5_000  # engagements per drain
+COMPLETION_QUEUE_BATCH_SIZE: int = 100  # courses per drain
+IMPORT_TIME_BUDGET_MS: int = 5_000  # 5 seconds
+WATCH_FLUSH_BATCH_SIZE: int = 10_000  # buffered watches per upsert
+WATCH_GOAL_CACHE_TIMEOUT: int = 60 * 60  # 1 hour
 CHILD_COMMENT_MAX_COUNT: int = 20
 CHILD_POST_MAX_COUNT: int = 10
 AVATAR_MAX_SIZE_MB = 3
@@ -290,6 +307,11 @@ OTP_TOTP_THROTTLE_FACTOR = 1
 CELERY_BEAT_SCHEDULE = {
     "sync-hot-events": {"task": "tracking.tasks.sync_hot_event", "schedule": 300.0},
     "cleanup-hot-events": {"task": "tracking.tasks.cleanup_hot_event", "schedule": crontab(hour=2, minute=0)},
+    "drain-grade-queue": {"task": "course.tasks.drain_grade_queue", "schedule": 30.0},
+    "drain-completion-queue": {"task": "course.tasks.drain_completion_queue", "schedule": 30.0},
+    "rebuild-recommendations": {"task": "learning.tasks.rebuild_recommendation", "schedule": crontab(hour=3, minute=0)},
+    "refresh-course-analytics": {"task": "course.tasks.refresh_analytics", "schedule": crontab(minute=0)},
+    "flush-watch-buffer": {"task": "content.tasks.flush_watch_buffer", "schedule": 10.0},
 }
 
 # assistant